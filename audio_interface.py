@@ -15,20 +15,30 @@ Replaces the ALSA-specific implementation in the original code
 支持 WDSP 数字信号处理:
 - RX: 电台 → WDSP(NR2/NB/ANF/AGC) → Opus/Int16 编码 → 前端
 - WDSP 提供专业的业余无线电音频处理
+- 每个活动 DSP 档位（共享配置 + 听众自选，wdsp_pool）一个 WDSP 通道，每帧各处理一次
+
+RX 线程结构: 捕获线程（stream.read + 时间戳）→ SPSCFrameRing → rx-dsp 线程
+（前处理 / 录音 / WDSP / 编码 / 分发），统计见 PyAudioCapture.dsp_stats()
 """
 
 import pyaudio
 import threading
-import queue
 import time
 import gc
 import numpy as np
 import os
-import subprocess
+import sys
 import logging
 from datetime import datetime
 from opus.decoder import Decoder as OpusDecoder
 from opus.encoder import Encoder as OpusEncoder
+from rx_dsp import LatencyStats, RXFramePipeline, SampleRing, SPSCFrameRing
+from resampler import PolyphaseResampler
+from tx_playout import TXPlayoutRing
+from auto_notch import AutoNotchDetector
+from recorder import StreamingRecorder, RECORDING_FORMATS, RECORDING_EXTENSIONS
+from wdsp_pool import (DEFAULT_MAX_CHANNELS, RUNTIME_FIELDS, WDSPChannelPool, WDSPSettings,
+                       wdsp_config_from_section)
 
 # Module logger (F4 fix: `logger` was referenced but never defined,
 # causing a NameError inside the recording lock that silently defeated
@@ -76,41 +86,61 @@ def soft_peak_limiter(x, knee=0.9, ceiling=0.98, ratio=2.0):
     return np.sign(x) * out_ax
 
 
-class _StatefulDecimator:
-    """有状态 48k→16k 降采样（窗口化sinc低通 + 精确抽取）。
+class RXOpusProfileEncoder:
+    """单个 RX Opus 档位的编码状态：样本累加器 + 编码器（首帧时延迟初始化）。
 
-    用 FIR 滤波 + 跨块状态实现连续滤波，避免按块独立 resample 在块边界产生
-    瞬态/咔哒声。抽取相位跨调用连续，输出帧边界不漂移。纯 numpy，无第三方依赖。
+    feed() 输入档位采样率的 Int16 PCM，返回带 1 字节标签的完整帧列表。
+    编码器初始化失败时该档位回退为 PCM 帧（仍带标签，客户端按标签解码）。
     """
 
-    def __init__(self, factor=3, cutoff_hz=5500.0, fs=48000.0, ntaps=96):
-        self.factor = factor
-        self._ntaps = ntaps
-        n = np.arange(ntaps) - (ntaps - 1) / 2.0
-        # 窗口化 sinc 低通，截止 5.5kHz（目标奈奎斯特 8kHz 以下留足过渡带），
-        # 通带 0~2.7kHz（SSB 语音）完全平坦
-        h = 2.0 * cutoff_hz / fs * np.sinc(2.0 * cutoff_hz / fs * n)
-        h *= np.hamming(ntaps)
-        h /= np.sum(h)
-        self._h = h.astype(np.float64)
-        self._state = np.zeros(ntaps - 1, dtype=np.float64)  # 最近 ntaps-1 个输入样本
-        self._phase = 0  # 抽取相位 0..factor-1
-
-    def process(self, x):
-        x = np.asarray(x, dtype=np.float64)
-        if x.size == 0:
-            return np.zeros(0, dtype=np.float64)
-        combined = np.concatenate([self._state, x])
-        y = np.convolve(combined, self._h)[self._ntaps - 1: self._ntaps - 1 + x.size]
-        # 状态 = 最近 ntaps-1 个输入样本（含本次新增）
-        self._state = combined[-(self._ntaps - 1):] if combined.size >= self._ntaps - 1 else combined
-        out = y[self._phase::self.factor]
-        self._phase = (self._phase - x.size) % self.factor
-        return out
+    def __init__(self, profile):
+        self.profile = profile
+        self.frame_size = int(profile.rate * profile.frame_dur / 1000)
+        # 定容累加环（可容纳数帧）+ 预分配的单帧缓冲，避免每帧 concatenate/切片
+        self._acc = SampleRing(max(4 * self.frame_size, 4096))
+        self._frame = np.zeros(self.frame_size, dtype=np.int16)
+        self._encoder = None
+        self.failed = False
+        self.frames = 0
 
     def reset(self):
-        self._state = np.zeros(self._ntaps - 1, dtype=np.float64)
-        self._phase = 0
+        self._acc.clear()
+
+    def _ensure_encoder(self):
+        if self._encoder is not None or self.failed:
+            return
+        try:
+            # application 传 'audio'(2049)：短波语音/数字模式比 VOIP(2048) 更自然
+            self._encoder = OpusEncoder(self.profile.rate, 1, 'audio')
+            # 码率经 opus.encoder 的 max_data_bytes 按帧限幅生效（arm64 兼容，见 opus/encoder.py）
+            self._encoder.configure_for_voip(
+                bitrate=self.profile.bitrate, complexity=8,
+                fec=True, packet_loss_perc=15, dtx=True
+            )
+        except Exception as e:
+            # H10: 不可静默回退；记录原因，仅该档位回退 PCM
+            print(f"⚠️ Opus 编码器初始化失败（{self.profile.label}），回退 PCM: {e}")
+            self._encoder = None
+            self.failed = True
+
+    def feed(self, pcm):
+        self._ensure_encoder()
+        if self.failed:
+            return [bytes([PyAudioCapture.AUDIO_TAG_PCM]) + pcm.tobytes()]
+        self._acc.write(pcm)
+        packets = []
+        while len(self._acc) >= self.frame_size:
+            frame_data = self._acc.read_into(self._frame)
+            try:
+                encoded = self._encoder.encode(frame_data.tobytes(), self.frame_size)
+            except Exception as e:
+                if self.frames % 1000 == 0:
+                    print(f"Opus 编码错误: {e}")
+                continue
+            self.frames += 1
+            # 线格式：1 字节编解码标签 + Opus 帧（客户端按标签确定性解码）
+            packets.append(bytes([PyAudioCapture.AUDIO_TAG_OPUS]) + encoded)
+        return packets
 
 
 def enumerate_audio_devices():
@@ -160,25 +190,19 @@ def get_default_output_device():
 class PyAudioCapture(threading.Thread):
     """PyAudio-based replacement for ALSA capture
     
-    支持 Opus 编码传输：
-    - rx_opus_encode=False: 发送 Int16 PCM（默认，兼容旧客户端）
-    - rx_opus_encode=True: 发送 Opus 编码音频（节省带宽约 70%）
+    每客户端编解码档位（rx_fanout.RXProfile，由 set_opus_encode 协商）：
+    - PCM 8k/16k: 发送 Int16 PCM（默认，兼容旧客户端）
+    - Opus 各采样率/帧长/码率: 发送 Opus 编码音频（节省带宽约 70%）
+    每个有订阅者的档位每帧只编码一次，发布到该档位的共享环。
+    RXProfile.dsp 为听众自选的 DSP 档位：同 DSP 档位共享一次 WDSP 处理，
+    同 (DSP 档位, 编解码档位) 共享一次编码。
     
     帧序号机制：
     - 每个Opus帧前添加4字节序号(小端uint32)
     - 前端可检测丢包并使用FEC恢复
     """
     
-    # 类级别的 Opus 编码设置（由客户端协商后设置）
-    rx_opus_encode = False
-    rx_opus_rate = 16000  # Opus 采样率
-    rx_opus_frame_dur = 20  # Opus 帧时长 (ms)
-    _flush_opus_accumulator = False  # 跨线程标志：PTT释放时清空opus_accumulator
-    rx_opus_encoder = None  # Opus 编码器实例
-
-    # 固定 RX 码率（bps）：16kHz AUDIO 模式下 32kbps 为短波语音的平衡点。
-    # 码率经 opus.encoder 的 max_data_bytes 按帧限幅生效（arm64 兼容，见 opus/encoder.py）。
-    RX_OPUS_BITRATE = 32000
+    _flush_opus_accumulator = False  # 跨线程标志：PTT释放时清空各档位 Opus 累加器
 
     # 线格式 1 字节编解码标签（与 mrrc_ft710/opus_rx.py 一致）
     AUDIO_TAG_PCM = 0x00   # 裸 Int16 PCM
@@ -188,14 +212,10 @@ class PyAudioCapture(threading.Thread):
     rnnoise_enabled = False
     rnnoise_suppress_level = 50
     
-    # WDSP 设置
-    wdsp_enabled = False
-    wdsp_config = {}
-    _wdsp_config_hash = None  # V5.2: 配置快照缓存，避免每帧重检
-    
-    # V5.2: 标记配置已变更，由外部 setter 触发
-    _wdsp_dirty = threading.Event()
-    _wdsp_dirty.set()  # 初始需要应用
+    # WDSP 设置：控制端共享配置（类型化快照 + 版本号，WS_ControlTRX 调 update()，
+    # rx-dsp 线程每帧比较版本号，变更在下一帧边界生效）
+    wdsp_settings = WDSPSettings()
+    wdsp_max_profiles = DEFAULT_MAX_CHANNELS  # [WDSP] max_profiles：同时存在的 DSP 档位（WDSP 通道）上限
     
     # 帧序号（用于FEC丢包检测）
     _frame_sequence = 0
@@ -203,15 +223,10 @@ class PyAudioCapture(threading.Thread):
     
     # 录音功能设置
     recording_enabled = False  # 是否启用录音
-    recording_buffer = []  # RX 录音数据缓冲区（左声道）
-    tx_recording_buffer = []  # TX 录音数据缓冲区（右声道）
-    # WARNING: recording_buffer and tx_recording_buffer are unbounded lists.
-    # At 8 kHz mono, ~1 hour of audio ≈ 220 MB RAM.  A very long recording
-    # session without stop_recording() will grow memory indefinitely.
-    # If this becomes a problem, enforce a maximum duration or switch to
-    # writing chunks directly to disk (e.g. via a WAV file writer).
-    RECORDING_MAX_CHUNKS = 36000  # ~1 h at 8 kHz / 800-sample frames
-    recording_lock = threading.Lock()  # 录音缓冲区锁
+    # 流式录音器（左声道 RX / 右声道 TX），由写线程边录边写盘，内存占用与时长无关
+    recorder = None
+    recording_format = 'wav'  # [AUDIO] recording_format = wav | ogg
+    recording_lock = threading.Lock()  # 录音启停锁
     recording_start_time = None  # 录音开始时间
     recording_freq = 0  # 录音时的频率
     recording_dir = "recordings"  # 录音文件保存目录
@@ -223,18 +238,50 @@ class PyAudioCapture(threading.Thread):
         self._stop_event = threading.Event()
         self.config = config
         
-        # Opus 编码器实例（延迟初始化）
-        self.rx_opus_encoder = None
-        self.rx_opus_encoder_rate = 0  # 用于检测参数变化
+        # 每个 Opus 档位一个编码器状态（RXProfile -> RXOpusProfileEncoder，按需创建）
+        self._rx_encoders = {}
         
         # RNNoise 降噪器实例（延迟初始化）
         self.rnnoise_denoiser = None
         
-        # WDSP 处理器实例（延迟初始化）
+        # WDSP 通道池（DSP 档位 -> 处理器，延迟初始化）；wdsp_processor 为共享档位的处理器
+        self._wdsp_pool = None
+        self._shared_dsp = None
+        # 已应用的共享配置版本 / 活动档位快照 / 手动陷波开关（仅 rx-dsp 线程读写）
+        self._wdsp_version = None
+        self._wdsp_cfg = PyAudioCapture.wdsp_settings.config
+        self._wdsp_profiles = None
+        self._wdsp_nf = None
+        self.wdsp_applied = 0
+        # 载波/啸叫自动陷波：检测 WDSP 输入（陷波之前），结果批量下发到全部通道
+        self._auto_notch = None
+        self._auto_notches = []
         self.wdsp_processor = None
-        self.wdsp_resample_buffer = np.array([], dtype=np.int16)
-        # 有状态 48k→16k 降采样器（WDSP 配置在低采样率时使用）
+        # WDSP 分块累加环（定容，容量远大于单帧 960 样本 + 一个 WDSP 块）及预分配输入缓冲（整块）；
+        # 各档位输入相同，共用一个环，输出缓冲按档位预分配
+        self.wdsp_resample_buffer = SampleRing(8192)
+        self._wdsp_frame = np.zeros(0, dtype=np.int16)
+        self._wdsp_outs = {}
+        # 有状态 48k→16k 多相降采样器（WDSP 配置在低采样率时使用）
         self._decimator = None
+        # RX 发送降采样器，按 (DSP 档位, 源采样率, 目标采样率) 缓存，跨帧保留滤波状态
+        self._rx_resamplers = {}
+        # 录音 48k→16k 降采样器
+        self._rec_resampler = PolyphaseResampler(48000, 16000)
+        # 捕获线程 → rx-dsp 线程的 SPSC 帧环（16 帧 = 320ms）及统计
+        self._dsp_ring = SPSCFrameRing(16)
+        self._dsp_thread = None
+        self._dsp_time = LatencyStats()       # 单帧处理耗时
+        self._dsp_latency = LatencyStats()    # 捕获时间戳 → 处理完成（含排队）
+        self._dsp_frames = 0
+        self._last_log_time = time.time()
+        self.captured_frames = 0
+        self.input_errors = 0
+        self.input_backlog_max = 0
+        
+        if 'AUDIO' in config:
+            fmt = config['AUDIO'].get('recording_format', 'wav').strip().lower()
+            PyAudioCapture.recording_format = fmt if fmt in RECORDING_FORMATS else 'wav'
         
         # 读取 RNNoise 配置（已弃用，推荐使用 WDSP）
         if 'RNNOISE' in config:
@@ -245,27 +292,13 @@ class PyAudioCapture(threading.Thread):
         
         # 读取 WDSP 配置（推荐使用 WDSP 替代 RNNoise）
         if 'WDSP' in config:
-            PyAudioCapture.wdsp_enabled = config['WDSP'].getboolean('enabled', True)  # 默认启用
-            if PyAudioCapture.wdsp_enabled and WDSP_AVAILABLE:
-                PyAudioCapture.wdsp_config = {
-                    'sample_rate': config['WDSP'].getint('sample_rate', 48000),
-                    'buffer_size': config['WDSP'].getint('buffer_size', 256),
-                    'nr2_enabled': config['WDSP'].getboolean('nr2_enabled', True),
-                    'nr2_level': config['WDSP'].getint('nr2_level', 2),
-                    'nb_enabled': config['WDSP'].getboolean('nb_enabled', True),
-                    'anf_enabled': config['WDSP'].getboolean('anf_enabled', False),
-                    'nf_enabled': config['WDSP'].getboolean('nf_enabled', False),
-                    'agc_mode': config['WDSP'].getint('agc_mode', 3),
-                    'bandpass_low': config['WDSP'].getfloat('bandpass_low', 300.0),
-                    'bandpass_high': config['WDSP'].getfloat('bandpass_high', 2700.0),
-                    # AE 掩码平滑（抑制 NR2"水音"音乐噪声）：psi 越大越平滑，阈值越小越常触发
-                    'nr2_ae_psi': config['WDSP'].getfloat('nr2_ae_psi', 12.0),
-                    'nr2_ae_zeta_thresh': config['WDSP'].getfloat('nr2_ae_zeta_thresh', 0.65),
-                }
-                cfg = PyAudioCapture.wdsp_config
+            cfg = wdsp_config_from_section(config['WDSP'])
+            PyAudioCapture.wdsp_settings.replace(cfg)
+            PyAudioCapture.wdsp_max_profiles = max(1, config['WDSP'].getint('max_profiles', DEFAULT_MAX_CHANNELS))
+            if cfg.enabled and WDSP_AVAILABLE:
                 print(f"🔧 WDSP DSP 已启用（替代 RNNoise）")
-                print(f"   配置: {cfg['sample_rate']}Hz, NR2={cfg['nr2_enabled']}(level={cfg['nr2_level']}), NB={cfg['nb_enabled']}, AGC={cfg['agc_mode']}")
-            elif PyAudioCapture.wdsp_enabled and not WDSP_AVAILABLE:
+                print(f"   配置: {cfg.sample_rate}Hz, NR2={cfg.nr2_enabled}(level={cfg.nr2_level}), NB={cfg.nb_enabled}, AGC={cfg.agc_mode}")
+            elif cfg.enabled and not WDSP_AVAILABLE:
                 print(f"⚠️ WDSP 已启用但库不可用，请先编译安装 libwdsp")
                 print(f"   安装命令: cd /tmp && git clone https://github.com/g0orx/wdsp.git && cd wdsp && make")
         
@@ -364,21 +397,118 @@ class PyAudioCapture(threading.Thread):
         print(f"Device '{device_name}' not found, using default input device")
         return None  # Use default if not found
     
+    def _rx_downsample(self, int16_data, source_rate, target_rate, stream=None):
+        """RX 发送降采样：有状态多相抗混叠滤波（target >= source 时原样返回）。
+
+        stream 区分不同 DSP 档位的输出流，各流独立保留滤波状态。
+        """
+        if target_rate >= source_rate or target_rate <= 0:
+            return int16_data
+        key = (stream, source_rate, target_rate)
+        rs = self._rx_resamplers.get(key)
+        if rs is None:
+            rs = self._rx_resamplers[key] = PolyphaseResampler(source_rate, target_rate)
+        return rs.process_int16(int16_data)
+
+    def _open_wdsp_channel(self, channel, profile):
+        """WDSPChannelPool 工厂：按 DSP 档位在指定通道号上创建 WDSP 处理器"""
+        cfg = self._wdsp_cfg
+        processor = WDSPProcessor(
+            sample_rate=cfg.sample_rate, buffer_size=cfg.buffer_size,
+            mode=WDSPMode.USB,
+            enable_nr2=profile.nr2_level > 0,
+            enable_nb=profile.nb,
+            enable_anf=profile.anf,
+            agc_mode=profile.agc_mode,
+            nr2_ae_psi=cfg.nr2_ae_psi,
+            nr2_ae_zeta_thresh=cfg.nr2_ae_zeta_thresh,
+            channel=channel,
+        )
+        processor.set_bandpass(profile.bp_low, profile.bp_high)
+        if profile.nr2_level:
+            processor.set_nr2_level(profile.nr2_level)
+        return processor
+
+    def _open_wdsp_pool(self):
+        self._wdsp_pool = WDSPChannelPool(self._open_wdsp_channel, max_channels=PyAudioCapture.wdsp_max_profiles)
+        # WDSP 配置在低采样率（如 16k）时，输入需先做有状态 48k→16k 降采样（各档位共用）
+        wdsp_sr = self._wdsp_cfg.sample_rate
+        self._decimator = PolyphaseResampler(48000, wdsp_sr) if wdsp_sr < 48000 else None
+        self._auto_notch = AutoNotchDetector(wdsp_sr)
+
+    def _set_auto_notches(self, notches):
+        """自动陷波集合变化：一次批量更新每个 WDSP 通道的陷波库"""
+        width = self._auto_notch.width_hz if self._auto_notch is not None else 60.0
+        self._auto_notches = [(f, width) for f in notches]
+        for _, processor in self._wdsp_pool.items():
+            processor.set_auto_notches(self._auto_notches)
+        print(f"🔧 WDSP 自动陷波: {', '.join(f'{f:.0f}Hz' for f in notches) or '无'}")
+
+    def _apply_wdsp(self, version, cfg, profiles):
+        """rx-dsp 线程在帧边界应用新的共享配置 / 听众档位集合"""
+        if self._wdsp_pool is None:
+            self._wdsp_cfg = cfg
+            self._open_wdsp_pool()
+        else:
+            # 采样率/缓冲长度只在打开通道时生效；运行时字段经档位同步下发
+            self._wdsp_cfg = self._wdsp_cfg._replace(**{f: getattr(cfg, f) for f in RUNTIME_FIELDS})
+        self._shared_dsp = cfg.profile
+        # 共享档位排首位：通道数超限时它总能分到通道，超额档位回落到它
+        wanted = [self._shared_dsp]
+        wanted.extend(p.dsp for p in profiles if p.dsp is not None)
+        self._wdsp_pool.sync(wanted)
+        self.wdsp_processor = self._wdsp_pool.get(self._shared_dsp)
+        if not cfg.auto_notch and self._auto_notch is not None:
+            # 关闭自动陷波：撤销已下发的陷波，检测状态清零（重新开启时从头确认）
+            if self._auto_notch.notches:
+                self._set_auto_notches([])
+            self._auto_notch.reset()
+        else:
+            # 新开通道补齐当前自动陷波（未变化的通道内部直接返回）
+            for _, processor in self._wdsp_pool.items():
+                processor.set_auto_notches(self._auto_notches)
+        # 手动陷波作用于共享档位的通道：开关或通道变化时下发
+        nf = (self.wdsp_processor, cfg.nf_enabled)
+        if self.wdsp_processor is not None and nf != self._wdsp_nf:
+            self.wdsp_processor.set_notches_enabled(cfg.nf_enabled)
+            self._wdsp_nf = nf
+        if version != self._wdsp_version:
+            self.wdsp_applied += 1
+        self._wdsp_version = version
+        self._wdsp_profiles = profiles
+
+    def _close_wdsp(self):
+        try:
+            self._wdsp_pool.close()
+        except Exception:
+            pass
+        self._wdsp_pool = None
+        self.wdsp_processor = None
+        self._wdsp_outs = {}
+        self.wdsp_resample_buffer.clear()
+        self._decimator = None
+        self._auto_notch = None
+        self._auto_notches = []
+        self._wdsp_version = None
+        self._wdsp_profiles = None
+        self._wdsp_nf = None
+
+    def wdsp_stats(self):
+        """WDSP 通道池统计（各 DSP 档位占用的通道、超额回落、打开/改调/关闭次数）"""
+        pool = self._wdsp_pool
+        if pool is None:
+            return None
+        auto_notch = self._auto_notch.stats() if self._auto_notch is not None else None
+        return dict(pool.stats(), config_version=self._wdsp_version, config_applied=self.wdsp_applied,
+                    auto_notch=auto_notch)
+
     def run(self):
-        # Import globals at runtime to avoid circular imports
-        import __main__
-        
+        # 捕获线程只做读取 + 打时间戳：前处理 / WDSP / 编码 / 分发都在 rx-dsp 线程，
+        # DSP 尖峰不再推迟 stream.read 而造成 PortAudio 输入溢出
         print("🎵 PyAudioCapture线程已启动，开始音频捕获...")
-        frame_count = 0
-        last_log_time = time.time()
-        
-        # Opus 编码累积缓冲区
-        opus_accumulator = np.array([], dtype=np.int16)
-        
-        # 降采样滤波器状态（用于 48kHz → 16kHz）
-        # 使用简单的平均滤波：每 3 个样本取 1 个
-        downsample_factor = 3  # 48000 / 16000 = 3
-        
+        self._dsp_thread = threading.Thread(target=self._dsp_loop, daemon=True, name="rx-dsp")
+        self._dsp_thread.start()
+
         while not self._stop_event.is_set():
             try:
                 # 使用非阻塞读取，避免线程被阻塞
@@ -389,353 +519,230 @@ class PyAudioCapture(threading.Thread):
                 data = self.stream.read(960, exception_on_overflow=False)
                 
                 if len(data) > 0:
-                    frame_count += 1
-                    
-                    # 每 5 秒打印一次状态
-                    current_time = time.time()
-                    if current_time - last_log_time >= 30.0:
-                        # 动态读取类变量
-                        current_opus_mode = PyAudioCapture.rx_opus_encode
-                        encode_mode = "Opus" if current_opus_mode else "Int16"
-                        print(f"🎵 音频捕获正常 | 帧数: {frame_count} | 模式: {encode_mode}")
-                        last_log_time = current_time
-                    
-                    # Convert stereo to mono if needed
-                    # 只取右声道（电台录音通常右声道是RX输出）
-                    if self.stereo_mode:
-                        stereo_data = np.frombuffer(data, dtype=np.float32)
-                        stereo_data = stereo_data.reshape(-1, 2)
-                        mono_data = stereo_data[:, 1]  # 只取右声道
-                        data = mono_data.tobytes()
-                    
-                    # Convert Float32 to Int16 for 50% bandwidth reduction
-                    float32_data = np.frombuffer(data, dtype=np.float32)
-                    
-                    # 音频优化：提升语音质量
-                    # 1. 去除直流偏移
-                    dc_offset = np.mean(float32_data)
-                    if abs(dc_offset) > 0.001:
-                        float32_data = float32_data - dc_offset
-                    
-                    # 2. 自动增益控制 (AGC) - 当 WDSP AGC 已开启时跳过
-                    wdsp_agc_active = (
-                        PyAudioCapture.wdsp_enabled and WDSP_AVAILABLE
-                        and PyAudioCapture.wdsp_config.get('agc_mode', 0) != 0
-                    )
-                    if not wdsp_agc_active:
-                        max_val = np.max(np.abs(float32_data))
-                        if max_val > 0.001:
-                            target_level = 0.6  # 目标电平 -4dB
-                            if max_val < target_level * 0.3:
-                                # 弱信号：提升增益（最大4倍）
-                                gain = min(target_level / max_val, 4.0)
-                                float32_data = float32_data * gain
-                            elif max_val > 0.9:
-                                # 强信号：略微衰减，防止削波
-                                float32_data = float32_data * 0.85
-                    
-                    # 3. 软膝峰值限幅（仅>0.95 介入，强信号不再硬切方波产生谐波）
-                    float32_data = soft_peak_limiter(float32_data, knee=0.95, ceiling=0.99)
-                    
-                    int16_data = (float32_data * 32767).astype(np.int16)
-                    
-                    # ========== 录音功能：保存原始音频数据（48kHz，未经WDSP处理）==========
-                    if PyAudioCapture.recording_enabled:
-                        with PyAudioCapture.recording_lock:
-                            # 将48kHz数据降采样到16kHz（与输出一致）
-                            # 先 3 样本平均低通防混叠，再抽取
-                            samples_len = len(int16_data)
-                            trimmed_len = (samples_len // 3) * 3
-                            if trimmed_len >= 3:
-                                reshaped = int16_data[:trimmed_len].reshape(-1, 3)
-                                downsampled = reshaped.mean(axis=1).astype(np.int16)
-                            else:
-                                downsampled = int16_data
-                            PyAudioCapture.recording_buffer.append(downsampled)
-                            # Guard against unbounded growth
-                            if len(PyAudioCapture.recording_buffer) >= PyAudioCapture.RECORDING_MAX_CHUNKS:
-                                logger.warning("录音缓冲区已满 (RECORDING_MAX_CHUNKS), 自动停止录音")
-                                PyAudioCapture.recording_enabled = False
-                    
-                    # ========== WDSP 数字信号处理 ==========
-                    # 在 Int16 转换后、Opus编码前进行 WDSP 处理
-
-                    # V5.2: WDSP 配置缓存 — 仅变更时进入
-                    # 计算配置哈希，避免每帧 100+ 行的属性比较
-                    if not PyAudioCapture.wdsp_enabled and self.wdsp_processor is not None:
-                        try:
-                            self.wdsp_processor.close()
-                            self.wdsp_processor = None
-                            self.wdsp_resample_buffer = np.array([], dtype=np.int16)
-                            if self._decimator is not None:
-                                self._decimator.reset()
-                            PyAudioCapture._wdsp_config_hash = None
-                        except Exception as e:
-                            pass
-                    
-                    # 当前 int16_data 的采样率（决定后续是否需降采样到 Opus 率）
-                    stream_rate = 48000
-
-                    if PyAudioCapture.wdsp_enabled and WDSP_AVAILABLE:
-                        try:
-                            # V5.4: 配置哈希检查节流 — 每 25 帧（≈0.5s @20ms 帧）或
-                            # 处理器尚未创建时才重算，避免每帧 9 次 dict 查询 + hash。
-                            # 配置变更最多延迟 0.5s 生效（用户操作无感知）。
-                            if self.wdsp_processor is None or (frame_count % 25) == 0:
-                                cfg = PyAudioCapture.wdsp_config
-                                # 快速哈希：只取最可能变更的键
-                                new_hash = hash((
-                                    cfg.get('nr2_enabled', True),
-                                    cfg.get('nr2_level', 1),
-                                    cfg.get('nb_enabled', True),
-                                    cfg.get('anf_enabled', False),
-                                    cfg.get('agc_mode', 3),
-                                    cfg.get('bandpass_low', 300.0),
-                                    cfg.get('bandpass_high', 2700.0),
-                                    cfg.get('nr2_ae_psi', 12.0),
-                                    cfg.get('nr2_ae_zeta_thresh', 0.65),
-                                ))
-
-                                if new_hash != PyAudioCapture._wdsp_config_hash or self.wdsp_processor is None:
-                                    PyAudioCapture._wdsp_config_hash = new_hash
-
-                                    if self.wdsp_processor is None:
-                                        wdsp_sr = cfg.get('sample_rate', 48000)
-                                        wdsp_bs = cfg.get('buffer_size', 256)
-                                        self.wdsp_processor = WDSPProcessor(
-                                            sample_rate=wdsp_sr, buffer_size=wdsp_bs,
-                                            mode=WDSPMode.USB,
-                                            enable_nr2=cfg['nr2_enabled'],
-                                            enable_nb=cfg['nb_enabled'],
-                                            enable_anf=cfg['anf_enabled'],
-                                            agc_mode=cfg['agc_mode'],
-                                            nr2_ae_psi=cfg.get('nr2_ae_psi', 12.0),
-                                            nr2_ae_zeta_thresh=cfg.get('nr2_ae_zeta_thresh', 0.65),
-                                        )
-                                        self.wdsp_processor.set_bandpass(cfg['bandpass_low'], cfg['bandpass_high'])
-                                        if cfg['nr2_enabled']:
-                                            self.wdsp_processor.set_nr2_level(cfg.get('nr2_level', 2))
-                                        # WDSP 配置在低采样率（如 16k）时，输入需先做有状态 48k→16k 降采样
-                                        if wdsp_sr < 48000:
-                                            self._decimator = _StatefulDecimator(factor=48000 // wdsp_sr)
-                                        else:
-                                            self._decimator = None
-                                    else:
-                                        self.wdsp_processor.set_nr2_level(cfg.get('nr2_level', 2) if cfg['nr2_enabled'] else 0)
-                                        self.wdsp_processor.set_nb_enabled(cfg['nb_enabled'])
-                                        self.wdsp_processor.set_anf_enabled(cfg['anf_enabled'])
-                                        self.wdsp_processor.set_agc_mode(cfg['agc_mode'])
-                                        self.wdsp_processor.set_bandpass(cfg['bandpass_low'], cfg['bandpass_high'])
-                                        # nr2_ae_run 已由 set_nr2_level() 内置管理，无需额外设置
-                        except Exception as e:
-                            # H10: WDSP 配置异常不可静默吞掉，否则 DSP 静默不工作且无法排查
-                            print(f"⚠️ WDSP config/初始化错误（降级直通）: {e}")
-                        
-                        # V5.2: WDSP 处理 — 在 try/except 之外，每帧必执行
-                        cfg = PyAudioCapture.wdsp_config
-                        wdsp_buffer_size = cfg['buffer_size']
-
-                        # DSP 实际采样率由降采样器决定（其存在 ⟺ DSP 跑在 16k）。
-                        # 以 decimator 而非重读 cfg 为准，避免运行中配置漂移导致率不匹配。
-                        if self._decimator is not None:
-                            wdsp_sr = 48000 // self._decimator.factor
-                            # 有状态 48k→16k 降采样：输出与 Opus 编码率对齐，后续无需二次降采样
-                            decimated = self._decimator.process(int16_data.astype(np.float64) / 32767.0)
-                            dsp_input = np.clip(decimated, -1.0, 1.0)
-                            dsp_input = (dsp_input * 32767.0).astype(np.int16)
-                        else:
-                            wdsp_sr = 48000
-                            dsp_input = int16_data
-
-                        self.wdsp_resample_buffer = np.concatenate([self.wdsp_resample_buffer, dsp_input])
-
-                        processed_frames = []
-                        while len(self.wdsp_resample_buffer) >= wdsp_buffer_size:
-                            frame = self.wdsp_resample_buffer[:wdsp_buffer_size]
-                            self.wdsp_resample_buffer = self.wdsp_resample_buffer[wdsp_buffer_size:]
-                            processed = self.wdsp_processor.process(frame)
-                            if processed is not None and len(processed) > 0:
-                                if len(processed) != len(frame):
-                                    processed = frame
-                                processed_frames.append(processed)
-
-                        if processed_frames:
-                            int16_data = np.concatenate(processed_frames)
-                            try:
-                                # 软膝峰值限幅：knee=0.97 只在真正接近削顶时才介入，
-                                # 避免 AGC 归一化后的正常语音峰值被持续压缩失真
-                                float_output = int16_data.astype(np.float32) / 32767.0
-                                float_output = soft_peak_limiter(float_output, knee=0.97, ceiling=0.99)
-                                int16_data = (float_output * 32767.0).astype(np.int16)
-                            except Exception:
-                                pass
-                            # WDSP 输出采样率即 DSP 配置率（16k）
-                            stream_rate = wdsp_sr
-
-                    # 发送到客户端队列
-                    try:
-                        import sys
-                        main_module = sys.modules['__main__']
-                        if hasattr(main_module, 'AudioRXHandlerClients'):
-                            global AudioRXHandlerClients
-                            AudioRXHandlerClients = getattr(main_module, 'AudioRXHandlerClients')
-                            client_count = len(AudioRXHandlerClients)
-
-                            if client_count > 0:
-                                # H7: 快照客户端列表，避免 Tornado 线程并发 append/remove
-                                # 导致迭代中 'list changed size during iteration'，丢帧并报错
-                                clients_snapshot = list(AudioRXHandlerClients)
-                                # 半双工优化：TX 时停止发送 RX 音频数据
-                                # 避免 Echo 和节省带宽
-                                is_ptt_on = False
-                                try:
-                                    if hasattr(main_module, 'CTRX') and main_module.CTRX:
-                                        is_ptt_on = main_module.CTRX.infos.get("PTT", False)
-                                except Exception:
-                                    pass
-                                
-                                if is_ptt_on:
-                                    # TX 时跳过 RX 数据发送，但保持连接
-                                    continue
-                                
-                                # 动态读取类变量，支持运行时切换编码模式
-                                # 跨线程：PTT释放时清空accumulator
-                                if PyAudioCapture._flush_opus_accumulator:
-                                    opus_accumulator = np.array([], dtype=np.int16)
-                                    PyAudioCapture._flush_opus_accumulator = False
-
-                                current_opus_mode = PyAudioCapture.rx_opus_encode
-                                current_opus_rate = PyAudioCapture.rx_opus_rate
-                                current_opus_frame_dur = PyAudioCapture.rx_opus_frame_dur
-                                
-                                # Opus 编码模式
-                                if current_opus_mode:
-                                    # 降采样：48kHz → 目标采样率
-                                    # 使用简单的平均滤波降采样
-                                    source_rate = stream_rate  # 捕获率；WDSP@16k 时为 16k，否则 48k
-                                    if current_opus_rate < source_rate:
-                                        downsample_ratio = source_rate // current_opus_rate
-                                        # 平均降采样：每 downsample_ratio 个样本取平均
-                                        if len(int16_data) >= downsample_ratio:
-                                            # 重塑数组并进行平均
-                                            trimmed_len = (len(int16_data) // downsample_ratio) * downsample_ratio
-                                            reshaped = int16_data[:trimmed_len].reshape(-1, downsample_ratio)
-                                            int16_data = reshaped.mean(axis=1).astype(np.int16)
-                                    
-                                    # 动态计算帧大小
-                                    opus_frame_size = int(current_opus_rate * current_opus_frame_dur / 1000)
-                                    
-                                    # 累积数据直到达到一个完整的 Opus 帧
-                                    opus_accumulator = np.concatenate([opus_accumulator, int16_data])
-                                    
-                                    # 当累积足够的数据时，编码并发送
-                                    encode_count = 0
-                                    while len(opus_accumulator) >= opus_frame_size:
-                                        encode_count += 1
-                                        # 取出一帧数据
-                                        frame_data = opus_accumulator[:opus_frame_size]
-                                        opus_accumulator = opus_accumulator[opus_frame_size:]
-                                        
-                                        # V5.2: 编码器仅在首次或参数变化时初始化
-                                        if self.rx_opus_encoder is None or self.rx_opus_encoder_rate != current_opus_rate:
-                                            try:
-                                                # application 传 'audio'(2049)：短波语音/数字模式比 VOIP(2048) 更自然
-                                                self.rx_opus_encoder = OpusEncoder(
-                                                    current_opus_rate, 1, 'audio'
-                                                )
-                                                self.rx_opus_encoder_rate = current_opus_rate
-                                                # 固定码率（不再全局自适应）：单客户端拥塞不再拖累全体，
-                                                # 拥塞由下方每客户端的 Wavframes 队列丢帧机制吸收。
-                                                self.rx_opus_encoder.configure_for_voip(
-                                                    bitrate=PyAudioCapture.RX_OPUS_BITRATE, complexity=8,
-                                                    fec=True, packet_loss_perc=15, dtx=True
-                                                )
-                                            except Exception as e:
-                                                # H10: 不可静默回退；记录原因并通知路径（前端协商了 Opus）
-                                                print(f"⚠️ Opus 编码器初始化失败，回退 PCM: {e}")
-                                                PyAudioCapture.rx_opus_encode = False
-                                                break
-                                        
-                                        # 编码
-                                        try:
-                                            frame_bytes = frame_data.tobytes()
-                                            encoded_data = self.rx_opus_encoder.encode(frame_bytes, opus_frame_size)
-                                            # 线格式：1 字节编解码标签 + Opus 帧（客户端按标签确定性解码）
-                                            encoded_data = bytes([PyAudioCapture.AUDIO_TAG_OPUS]) + encoded_data
-
-                                            # 发送到客户端
-                                            # 弱网优化：智能队列管理
-                                            # 根据队列深度动态调整策略
-                                            for c in clients_snapshot:
-                                                queue_len = len(c.Wavframes)
-                                                if queue_len < 10:
-                                                    # 队列空闲，正常添加
-                                                    c.Wavframes.append(encoded_data)
-                                                elif queue_len < 20:
-                                                    # 队列适中，丢弃旧帧保持新鲜度
-                                                    c.Wavframes.pop(0)
-                                                    c.Wavframes.append(encoded_data)
-                                                else:
-                                                    # 队列过满（网络拥塞），丢弃一半旧帧
-                                                    # 避免客户端收到过时数据
-                                                    c.Wavframes = c.Wavframes[10:]
-                                                    c.Wavframes.append(encoded_data)
-                                            # V5.2: 仅每 1000 帧打印（减少热路径IO）
-                                            if frame_count % 1000 == 0:
-                                                print(f"🎵 Opus 编码正常... 帧数: {frame_count}, 压缩率: {len(encoded_data)}/{len(frame_bytes)}")
-                                        except Exception as e:
-                                            if frame_count % 1000 == 0:
-                                                print(f"Opus 编码错误: {e}")
-                                else:
-                                    # Int16 PCM 模式（默认）
-                                    # 支持 48kHz → 目标采样率 降采样
-                                    source_rate = stream_rate  # 捕获率；WDSP@16k 时为 16k，否则 48k
-                                    target_rate = PyAudioCapture.rx_opus_rate  # 目标采样率
-                                    if target_rate < source_rate and target_rate > 0:
-                                        downsample_ratio = source_rate // target_rate
-                                        if downsample_ratio > 1 and len(int16_data) >= downsample_ratio:
-                                            # 平均降采样
-                                            trimmed_len = (len(int16_data) // downsample_ratio) * downsample_ratio
-                                            reshaped = int16_data[:trimmed_len].reshape(-1, downsample_ratio)
-                                            int16_data = reshaped.mean(axis=1).astype(np.int16)
-                                    
-                                    # 确保数据长度是 2 的倍数（Int16 要求）
-                                    if len(int16_data) % 2 != 0:
-                                        int16_data = int16_data[:-1]
-                                    
-                                    compressed_data = int16_data.tobytes()
-                                    # 线格式：1 字节编解码标签 + Int16 PCM（客户端按标签确定性解码）
-                                    compressed_data = bytes([PyAudioCapture.AUDIO_TAG_PCM]) + compressed_data
-                                    # 弱网优化：智能队列管理
-                                    for c in clients_snapshot:
-                                        queue_len = len(c.Wavframes)
-                                        if queue_len < 10:
-                                            # 队列空闲，正常添加
-                                            c.Wavframes.append(compressed_data)
-                                        elif queue_len < 20:
-                                            # 队列适中，丢弃旧帧保持新鲜度
-                                            c.Wavframes.pop(0)
-                                            c.Wavframes.append(compressed_data)
-                                        else:
-                                            # 队列过满（网络拥塞），丢弃一半旧帧
-                                            c.Wavframes = c.Wavframes[10:]
-                                            c.Wavframes.append(compressed_data)
-                    except Exception as e:
-                        if frame_count % 100 == 0:
-                            print(f"Error accessing AudioRXHandlerClients: {e}")
+                    self.captured_frames += 1
+                    # 环满（DSP 线程落后 > 容量帧）时丢弃本帧并计数，读取节奏不受影响
+                    self._dsp_ring.push((time.monotonic(), data))
+                    # 读完仍积压在 PortAudio 缓冲中的样本数：持续偏大说明读取本身跟不上
+                    backlog = self.stream.get_read_available()
+                    if backlog > self.input_backlog_max:
+                        self.input_backlog_max = backlog
                 else:
                     # 没有数据时短暂等待
                     time.sleep(0.005)
                     
             except IOError as e:
                 # PyAudio 缓冲区溢出，继续
-                if frame_count % 100 == 0:
+                self.input_errors += 1
+                if self.captured_frames % 100 == 0:
                     print(f"Audio buffer overflow: {e}")
                 continue
             except Exception as e:
                 print(f"Audio read error: {e}")
                 time.sleep(0.01)
+
+    def _dsp_loop(self):
+        """rx-dsp 线程：按到达顺序取出捕获帧，逐帧处理并记录耗时 / 端到端延迟"""
+        # 逐帧前处理流水线：预分配 float32/int16 工作缓冲，原地运算
+        pipeline = RXFramePipeline(960, stereo=self.stereo_mode)
+        ring = self._dsp_ring
+        while not self._stop_event.is_set():
+            item = ring.pop(timeout=0.1)
+            if item is None:
+                continue
+            t_capture, data = item
+            t0 = time.monotonic()
+            try:
+                self._process_frame(data, pipeline, t_capture)
+            except Exception as e:
+                print(f"RX DSP error: {e}")
+            t1 = time.monotonic()
+            self._dsp_time.add(t1 - t0)
+            self._dsp_latency.add(t1 - t_capture)
+
+    def dsp_stats(self):
+        """RX DSP 线程统计：队列深度 / 溢出、单帧处理耗时、捕获→分发延迟"""
+        ring = self._dsp_ring
+        return {
+            'captured': self.captured_frames,
+            'processed': self._dsp_time.count,
+            'queue_depth': len(ring),
+            'queue_max_depth': ring.max_depth,
+            'queue_capacity': ring.capacity,
+            'overflows': ring.overflows,
+            'input_errors': self.input_errors,
+            'input_backlog_max': self.input_backlog_max,
+            'dsp': self._dsp_time.stats(),
+            'latency': self._dsp_latency.stats(),
+        }
+
+    def _process_frame(self, data, pipeline, t_capture=None):
+        """一帧捕获数据的完整 RX 处理（原捕获线程循环体）；t_capture 为该帧采集时刻"""
+        self._dsp_frames += 1
+
+        # 每 30 秒打印一次状态
+        current_time = time.time()
+        if current_time - self._last_log_time >= 30.0:
+            encode_mode = ", ".join(p.label for p in self._rx_encoders) or "Int16"
+            print(f"🎵 音频捕获正常 | 帧数: {self._dsp_frames} | Opus 档位: {encode_mode} | "
+                  f"DSP 队列溢出: {self._dsp_ring.overflows}")
+            self._last_log_time = current_time
+
+        # 声道选择（立体声只取右声道）→ 去直流 → AGC → 软限幅 → Int16，
+        # 全部在 pipeline 预分配缓冲中原地完成。int16_data 为 pipeline 输出
+        # 缓冲的视图，仅在本帧内有效（下游均复制：降采样/环写入/tobytes）。
+        # AGC 在 WDSP AGC 已开启时跳过。共享配置快照每帧只读取一次（单次属性读，
+        # 版本与配置一致），本帧内全部判断都基于同一快照
+        version, cfg = PyAudioCapture.wdsp_settings.snapshot()
+        wdsp_agc_active = cfg.enabled and WDSP_AVAILABLE and cfg.agc_mode != 0
+        int16_data = pipeline.process(data, agc=not wdsp_agc_active)
+
+        # ========== 录音功能：保存原始音频数据（48kHz，未经WDSP处理）==========
+        recorder = PyAudioCapture.recorder
+        if PyAudioCapture.recording_enabled and recorder is not None:
+            # 将48kHz数据降采样到16kHz（与输出一致），多相抗混叠滤波；
+            # 非阻塞入队，写盘在录音写线程完成。时间戳用采集时刻而非处理时刻：
+            # DSP 线程停顿后成批补处理的帧仍按原位置落盘，RX/TX 对齐不受影响
+            recorder.write_rx(self._rec_resampler.process_int16(int16_data), t=t_capture)
+
+        # ========== WDSP 数字信号处理（按 DSP 档位）==========
+        # 在 Int16 转换后、Opus编码前进行 WDSP 处理。共享档位（控制端配置）与听众自选
+        # 档位各占一个 WDSP 通道，每帧各处理一次；dsp_out: DSPProfile -> 本帧输出
+        rx_fanout = getattr(sys.modules['__main__'], 'RX_FANOUT', None)
+        dsp_out = {}
+        if not cfg.enabled and self._wdsp_pool is not None:
+            self._close_wdsp()
+
+        # 当前 int16_data 的采样率（决定后续是否需降采样到 Opus 率）
+        stream_rate = 48000
+
+        if cfg.enabled and WDSP_AVAILABLE:
+            profiles = rx_fanout.active_profiles() if rx_fanout is not None else ()
+            # 帧边界应用配置：仅当共享配置版本或活动档位快照（整体替换的元组）变化时
+            # 才同步通道池，平时每帧只有两次身份/整数比较；通道改调只下发变化项的 setter
+            if version != self._wdsp_version or profiles is not self._wdsp_profiles:
+                try:
+                    self._apply_wdsp(version, cfg, profiles)
+                except Exception as e:
+                    # H10: WDSP 配置异常不可静默吞掉，否则 DSP 静默不工作且无法排查；下一帧重试
+                    self._wdsp_version = None
+                    print(f"⚠️ WDSP config/初始化错误（降级直通）: {e}")
+
+        if self._wdsp_pool is not None and len(self._wdsp_pool):
+            # V5.2: WDSP 处理 — 在 try/except 之外，每帧必执行
+            wdsp_buffer_size = self._wdsp_cfg.buffer_size
+
+            # DSP 实际采样率由降采样器决定（其存在 ⟺ DSP 跑在 16k）。
+            # 以 decimator 而非重读 cfg 为准，避免运行中配置漂移导致率不匹配。
+            if self._decimator is not None:
+                wdsp_sr = self._decimator.out_rate
+                # 有状态 48k→16k 降采样：各档位共用一次，输出与 Opus 编码率对齐
+                dsp_input = self._decimator.process_int16(int16_data)
+            else:
+                wdsp_sr = 48000
+                dsp_input = int16_data
+
+            # 定容环累加（无 concatenate/切片），凑够的整 WDSP 缓冲一次性取出，
+            # 每个档位的 process_block() 单次调用处理全部缓冲，结果写入该档位的预分配输出缓冲
+            self.wdsp_resample_buffer.write(dsp_input)
+            blocks = len(self.wdsp_resample_buffer) // wdsp_buffer_size
+            out_len = blocks * wdsp_buffer_size
+            if self._wdsp_frame.size < out_len:
+                self._wdsp_frame = np.zeros(out_len, dtype=np.int16)
+            if out_len:
+                frames = self.wdsp_resample_buffer.read_into(self._wdsp_frame, out_len)
+                if self._wdsp_cfg.auto_notch and self._auto_notch is not None:
+                    notches = self._auto_notch.feed(frames)
+                    if notches is not None:
+                        self._set_auto_notches(notches)
+                for profile, processor in self._wdsp_pool.items():
+                    out = self._wdsp_outs.get(profile)
+                    if out is None or out.size < out_len:
+                        out = self._wdsp_outs[profile] = np.zeros(out_len, dtype=np.int16)
+                    processed = processor.process_block(frames)
+                    out[:out_len] = processed if len(processed) == out_len else frames
+                    out = out[:out_len]
+                    try:
+                        # 软膝峰值限幅：knee=0.97 只在真正接近削顶时才介入，
+                        # 避免 AGC 归一化后的正常语音峰值被持续压缩失真
+                        pipeline.limit_int16(out, knee=0.97, ceiling=0.99)
+                    except Exception:
+                        pass
+                    dsp_out[profile] = out
+                if len(self._wdsp_outs) > len(dsp_out):
+                    for profile in [p for p in self._wdsp_outs if p not in dsp_out]:
+                        del self._wdsp_outs[profile]
+                # 共享档位输出作为本帧主输出；WDSP 输出采样率即 DSP 配置率
+                int16_data = dsp_out.get(self._shared_dsp, int16_data)
+                stream_rate = wdsp_sr
+
+        # 发送到客户端队列
+        try:
+            main_module = sys.modules['__main__']
+            if hasattr(main_module, 'AudioRXHandlerClients'):
+                global AudioRXHandlerClients
+                AudioRXHandlerClients = getattr(main_module, 'AudioRXHandlerClients')
+                client_count = len(AudioRXHandlerClients)
+
+                if client_count > 0:
+                    # 各档位编码帧只发布到该档位的共享环一次，客户端在 IOLoop 上按游标读取
+                    # 半双工优化：TX 时停止发送 RX 音频数据
+                    # 避免 Echo 和节省带宽
+                    is_ptt_on = False
+                    try:
+                        if hasattr(main_module, 'CTRX') and main_module.CTRX:
+                            is_ptt_on = main_module.CTRX.infos.get("PTT", False)
+                    except Exception:
+                        pass
+
+                    if is_ptt_on:
+                        # TX 时跳过 RX 数据发送，但保持连接
+                        return
+
+                    # 跨线程：PTT释放时清空各档位的 Opus 累加器
+                    if PyAudioCapture._flush_opus_accumulator:
+                        for state in self._rx_encoders.values():
+                            state.reset()
+                        PyAudioCapture._flush_opus_accumulator = False
+
+                    # 每个有订阅者的档位每帧只编码一次：同 (DSP 档位, 采样率) 共享一次降采样，
+                    # 同 (DSP 档位, 编解码档位) 共享一次编码。DSP 档位按通道池解析
+                    # （None/超额 → 共享档位；WDSP 未运行时全部为直通）
+                    profiles = rx_fanout.active_profiles()
+                    pool = self._wdsp_pool if dsp_out else None
+                    resampled = {}
+                    encoded = {}
+                    for profile in profiles:
+                        dsp = pool.resolve(profile.dsp or self._shared_dsp) if pool is not None else None
+                        key = profile._replace(dsp=dsp)
+                        packets = encoded.get(key)
+                        if packets is None:
+                            pcm = resampled.get((dsp, profile.rate))
+                            if pcm is None:
+                                pcm = resampled[(dsp, profile.rate)] = self._rx_downsample(
+                                    dsp_out.get(dsp, int16_data), stream_rate, profile.rate, stream=dsp)
+                            if profile.is_opus:
+                                state = self._rx_encoders.get(key)
+                                if state is None:
+                                    state = self._rx_encoders[key] = RXOpusProfileEncoder(profile)
+                                packets = encoded[key] = state.feed(pcm)
+                            else:
+                                # 线格式：1 字节编解码标签 + Int16 PCM（客户端按标签确定性解码）
+                                packets = encoded[key] = [bytes([PyAudioCapture.AUDIO_TAG_PCM]) + pcm.tobytes()]
+                        for packet in packets:
+                            rx_fanout.publish(profile, packet)
+                    # 释放已无订阅者的编码器 / 已无 DSP 档位的降采样器
+                    if len(self._rx_encoders) > len(encoded):
+                        for key in [k for k in self._rx_encoders if k not in encoded]:
+                            del self._rx_encoders[key]
+                    if len(self._rx_resamplers) > len(resampled):
+                        streams = {dsp for dsp, _ in resampled}
+                        for key in [k for k in self._rx_resamplers if k[0] not in streams]:
+                            del self._rx_resamplers[key]
+        except Exception as e:
+            if self._dsp_frames % 100 == 0:
+                print(f"Error accessing AudioRXHandlerClients: {e}")
     
+
     def close(self):
         """Close the audio stream and stop the capture thread."""
         # 通知 run() 循环退出
@@ -758,6 +765,8 @@ class PyAudioCapture(threading.Thread):
         # 等待线程退出，避免非守护线程残留（daemon=True 兜底，仍尽量 join）
         try:
             self.join(timeout=2.0)
+            if self._dsp_thread is not None:
+                self._dsp_thread.join(timeout=1.0)
         except Exception:
             pass
     
@@ -780,14 +789,22 @@ class PyAudioCapture(threading.Thread):
                 os.makedirs(PyAudioCapture.recording_dir)
             
             with PyAudioCapture.recording_lock:
-                PyAudioCapture.recording_buffer = []
-                PyAudioCapture.tx_recording_buffer = []
-                PyAudioCapture.recording_start_time = datetime.now()
+                if PyAudioCapture.recorder is not None:
+                    print("⚠️ 录音已在进行中")
+                    return True
+                # 生成文件名: 频率(kHz)_日期_时间.wav|.ogg
+                freq_khz = int(freq / 1000) if freq > 0 else 0
+                now = datetime.now()
+                name = f"{freq_khz:05d}kHz_{now.strftime('%Y%m%d')}_{now.strftime('%H%M%S')}"
+                PyAudioCapture.recorder = StreamingRecorder(
+                    os.path.join(PyAudioCapture.recording_dir, name),
+                    rate=16000, fmt=PyAudioCapture.recording_format).start()
+                PyAudioCapture.recording_start_time = now
                 PyAudioCapture.recording_freq = freq
                 PyAudioCapture.recording_enabled = True
             
             freq_khz = freq / 1000 if freq > 0 else 0
-            print(f"🔴 开始录音: 频率 {freq_khz:.1f}kHz")
+            print(f"🔴 开始录音: 频率 {freq_khz:.1f}kHz → {PyAudioCapture.recorder.path}")
             return True
             
         except Exception as e:
@@ -797,7 +814,7 @@ class PyAudioCapture(threading.Thread):
     @staticmethod
     def stop_recording():
         """
-        停止录音并保存文件
+        停止录音并关闭文件（数据已在录音过程中写盘，仅需排空写队列）
         
         Returns:
             str: 保存的文件路径，如果失败返回None
@@ -805,62 +822,21 @@ class PyAudioCapture(threading.Thread):
         try:
             with PyAudioCapture.recording_lock:
                 PyAudioCapture.recording_enabled = False
+                recorder = PyAudioCapture.recorder
+                PyAudioCapture.recorder = None
 
-                rx_data = np.concatenate(PyAudioCapture.recording_buffer) if PyAudioCapture.recording_buffer else None
-                tx_data = np.concatenate(PyAudioCapture.tx_recording_buffer) if PyAudioCapture.tx_recording_buffer else None
-                PyAudioCapture.recording_buffer = []
-                PyAudioCapture.tx_recording_buffer = []
-
-                if rx_data is None and tx_data is None:
-                    print("⚠️ 录音缓冲区为空")
-                    return None
-
-                # 对齐 RX 和 TX 数据长度，填充较短的声道
-                max_len = max(len(rx_data) if rx_data is not None else 0,
-                              len(tx_data) if tx_data is not None else 0)
-                if rx_data is not None and len(rx_data) < max_len:
-                    rx_data = np.pad(rx_data, (0, max_len - len(rx_data)), mode='constant')
-                if tx_data is not None and len(tx_data) < max_len:
-                    tx_data = np.pad(tx_data, (0, max_len - len(tx_data)), mode='constant')
-                if rx_data is None:
-                    rx_data = np.zeros(max_len, dtype=np.int16)
-                if tx_data is None:
-                    tx_data = np.zeros(max_len, dtype=np.int16)
-
-                # 交错合并为立体声: [L0, R0, L1, R1, ...]
-                stereo_data = np.column_stack((rx_data, tx_data)).reshape(-1).astype(np.int16)
-
-                # 生成文件名: 频率(kHz)_日期_时间.mp3
-                freq_khz = int(PyAudioCapture.recording_freq / 1000) if PyAudioCapture.recording_freq > 0 else 0
-                now = datetime.now()
-                date_str = now.strftime('%Y%m%d')
-                time_str = now.strftime('%H%M%S')
-                filename = f"{freq_khz:05d}kHz_{date_str}_{time_str}.mp3"
-                filepath = os.path.join(PyAudioCapture.recording_dir, filename)
-
-                # 使用 ffmpeg 编码为高质量 MP3 (LAME VBR q:0, 16kHz stereo PCM -> MP3)
-                ffmpeg_cmd = [
-                    'ffmpeg', '-y',                    # 覆盖已存在的输出文件
-                    '-f', 's16le',                      # 输入格式: 16-bit signed little-endian
-                    '-ar', '16000',                     # 输入采样率: 16kHz
-                    '-ac', '2',                         # 输入声道: stereo
-                    '-i', 'pipe:0',                    # 从 stdin 读取
-                    '-c:a', 'libmp3lame',              # LAME MP3 编码器
-                    '-q:a', '0',                       # 最高质量 VBR (0=best, 9=worst)
-                    filepath
-                ]
-                proc = subprocess.run(
-                    ffmpeg_cmd,
-                    input=stereo_data.tobytes(),
-                    capture_output=True,
-                    timeout=30
-                )
-                if proc.returncode != 0:
-                    raise RuntimeError(f"ffmpeg 编码失败: {proc.stderr.decode()}")
-
-                duration = max_len / 16000
-                print(f"✅ 录音已保存 (MP3高质量): {filename} ({duration:.1f}秒, L={len(rx_data)} R={len(tx_data)}, {os.path.getsize(filepath)} bytes)")
-                return filepath
+            if recorder is None:
+                print("⚠️ 当前没有进行中的录音")
+                return None
+            filepath = recorder.stop()
+            if filepath is None:
+                print("⚠️ 录音为空或写入失败，未保存")
+                return None
+            stats = recorder.stats()
+            print(f"✅ 录音已保存: {os.path.basename(filepath)} ({stats['duration']:.1f}秒, "
+                  f"RX={stats['rx_samples']} TX={stats['tx_samples']}, 丢块={stats['dropped_chunks']}, "
+                  f"{stats['bytes']} bytes)")
+            return filepath
                 
         except Exception as e:
             print(f"❌ 停止录音失败: {e}")
@@ -880,19 +856,21 @@ class PyAudioCapture(threading.Thread):
             duration = 0
             if PyAudioCapture.recording_enabled and PyAudioCapture.recording_start_time:
                 duration = (datetime.now() - PyAudioCapture.recording_start_time).total_seconds()
+            recorder = PyAudioCapture.recorder
             
             return {
                 'recording': PyAudioCapture.recording_enabled,
                 'freq': PyAudioCapture.recording_freq,
                 'start_time': PyAudioCapture.recording_start_time.isoformat() if PyAudioCapture.recording_start_time else None,
                 'duration': duration,
-                'buffer_size': sum(len(buf) for buf in PyAudioCapture.recording_buffer) if PyAudioCapture.recording_buffer else 0
+                'buffer_size': recorder.frames_written if recorder is not None else 0,
+                'recorder': recorder.stats() if recorder is not None else None
             }
 
 class PyAudioPlayback:
     """PyAudio-based replacement for ALSA playback"""
     
-    def __init__(self, config, itrate, is_encoded, op_rate, op_frm_dur):
+    def __init__(self, config, itrate, is_encoded, op_rate, op_frm_dur, target_latency_ms=40):
         self.config = config
         self.itrate = itrate
         self.is_encoded = is_encoded
@@ -900,26 +878,27 @@ class PyAudioPlayback:
         self.op_frm_dur = op_frm_dur
         self._tx_gain_smooth = 1.0  # TX 电平平滑状态
 
-        # F2 fix: bounded queue + dedicated writer thread so the blocking
-        # PyAudio stream.write() never runs on the Tornado IOLoop.
-        # ~50 frames @ 20ms = 1s of buffered TX audio before we drop oldest.
-        self._tx_queue = queue.Queue(maxsize=50)
-        self._writer_stop = threading.Event()
-        self._writer_thread = None
-
-        if is_encoded:
-            self.decoder = OpusDecoder(op_rate, 1)
-            # V5.4: 帧大小单位换算 — op_frm_dur 是毫秒，需 /1000。
-            # 原 op_frm_dur * op_rate（如 20*48000=960000）会让每次 decode
-            # 分配 ~3.8MB 临时 PCM 缓冲（50 次/秒 ≈ 190MB/s 分配抖动）。
-            self.frame_size = op_frm_dur * op_rate // 1000
-        # V5.4: 供录音/分析路径复用的原始解码 PCM（避免二次 Opus 解码）
-        self.last_decoded_pcm = None
+        # 回调模式输出：PortAudio 回调从定容播放环取样本，环深度钳在目标延迟附近
+        # （原 50 帧队列 + 阻塞 stream.write 最多可积压约 1s，TX 延迟随队列深浅漂移）。
+        # 拉取模式：set_source(fn) 后供料线程只在环低于目标时调用 fn() 取帧（TX 抖动缓冲）
+        self._feeder_stop = threading.Event()
+        self._feeder_thread = None
+        self._source = None
+        self._poll_s = max(0.002, (op_frm_dur or 20) / 4000.0)
+
+        # V5.4: 帧大小单位换算 — op_frm_dur 是毫秒，需 /1000。
+        # 原 op_frm_dur * op_rate（如 20*48000=960000）会让每次 decode
+        # 分配 ~3.8MB 临时 PCM 缓冲（50 次/秒 ≈ 190MB/s 分配抖动）。
+        self.frame_size = op_frm_dur * op_rate // 1000
+        # 解码由调用方的 TXFramePipeline 负责（write_pcm）；仅独立使用 write() 送
+        # Opus 包时才惰性创建本地解码器
+        self.decoder = None
         
         # ========== 关键修复：采样率匹配 ==========
         # 当 Opus 编码启用时，解码后的 PCM 数据采样率是 op_rate (16kHz)
         # 必须 PyAudio 流也使用 op_rate，否则播放速度不正确导致噪音
         playback_rate = op_rate if is_encoded else itrate
+        self.ring = TXPlayoutRing(playback_rate, target_latency_ms)
         
         # Initialize PyAudio
         self.p = pyaudio.PyAudio()
@@ -936,9 +915,8 @@ class PyAudioPlayback:
         
         try:
             try:
-                # V5.4: frames_per_buffer 按播放采样率动态对齐 20ms，
-                # 不再硬编码 960（在 16kHz 下会是 60ms 而非注释所称的 20ms）
-                tx_frames_per_buffer = max(256, int(playback_rate * 0.02))
+                # 设备周期 10ms：回调取数粒度，与播放环目标延迟共同决定口到天线延迟
+                tx_frames_per_buffer = max(64, int(playback_rate * 0.01))
                 # Open output stream with optimized settings for low latency
                 self.stream = self.p.open(
                     format=pyaudio.paInt16,
@@ -946,7 +924,8 @@ class PyAudioPlayback:
                     rate=playback_rate,
                     output=True,
                     output_device_index=device_index,
-                    frames_per_buffer=tx_frames_per_buffer
+                    frames_per_buffer=tx_frames_per_buffer,
+                    stream_callback=self._callback
                 )
                 print(f'PyAudio output stream opened successfully at {playback_rate}Hz (Opus: {is_encoded}, buf: {tx_frames_per_buffer})')
             except Exception as e:
@@ -958,7 +937,8 @@ class PyAudioPlayback:
                         channels=1,
                         rate=playback_rate,  # 使用正确的采样率
                         output=True,
-                        frames_per_buffer=tx_frames_per_buffer
+                        frames_per_buffer=tx_frames_per_buffer,
+                        stream_callback=self._callback
                     )
                     print(f'Opened with default output device at {playback_rate}Hz')
                 except Exception as e2:
@@ -972,10 +952,7 @@ class PyAudioPlayback:
                 pass
             raise
 
-        # F2 fix: start dedicated playback writer thread now that the stream is open.
-        # All blocking stream.write() calls happen here, off the Tornado IOLoop.
-        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
-        self._writer_thread.start()
+        self.stream.start_stream()
 
     def _get_device_index(self, device_name):
         """Convert device name to device index for PyAudio"""
@@ -997,19 +974,10 @@ class PyAudioPlayback:
         print(f"Device '{device_name}' not found, using default output device")
         return None  # Use default if not found
     
-    def _normalize(self, data):
-        """Decode (if needed) + TX level normalization. Runs on caller thread (cheap)."""
-        if self.is_encoded:
-            pcm = self.decoder.decode(data, self.frame_size, False)
-        else:
-            pcm = data
-
-        # V5.4: 暴露原始解码 PCM，供 MRRC 录音/TX分析路径复用，
-        # 避免同一 Opus 包被第二个 decoder 实例重复解码
-        self.last_decoded_pcm = pcm
-
+    def _normalize(self, tx_int16):
+        """TX level normalization of an int16 frame. Runs on the feeder / caller thread (cheap)."""
         # TX 音频电平归一化：带 smoothing 的增益控制，防 pumping
-        tx_int16 = np.frombuffer(pcm, dtype=np.int16)
+        # 输入可能是 TXFramePipeline 复用缓冲的视图：只读不改，播放环写入时复制
         if len(tx_int16) > 0:
             max_val = np.max(np.abs(tx_int16))
             if max_val > 0:
@@ -1025,62 +993,85 @@ class PyAudioPlayback:
                 f = (tx_int16 * self._tx_gain_smooth).astype(np.float32) / 32767.0
                 f = soft_peak_limiter(f, knee=0.9, ceiling=0.98)
                 tx_int16 = (f * 32767.0).astype(np.int16)
-            pcm = tx_int16.tobytes()
-        return pcm
+        return tx_int16
 
     def write(self, data):
-        """Enqueue audio for the playback thread (non-blocking).
-
-        F2 fix: the blocking PyAudio stream.write() previously ran on the
-        Tornado IOLoop thread (WS_AudioTXHandler.on_message). Device backpressure
-        would stall the entire server. We now normalize on the caller (cheap,
-        numpy-only) and hand the PCM to a dedicated writer thread via a bounded
-        queue. If the queue is full (device underrun/backpressure), we drop the
-        oldest frame instead of blocking the IOLoop.
+        """Decode (if needed) a wire frame and enqueue it. Prefer write_pcm() with a shared decoder."""
+        if self.is_encoded:
+            if self.decoder is None:
+                self.decoder = OpusDecoder(self.op_rate, 1)
+            try:
+                data = self.decoder.decode(data, self.frame_size, False)
+            except Exception as e:
+                print(f"TX decode error: {e}")
+                return
+        self.write_pcm(np.frombuffer(data, dtype=np.int16))
+
+    def write_pcm(self, pcm):
+        """Push an int16 PCM frame into the playout ring (non-blocking).
+
+        Never blocks the IOLoop: the PortAudio callback drains the ring at the
+        device clock; if the ring is above the target latency plus this frame,
+        the oldest samples are dropped so latency stays bounded.
         """
         try:
-            pcm = self._normalize(data)
+            self.ring.write(self._normalize(pcm))
         except Exception as e:
             print(f"TX normalize error: {e}")
-            return
 
-        try:
-            self._tx_queue.put_nowait(pcm)
-        except queue.Full:
-            # Drop oldest frame to make room — never block the IOLoop
-            try:
-                self._tx_queue.get_nowait()
-            except queue.Empty:
-                pass
-            try:
-                self._tx_queue.put_nowait(pcm)
-            except queue.Full:
-                pass
+    def set_source(self, fn):
+        """Switch to pull mode: a feeder thread calls fn() whenever the ring is below target.
 
-    def _writer_loop(self):
-        """Dedicated thread: drains the TX queue into the blocking PyAudio stream."""
-        while not self._writer_stop.is_set():
-            try:
-                pcm = self._tx_queue.get(timeout=0.2)
-            except queue.Empty:
+        fn returns an int16 PCM frame, or None while the jitter buffer is
+        (re)buffering — the feeder then waits a quarter frame and asks again.
+        """
+        self._source = fn
+        if self._feeder_thread is None:
+            self._feeder_thread = threading.Thread(target=self._feeder_loop, daemon=True)
+            self._feeder_thread.start()
+
+    def set_target_latency(self, ms):
+        """Change the playout ring target (ms, clamped to 20..500); returns the effective value."""
+        return self.ring.set_target(ms)
+
+    def _feeder_loop(self):
+        """Feeder thread: tops the playout ring up to the target from the pull source."""
+        while not self._feeder_stop.is_set():
+            if not self.ring.wait_for_space(0.2):
                 continue
-            if pcm is None:  # sentinel to stop
-                break
             try:
-                self.stream.write(pcm)
+                pcm = self._source()
             except Exception as e:
-                print(f"TX stream write error: {e}")
+                print(f"TX source error: {e}")
+                pcm = None
+            if pcm is None:
+                self._feeder_stop.wait(self._poll_s)
+                continue
+            self.write_pcm(pcm)
 
-    def close(self):
-        """Close the audio stream"""
-        # Stop the writer thread first so it doesn't touch a closed stream
-        self._writer_stop.set()
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: pull frame_count samples from the ring (zero-padded on underrun)."""
+        dac = None
+        if time_info:
+            dac = time_info.get('output_buffer_dac_time', 0) - time_info.get('current_time', 0)
+        return self.ring.read(frame_count, dac).tobytes(), pyaudio.paContinue
+
+    def stats(self):
+        """Live playout measurement: ring fill vs target, DAC delay, underruns."""
+        st = self.ring.stats()
         try:
-            self._tx_queue.put_nowait(None)  # wake the writer
-        except queue.Full:
+            st['device_latency_ms'] = round(self.stream.get_output_latency() * 1000.0, 1)
+        except Exception:
             pass
-        if self._writer_thread is not None:
-            self._writer_thread.join(timeout=1.0)
+        return st
+
+    def close(self):
+        """Close the audio stream"""
+        # Stop the feeder thread first so it doesn't touch a closed stream
+        self._feeder_stop.set()
+        self.ring.clear()
+        if self._feeder_thread is not None:
+            self._feeder_thread.join(timeout=1.0)
         try:
             if self.stream.is_active():
                 self.stream.stop_stream()
@@ -1137,13 +1128,14 @@ def get_recordings_list():
     recordings = []
     try:
         for filename in os.listdir(recording_dir):
-            if filename.endswith('.mp3'):
+            base, ext = os.path.splitext(filename)
+            if ext in RECORDING_EXTENSIONS:
                 filepath = os.path.join(recording_dir, filename)
                 stat = os.stat(filepath)
 
                 # 解析文件名获取频率和时间
-                # 格式: 频率(kHz)_日期_时间.mp3
-                parts = filename.replace('.mp3', '').split('_')
+                # 格式: 频率(kHz)_日期_时间.wav|.ogg（旧版为 .mp3）
+                parts = base.split('_')
                 freq_str = parts[0] if len(parts) > 0 else "Unknown"
                 date_str = parts[1] if len(parts) > 1 else ""
                 time_str = parts[2] if len(parts) > 2 else ""
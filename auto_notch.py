@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RX 自动陷波检测（载波 / 差拍啸叫，纯 numpy 向量化）
+
+陷波原先只能由操作员经 addWDSPNotch/editWDSPNotch 逐个手动添加，每次调用单独进入
+WDSP。本模块在 rx-dsp 线程对 WDSP 输入（陷波之前，避免“陷掉 → 检测不到 → 撤销”
+的振荡）做低速率分析：
+
+- 每 hop 秒（默认 0.25s，即每秒 4 次）取最近 fft_size 个样本（约 4Hz 分辨率）做
+  Hann 窗 rfft；通带内取中位数为噪声底，峰值检测、窄度判别（±guard_hz 处须低
+  narrow_db）与抛物线插值频率全部为数组运算
+- 跟踪：候选与已有轨迹按距离矩阵一次匹配（tolerance_hz 内），频率指数平滑；
+  话音谐波随音调移动，连不上 confirm 次，只有稳定单音才会确认
+- 迟滞：连续命中 confirm 次才加陷波，连续缺失 release 次才撤销；
+  活动陷波集合变化（增减或漂移超过 tolerance_hz/2）时 feed() 才返回新列表，
+  由 WDSPProcessor.set_auto_notches() 一次批量更新陷波库
+"""
+
+import numpy as np
+
+
+class AutoNotchDetector:
+    """单路 RX 音频的稳定单音检测 + 陷波迟滞。只应由 rx-dsp 线程调用 feed()。"""
+
+    def __init__(self, rate, band=(150.0, 3000.0), hop=0.25, resolution=4.0, threshold_db=18.0,
+                 narrow_db=10.0, guard_hz=40.0, tolerance_hz=15.0, confirm=8, release=12,
+                 max_notches=4, width_hz=60.0):
+        self.rate = int(rate)
+        self.fft_size = 1 << int(np.ceil(np.log2(self.rate / resolution)))
+        self.hop = max(1, int(self.rate * hop))
+        self.threshold_db = threshold_db
+        self.narrow_db = narrow_db
+        self.tolerance_hz = tolerance_hz
+        self.confirm = int(confirm)
+        self.release = int(release)
+        self.max_notches = int(max_notches)
+        self.width_hz = width_hz
+        self.bin_hz = self.rate / self.fft_size
+        self._guard = max(2, int(round(guard_hz / self.bin_hz)))
+        lo = max(self._guard + 1, int(band[0] / self.bin_hz))
+        hi = min(self.fft_size // 2 - self._guard - 1, int(band[1] / self.bin_hz))
+        self._band = slice(lo, hi)
+        self._window = np.hanning(self.fft_size).astype(np.float32)
+        self._hist = np.zeros(self.fft_size, dtype=np.float32)
+        self._frame = np.empty(self.fft_size, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self._hist[:] = 0.0
+        self._pos = 0
+        self._filled = 0
+        self._pending = 0
+        # 轨迹：频率 / 电平 / 连续命中 / 连续缺失 / 是否已加陷波
+        self._freq = np.zeros(0)
+        self._level = np.zeros(0)
+        self._hits = np.zeros(0, dtype=np.int32)
+        self._misses = np.zeros(0, dtype=np.int32)
+        self._active = np.zeros(0, dtype=bool)
+        self.notches = []
+        self.analyses = 0
+        self.updates = 0
+
+    def feed(self, samples):
+        """送入一块样本（任意长度）。活动陷波集合变化时返回新的频率列表（Hz），否则 None。"""
+        x = np.asarray(samples)
+        n = x.size
+        if n >= self.fft_size:
+            self._hist[:] = x[-self.fft_size:]
+            self._pos = 0
+        else:
+            first = min(n, self.fft_size - self._pos)
+            self._hist[self._pos:self._pos + first] = x[:first]
+            self._hist[:n - first] = x[first:]
+            self._pos = (self._pos + n) % self.fft_size
+        self._filled = min(self.fft_size, self._filled + n)
+        self._pending += n
+        if self._pending < self.hop or self._filled < self.fft_size:
+            return None
+        self._pending = 0
+        k = self.fft_size - self._pos
+        self._frame[:k] = self._hist[self._pos:]
+        self._frame[k:] = self._hist[:self._pos]
+        freqs, levels = self.detect(self._frame)
+        return self._track(freqs, levels)
+
+    def detect(self, frame):
+        """单次分析：返回通带内稳定候选的 (频率 Hz, 高出噪声底 dB) 数组"""
+        self.analyses += 1
+        spec = np.fft.rfft(frame * self._window)
+        p = 10.0 * np.log10(spec.real ** 2 + spec.imag ** 2 + 1e-12)
+        band = self._band
+        pb = p[band]
+        floor = np.median(pb)
+        g = self._guard
+        idx = np.arange(band.start, band.stop)
+        left, right = p[band.start - 1:band.stop - 1], p[band.start + 1:band.stop + 1]
+        shoulder = np.maximum(p[band.start - g:band.stop - g], p[band.start + g:band.stop + g])
+        mask = (pb > left) & (pb >= right) & (pb > floor + self.threshold_db) & (pb - shoulder > self.narrow_db)
+        k = idx[mask]
+        if k.size == 0:
+            return np.zeros(0), np.zeros(0)
+        # 抛物线插值（dB 域）细化峰值频率
+        a, b, c = p[k - 1], p[k], p[k + 1]
+        denom = a - 2.0 * b + c
+        offset = np.where(denom != 0.0, 0.5 * (a - c) / np.where(denom != 0.0, denom, 1.0), 0.0)
+        return (k + offset) * self.bin_hz, b - floor
+
+    def _track(self, freqs, levels):
+        ntracks = self._freq.size
+        matched = np.zeros(ntracks, dtype=bool)
+        new = np.ones(freqs.size, dtype=bool)
+        if ntracks and freqs.size:
+            dist = np.abs(freqs[:, None] - self._freq[None, :])
+            nearest = np.argmin(dist, axis=1)
+            close = dist[np.arange(freqs.size), nearest] <= self.tolerance_hz
+            # 多个候选落在同一轨迹：只取最强的一个
+            order = np.argsort(-levels)
+            ci = order[close[order]]
+            ti, first = np.unique(nearest[ci], return_index=True)
+            ci = ci[first]
+            self._freq[ti] = 0.7 * self._freq[ti] + 0.3 * freqs[ci]
+            self._level[ti] = levels[ci]
+            matched[ti] = True
+            new[ci] = False
+            new[close] = False
+        self._hits = np.where(matched, self._hits + 1, np.where(self._active, self._hits, 0))
+        self._misses = np.where(matched, 0, self._misses + 1)
+        # 确认 / 撤销（迟滞），未确认轨迹缺失一次即丢弃
+        self._active = (matched & (self._hits >= self.confirm)) | (self._active & (self._misses < self.release))
+        keep = self._active | matched
+        self._freq = np.concatenate((self._freq[keep], freqs[new]))
+        self._level = np.concatenate((self._level[keep], levels[new]))
+        self._hits = np.concatenate((self._hits[keep], np.ones(int(new.sum()), dtype=np.int32)))
+        self._misses = np.concatenate((self._misses[keep], np.zeros(int(new.sum()), dtype=np.int32)))
+        self._active = np.concatenate((self._active[keep], np.zeros(int(new.sum()), dtype=bool)))
+
+        active = np.flatnonzero(self._active)
+        if active.size > self.max_notches:
+            active = active[np.argsort(-self._level[active])[:self.max_notches]]
+        notches = sorted(float(round(f, 1)) for f in self._freq[active])
+        if len(notches) == len(self.notches) and all(
+                abs(a - b) <= self.tolerance_hz / 2 for a, b in zip(notches, self.notches)):
+            return None
+        self.notches = notches
+        self.updates += 1
+        return notches
+
+    def stats(self):
+        return {
+            'notches': list(self.notches),
+            'tracks': int(self._freq.size),
+            'analyses': self.analyses,
+            'updates': self.updates,
+            'bin_hz': round(self.bin_hz, 2),
+        }
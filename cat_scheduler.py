@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CAT 命令调度器：所有电台 I/O 由单一工作线程串行执行
+
+ticksTRXRIG、FrequencySyncThread、PTTSafetyMonitor、PTT 监控循环和
+WS_ControlTRX 原先各自在不同线程直接访问 rigctld，IC-M710 的 4800 波特 CAT
+上 PTT 释放可能排在 S 表轮询之后。本调度器：
+
+- 单一工作线程独占 rigctld 会话，按优先级通道出队：
+  PTT > 频率/模式设置 > 读取 > 周期轮询；同通道内先进先出
+- 合并重复读取：同一读命令已在队列中时，后来者共享同一结果，不再重复下发
+- 读取/轮询允许小批量流水线发送（一次往返），PTT/设置命令始终单发
+- execute() 超时的 PTT/设置命令随即取消，出队时跳过不再下发：调用方重试后，
+  过时的 T 1 / T 0 不会在之后补发打乱 PTT 顺序（读取可能被合并共享，超时不取消）
+- 指标：各通道队列深度、排队等待时间（平均/最大）、合并次数
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import logging
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from rigctld_client import RigctldError
+
+logger = logging.getLogger(__name__)
+
+# 优先级通道（数值越小越优先）
+LANE_PTT = 0
+LANE_SET = 1
+LANE_READ = 2
+LANE_POLL = 3
+
+LANE_NAMES = {LANE_PTT: 'ptt', LANE_SET: 'set', LANE_READ: 'read', LANE_POLL: 'poll'}
+
+# 可合并/可流水线的通道（只读）
+_READ_LANES = (LANE_READ, LANE_POLL)
+
+
+class _LaneStats:
+    __slots__ = ('submitted', 'executed', 'coalesced', 'cancelled', 'wait_total', 'wait_max')
+
+    def __init__(self):
+        self.submitted = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self, depth):
+        avg = self.wait_total / self.executed if self.executed else 0.0
+        return {
+            'depth': depth,
+            'submitted': self.submitted,
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'cancelled': self.cancelled,
+            'wait_avg_ms': round(avg * 1000, 2),
+            'wait_max_ms': round(self.wait_max * 1000, 2),
+        }
+
+
+class _Request:
+    __slots__ = ('command', 'lane', 'future', 'enqueued')
+
+    def __init__(self, command, lane):
+        self.command = command
+        self.lane = lane
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class CATScheduler(threading.Thread):
+    """CAT 单线程调度器。
+
+    executor 需提供 execute_many(commands) -> [RigctldResponse]（如 RigctldPool）。
+    """
+
+    def __init__(self, executor, max_batch=3):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.executor = executor
+        self.max_batch = max(1, int(max_batch))
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pending_reads = {}  # command -> _Request（仅读通道）
+        self._depth = {lane: 0 for lane in LANE_NAMES}
+        self._stats = {lane: _LaneStats() for lane in LANE_NAMES}
+        self._running = True
+
+    def submit(self, command, lane=LANE_READ):
+        """提交命令，返回 concurrent.futures.Future（结果为 RigctldResponse）。"""
+        with self._cond:
+            st = self._stats[lane]
+            st.submitted += 1
+            if lane in _READ_LANES:
+                pending = self._pending_reads.get(command)
+                if pending is not None:
+                    st.coalesced += 1
+                    if lane < pending.lane:
+                        # 排队中的轮询被普通读取合并：提升到读取通道，旧堆项出队时跳过
+                        self._depth[pending.lane] -= 1
+                        self._depth[lane] += 1
+                        pending.lane = lane
+                        heapq.heappush(self._heap, (lane, next(self._seq), pending))
+                        self._cond.notify()
+                    return pending.future
+            req = _Request(command, lane)
+            if lane in _READ_LANES:
+                self._pending_reads[command] = req
+            heapq.heappush(self._heap, (lane, next(self._seq), req))
+            self._depth[lane] += 1
+            self._cond.notify()
+            return req.future
+
+    def execute(self, command, lane=LANE_READ, timeout=5.0):
+        """同步执行；超时或连接失败抛出 RigctldError。"""
+        future = self.submit(command, lane)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if lane not in _READ_LANES:
+                # 尚未下发则撤回（已在执行的取消不了）；调用方会重试，旧命令不能迟到
+                future.cancel()
+            raise RigctldError(f"CAT command '{command}' timed out in scheduler ({LANE_NAMES[lane]})")
+
+    def _pop(self):
+        """弹出下一条有效请求；跳过优先级提升后遗留的旧堆项与已取消的写命令。"""
+        while self._heap:
+            lane, _, req = heapq.heappop(self._heap)
+            if lane != req.lane:
+                continue
+            if lane not in _READ_LANES and not req.future.set_running_or_notify_cancel():
+                # 调用方已超时放弃：不再下发（置为运行态后 cancel() 即失效，不会再竞争）
+                self._depth[lane] -= 1
+                self._stats[lane].cancelled += 1
+                continue
+            return req
+        return None
+
+    def _peek_lane(self):
+        while self._heap:
+            lane, _, req = self._heap[0]
+            if lane == req.lane:
+                return lane
+            heapq.heappop(self._heap)
+        return None
+
+    def _take_batch(self):
+        """取出下一批：最高优先级的一条；若为读通道，再带上同为读通道的后续若干条。"""
+        first = self._pop()
+        if first is None:
+            return []
+        batch = [first]
+        if first.lane in _READ_LANES:
+            while len(batch) < self.max_batch and self._peek_lane() in _READ_LANES:
+                batch.append(self._pop())
+        now = time.monotonic()
+        for req in batch:
+            self._depth[req.lane] -= 1
+            if req.lane in _READ_LANES:
+                self._pending_reads.pop(req.command, None)
+            st = self._stats[req.lane]
+            wait = now - req.enqueued
+            st.executed += 1
+            st.wait_total += wait
+            if wait > st.wait_max:
+                st.wait_max = wait
+        return batch
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                responses = self.executor.execute_many([r.command for r in batch])
+                for req, resp in zip(batch, responses):
+                    req.future.set_result(resp)
+            except Exception as e:
+                for req in batch:
+                    req.future.set_exception(e if isinstance(e, RigctldError) else RigctldError(str(e)))
+        # 退出时让等待者立即失败
+        with self._cond:
+            req = self._pop()
+            while req is not None:
+                req.future.set_exception(RigctldError("CAT scheduler stopped"))
+                req = self._pop()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def stats(self):
+        """各通道队列深度与排队等待时间快照"""
+        with self._cond:
+            return {LANE_NAMES[lane]: self._stats[lane].as_dict(self._depth[lane]) for lane in LANE_NAMES}
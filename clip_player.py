@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tune / CQ 音频片段播放服务（缓存衰减后的 PCM + 复用 PyAudio 上下文与输出流）
+
+原 play_tone 在按住 tune 期间对 tune.wav 的每个 1024 帧块做 struct.unpack、
+Python 列表推导逐样本乘 0.05、再 struct.pack；play_cq 每次按下都新建
+pyaudio.PyAudio() 并重新枚举设备。本模块提供：
+
+- load_clip(path, gain): 16-bit WAV 一次读入 numpy，整段乘增益（截断取整，与原
+  int(sample*gain) 一致），预切成 chunk_ms 的 bytes 块
+- ClipCache: 按 (路径, 增益) 缓存，文件 mtime/大小变化时自动重新加载
+- ClipPlayer: 单个 PyAudio 上下文，设备索引解析一次；输出流按 (采样率, 声道) 复用，
+  两次播放之间只 stop_stream / start_stream。循环播放只是在预切好的块列表上轮转，
+  每块仅一次 stream.write（C 层阻塞写），没有逐块的 Python 样本运算
+- play() / stop() 只发信号不等待（可直接在 Tornado IOLoop 调用）：每次播放有自己的
+  停止事件，新播放线程先 join 上一个线程再开流，阻塞的 PortAudio 调用都在播放线程里
+
+pyaudio 由调用方传入工厂（默认 pyaudio.PyAudio），便于无声卡环境测试。
+"""
+
+import itertools
+import os
+import threading
+import wave
+from collections import namedtuple
+
+import numpy as np
+
+CHUNK_MS = 100
+
+Clip = namedtuple('Clip', 'path gain rate channels frames chunks stamp')
+
+
+def load_clip(path, gain=1.0, chunk_ms=CHUNK_MS):
+    """读取 16-bit PCM WAV，整段乘 gain 后切成 chunk_ms 的 bytes 块"""
+    st = os.stat(path)
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported (sample width {wf.getsampwidth()})")
+        rate, channels = wf.getframerate(), wf.getnchannels()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype='<i2')
+    if gain != 1.0:
+        pcm = (pcm.astype(np.float32) * np.float32(gain)).astype(np.int16)
+    step = max(1, rate * chunk_ms // 1000) * channels
+    chunks = tuple(pcm[i:i + step].tobytes() for i in range(0, pcm.size, step))
+    return Clip(path, gain, rate, channels, pcm.size // channels, chunks, (st.st_mtime_ns, st.st_size))
+
+
+class ClipCache:
+    """(路径, 增益) → Clip；每次 get() 只做一次 os.stat 判断文件是否变化"""
+
+    def __init__(self, chunk_ms=CHUNK_MS):
+        self.chunk_ms = chunk_ms
+        self._clips = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def get(self, path, gain=1.0):
+        st = os.stat(path)
+        key = (path, gain)
+        with self._lock:
+            clip = self._clips.get(key)
+            if clip is not None and clip.stamp == (st.st_mtime_ns, st.st_size):
+                self.hits += 1
+                return clip
+            clip = load_clip(path, gain, self.chunk_ms)
+            self._clips[key] = clip
+            self.loads += 1
+            return clip
+
+
+def _default_pa_factory():
+    import pyaudio
+    return pyaudio.PyAudio()
+
+
+class ClipPlayer:
+    """同一时刻只播放一个片段；play() 会先停掉正在播放的片段。"""
+
+    def __init__(self, device_name='', pa_factory=None):
+        self.device_name = (device_name or '').strip()
+        self._pa_factory = pa_factory or _default_pa_factory
+        self._p = None
+        self._device_index = None
+        self._stream = None
+        self._stream_key = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()   # 当前播放的停止事件（每次 play() 新建）
+        self._thread = None
+        self.current = None
+        self.streams_opened = 0
+        self.plays = 0
+        self.chunks_written = 0
+
+    @property
+    def is_playing(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _find_device(self):
+        if not self.device_name:
+            return None
+        name = self.device_name.lower()
+        for i in range(self._p.get_device_count()):
+            info = self._p.get_device_info_by_index(i)
+            if name in info['name'].lower() and info['maxOutputChannels'] > 0:
+                return i
+        print(f"Clip player: device '{self.device_name}' not found, using default output device")
+        return None
+
+    def _open(self, clip):
+        """复用上下文与输出流；采样率 / 声道变化时才重开流"""
+        if self._p is None:
+            self._p = self._pa_factory()
+            self._device_index = self._find_device()
+        key = (clip.rate, clip.channels)
+        if self._stream is not None and self._stream_key != key:
+            self._close_stream()
+        if self._stream is None:
+            self._stream = self._p.open(format=self._p.get_format_from_width(2), channels=clip.channels,
+                                        rate=clip.rate, output=True, output_device_index=self._device_index,
+                                        frames_per_buffer=max(256, clip.rate // 50))
+            self._stream_key = key
+            self.streams_opened += 1
+        elif not self._stream.is_active():
+            self._stream.start_stream()
+        return self._stream
+
+    def _close_stream(self):
+        try:
+            if self._stream.is_active():
+                self._stream.stop_stream()
+            self._stream.close()
+        except Exception as e:
+            print(f"Clip player: stream close error: {e}")
+        self._stream = None
+        self._stream_key = None
+
+    def play(self, clip, loop=False, on_done=None):
+        """后台播放 clip；loop=True 时循环直到 stop()。on_done(completed) 在播放线程结束时调用。
+
+        不阻塞：正在播放的片段只收到停止信号，由新播放线程等它退出后再开始。
+        """
+        with self._lock:
+            self._stop.set()
+            self._stop = stop = threading.Event()
+            prev = self._thread
+            self.current = clip
+            self.plays += 1
+            self._thread = threading.Thread(target=self._run, args=(clip, loop, on_done, stop, prev), daemon=True)
+            self._thread.start()
+
+    def _run(self, clip, loop, on_done, stop, prev=None):
+        completed = False
+        try:
+            if prev is not None:
+                prev.join()
+            if stop.is_set():
+                return
+            with self._lock:
+                stream = self._open(clip)
+            chunks = itertools.cycle(clip.chunks) if loop else clip.chunks
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                stream.write(chunk)
+                self.chunks_written += 1
+            else:
+                completed = True
+            with self._lock:
+                # 正常结束时 stop_stream 会先放完设备缓冲里的尾巴
+                if self._stream is stream and stream.is_active():
+                    stream.stop_stream()
+        except Exception as e:
+            print(f"Clip player: playback of {clip.path} failed: {e}")
+        finally:
+            if self._thread is threading.current_thread():
+                self.current = None
+            if on_done is not None:
+                try:
+                    on_done(completed)
+                except Exception as e:
+                    print(f"Clip player: on_done error: {e}")
+
+    def stop(self):
+        """通知当前播放停止后立即返回（播放线程写完当前块后退出），输出流保留供下次复用"""
+        self._stop.set()
+
+    def join(self, timeout=None):
+        """等待播放线程退出；返回是否已退出"""
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return not self.is_playing
+
+    def close(self):
+        self.stop()
+        self.join(1.0)
+        with self._lock:
+            if self._stream is not None:
+                self._close_stream()
+            if self._p is not None:
+                self._p.terminate()
+                self._p = None
+
+    def stats(self):
+        return {
+            'playing': self.current.path if self.current else None,
+            'plays': self.plays,
+            'streams_opened': self.streams_opened,
+            'chunks_written': self.chunks_written,
+        }
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全景频谱基准
+
+1. FFT：loadFFTdata 原逐段循环 + 逐 bin FFTmymap vs PanadapterFFT 批量引擎。
+   每帧 = nbBuffer(24) 个半段 IQ 样本 → 23 段 50% 重叠 FFT → 平均对数功率谱 → uint8 帧。
+   报告各 FFTSIZE 下的帧/秒（单核），以及 ptime 帧周期下的 CPU 占用。
+2. 瀑布帧压缩：raw / zlib / quiet 的下行字节率（kB/s，按 ptime 帧率）与编码耗时；
+   另附逐行差分 + zlib 作对照（噪声底逐行独立，差分反而比直接 zlib 大，故未采用）。
+3. 噪声底估计：SpectrumSmoother.process 单帧耗时，逐帧整段 np.median（原实现）vs
+   增量抽样中位数（每 FLOOR_EVERY 帧、1/FLOOR_STRIDE 的 bin），以及两者估计值之差。
+    python dev_tools/bench_panadapter.py [秒/档]
+"""
+
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from panadapter import PanadapterFFT, SmoothingSettings, SpectrumSmoother
+from panadapter import WaterfallEncoder
+from test_panadapter import iq_frame, legacy_log_power_spectrum, legacy_quantize, waterfall_rows
+
+NB_BUFFER = 24
+SAMPLE_RATE = 2400000  # 典型 RTL-SDR 采样率
+
+
+def frames_per_second(fn, data, seconds):
+    fn(data)
+    n = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(data)
+        n += 1
+    return n / (time.perf_counter() - start)
+
+
+def delta_encoder():
+    """对照组：(本行 - 上一行) mod 256 后 zlib"""
+    prev = [None]
+
+    def encode(row):
+        cur = np.frombuffer(row, dtype=np.uint8)
+        body = cur if prev[0] is None else cur - prev[0]
+        prev[0] = cur
+        return zlib.compress(body.tobytes(), 1)
+    return encode
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    rng = np.random.default_rng(0)
+    print(f"{'FFTSIZE':>8}{'legacy 帧/s':>14}{'batched 帧/s':>15}{'加速':>8}"
+          f"{'ptime ms':>10}{'legacy CPU%':>13}{'batched CPU%':>14}")
+    for n in (1024, 2048, 4096, 8192):
+        window = np.blackman(n)
+        eng = PanadapterFFT(n, NB_BUFFER, window)
+        data = iq_frame(eng.n_samples, rng, pulses=(n * 3 + n // 4,))
+
+        def legacy(d):
+            return legacy_quantize(legacy_log_power_spectrum(d, n, NB_BUFFER, window))
+
+        old = frames_per_second(legacy, data, seconds)
+        new = frames_per_second(eng.frame, data, seconds)
+        ptime = eng.n_samples / SAMPLE_RATE
+        print(f"{n:>8}{old:>14.1f}{new:>15.1f}{new / old:>7.1f}x{ptime * 1e3:>10.2f}"
+              f"{100 / (old * ptime):>12.1f}%{100 / (new * ptime):>13.1f}%")
+    print("\n说明: CPU% = 单帧耗时 / ptime（nbBuffer/2*FFTSIZE / 采样率），>100% 表示跟不上实时。")
+
+    print(f"\n瀑布帧压缩（{SAMPLE_RATE} sps，200 行）：")
+    print(f"{'FFTSIZE':>8}{'codec':>8}{'B/帧':>10}{'kB/s':>10}{'压缩比':>8}{'编码µs/帧':>12}")
+    for n in (1024, 2048, 4096):
+        rows = waterfall_rows(200, fft_size=n)
+        fps = SAMPLE_RATE / (NB_BUFFER / 2 * n)
+        for codec in ('raw', 'zlib', 'quiet', 'delta'):
+            encode = delta_encoder() if codec == 'delta' else WaterfallEncoder(codec).encode
+            start = time.perf_counter()
+            out = sum(len(encode(row)) for row in rows)
+            cpu = (time.perf_counter() - start) / len(rows)
+            per_frame = out / len(rows)
+            print(f"{n:>8}{codec:>8}{per_frame:>10.0f}{per_frame * fps / 1000:>10.1f}"
+                  f"{len(rows[0]) / per_frame:>8.2f}{cpu * 1e6:>12.1f}")
+
+    print("\n噪声底估计（SpectrumSmoother.process，avg 模式，200 帧）：")
+    print(f"{'FFTSIZE':>8}{'整段 median µs/帧':>18}{'增量 µs/帧':>12}{'估计差 dB':>11}")
+    for n in (1024, 4096, 16384):
+        spectra = -100.0 + rng.standard_normal((200, n)) * 2.0
+        spectra[:, :n // 4] = -40.0
+
+        def run(full_median):
+            smoother = SpectrumSmoother(SmoothingSettings('avg'))
+            start = time.perf_counter()
+            for p in spectra:
+                smoother.process(p)
+                if full_median:
+                    smoother.noise_floor = float(np.median(smoother._floor))
+            return (time.perf_counter() - start) / len(spectra), smoother.noise_floor
+
+        old, old_floor = run(True)
+        new, new_floor = run(False)
+        print(f"{n:>8}{old * 1e6:>18.1f}{new * 1e6:>12.1f}{abs(new_floor - old_floor):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
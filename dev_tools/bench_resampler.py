@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重采样基准：PolyphaseResampler vs 旧实现（盒式平均 / [::ratio] 直接抽取 / _StatefulDecimator）
+
+1. CPU：按 20ms 实时块流式处理 10 秒音频，报告每秒音频耗时
+2. 混叠：48k→16k 下若干带外单音折叠到话音/Opus 带内的残留电平（dBFS，输入 -6dBFS）
+    python dev_tools/bench_resampler.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from resampler import PolyphaseResampler
+from test_resampler import level_db, tone
+
+
+class LegacyStatefulDecimator:
+    """audio_interface._StatefulDecimator 原实现（audio_interface 依赖 pyaudio，此处内联）"""
+
+    def __init__(self, factor=3, cutoff_hz=5500.0, fs=48000.0, ntaps=96):
+        self.factor = factor
+        self._ntaps = ntaps
+        n = np.arange(ntaps) - (ntaps - 1) / 2.0
+        h = 2.0 * cutoff_hz / fs * np.sinc(2.0 * cutoff_hz / fs * n)
+        h *= np.hamming(ntaps)
+        h /= np.sum(h)
+        self._h = h
+        self._state = np.zeros(ntaps - 1)
+        self._phase = 0
+
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        combined = np.concatenate([self._state, x])
+        y = np.convolve(combined, self._h)[self._ntaps - 1: self._ntaps - 1 + x.size]
+        self._state = combined[-(self._ntaps - 1):]
+        out = y[self._phase::self.factor]
+        self._phase = (self._phase - x.size) % self.factor
+        return out
+
+
+class BoxMean:
+    def __init__(self, factor=3):
+        self.factor = factor
+
+    def process(self, x):
+        return x[: x.size // self.factor * self.factor].reshape(-1, self.factor).mean(axis=1)
+
+
+class Stride:
+    def __init__(self, factor=3):
+        self.factor = factor
+
+    def process(self, x):
+        return x[::self.factor]
+
+
+IMPLS = (
+    ('box mean', BoxMean),
+    ('[::3]', Stride),
+    ('_StatefulDecimator', LegacyStatefulDecimator),
+    ('polyphase', lambda: PolyphaseResampler(48000, 16000)),
+)
+
+
+def cpu_per_second(make, block=960, seconds=10):
+    x = np.random.default_rng(0).standard_normal(48000 * seconds).astype(np.float32) * 0.1
+    blocks = np.split(x, x.size // block)
+    rs = make()
+    for b in blocks[:50]:
+        rs.process(b)
+    start = time.perf_counter()
+    for b in blocks:
+        rs.process(b)
+    return (time.perf_counter() - start) / seconds
+
+
+def alias_level(make, freq):
+    rs = make()
+    y = np.asarray(rs.process(tone(freq, 48000)), dtype=np.float64)
+    alias = 16000 - freq if freq < 16000 else freq - 16000
+    return level_db(y[500:], alias, 16000)
+
+
+def main():
+    print("48k→16k 流式（20ms 块）CPU：")
+    print(f"{'实现':<22}{'ms/秒音频':>12}{'CPU%':>8}")
+    for name, make in IMPLS:
+        cpu = cpu_per_second(make)
+        print(f"{name:<22}{cpu * 1e3:>12.3f}{cpu * 100:>7.3f}%")
+
+    tones = (9000, 10000, 12000, 14000, 20000)
+    print("\n带外单音混叠残留（dBFS，越低越好）：")
+    print(f"{'实现':<22}" + "".join(f"{f'{f // 1000}k→{abs(16000 - f) // 1000}k':>12}" for f in tones))
+    for name, make in IMPLS:
+        print(f"{name:<22}" + "".join(f"{alias_level(make, f):>12.1f}" for f in tones))
+
+    print("\n其他比率（polyphase，ms/秒音频）：")
+    for a, b in ((48000, 8000), (16000, 48000), (44100, 16000), (24000, 16000)):
+        block = a // 50
+        x = np.random.default_rng(1).standard_normal(a * 5).astype(np.float32)
+        rs = PolyphaseResampler(a, b)
+        start = time.perf_counter()
+        for i in range(0, x.size, block):
+            rs.process(x[i:i + block])
+        print(f"  {a}->{b}: {(time.perf_counter() - start) / 5 * 1e3:.3f}")
+
+
+if __name__ == "__main__":
+    main()
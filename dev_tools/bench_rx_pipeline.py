@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RX 逐帧 DSP 微基准：旧实现（逐步新建数组 + concatenate 累加）vs RXFramePipeline + SampleRing
+
+每帧依次执行：前处理（去直流/AGC/限幅/Int16）→ WDSP 256 样本分块累加 → Opus 帧累加。
+测量每帧 CPU 时间，以及 tracemalloc 统计的每帧瞬时分配峰值（相对帧前基线的字节数）。
+在树莓派等小主机上运行以确认收益：
+    python dev_tools/bench_rx_pipeline.py [帧数]
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from rx_dsp import RXFramePipeline, SampleRing
+from test_rx_dsp import legacy_frame
+
+WDSP_BLOCK = 256
+OPUS_FRAME = 960  # 只比较累加方式，不含降采样/编码
+
+
+class LegacyPath:
+    def __init__(self, stereo):
+        self.stereo = stereo
+        self.wdsp_buf = np.array([], dtype=np.int16)
+        self.opus_acc = np.array([], dtype=np.int16)
+
+    def step(self, data):
+        pcm = legacy_frame(data, self.stereo, agc=True)
+        self.wdsp_buf = np.concatenate([self.wdsp_buf, pcm])
+        while len(self.wdsp_buf) >= WDSP_BLOCK:
+            block = self.wdsp_buf[:WDSP_BLOCK]
+            self.wdsp_buf = self.wdsp_buf[WDSP_BLOCK:]
+        self.opus_acc = np.concatenate([self.opus_acc, pcm])
+        while len(self.opus_acc) >= OPUS_FRAME:
+            block = self.opus_acc[:OPUS_FRAME]
+            self.opus_acc = self.opus_acc[OPUS_FRAME:]
+
+
+class PipelinePath:
+    def __init__(self, stereo):
+        self.pipe = RXFramePipeline(960, stereo=stereo)
+        self.wdsp_ring = SampleRing(8192)
+        self.wdsp_block = np.zeros(WDSP_BLOCK, dtype=np.int16)
+        self.opus_ring = SampleRing(4096)
+        self.opus_block = np.zeros(OPUS_FRAME, dtype=np.int16)
+
+    def step(self, data):
+        pcm = self.pipe.process(data, agc=True)
+        self.wdsp_ring.write(pcm)
+        while len(self.wdsp_ring) >= WDSP_BLOCK:
+            self.wdsp_ring.read_into(self.wdsp_block)
+        self.opus_ring.write(pcm)
+        while len(self.opus_ring) >= OPUS_FRAME:
+            self.opus_ring.read_into(self.opus_block)
+
+
+def make_frames(n, stereo):
+    """语音级电平为主（0.02~0.5），夹杂少量过载帧，接近实际短波接收"""
+    rng = np.random.default_rng(1)
+    ch = 2 if stereo else 1
+    t = np.arange(960 * ch, dtype=np.float32)
+    frames = []
+    for i in range(n):
+        amp = 1.3 if i % 20 == 0 else rng.uniform(0.02, 0.5)
+        x = amp * np.sin(t * rng.uniform(0.02, 0.3)) + 0.05 * rng.standard_normal(t.size)
+        frames.append(x.astype(np.float32).tobytes())
+    return frames
+
+
+def measure(cls, frames, stereo):
+    path = cls(stereo)
+    for data in frames[:50]:  # 预热
+        path.step(data)
+    start = time.perf_counter()
+    for data in frames:
+        path.step(data)
+    cpu = (time.perf_counter() - start) / len(frames)
+
+    tracemalloc.start()
+    transient = 0
+    sample = frames[:200]
+    for data in sample:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        path.step(data)
+        transient += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return cpu, transient / len(sample)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    print(f"RX 逐帧流水线基准：{n} 帧 × 960 样本（20ms @48kHz）")
+    print(f"{'模式':<10}{'实现':<12}{'µs/帧':>10}{'CPU%':>8}{'瞬时分配B/帧':>16}")
+    for stereo in (False, True):
+        frames = make_frames(n, stereo)
+        for name, cls in (('legacy', LegacyPath), ('pipeline', PipelinePath)):
+            cpu, transient = measure(cls, frames, stereo)
+            print(f"{'stereo' if stereo else 'mono':<10}{name:<12}{cpu * 1e6:>10.1f}"
+                  f"{cpu / 0.020 * 100:>7.2f}%{transient:>16.0f}")
+    print("\n说明: CPU% = 每帧耗时 / 20ms 帧周期；瞬时分配为单帧内 tracemalloc 峰值减帧前基线。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WDSP 调用开销基准：逐缓冲 process() vs 整块 process_block()
+
+捕获线程每帧（20ms）凑出若干个 WDSP 缓冲。旧路径每个缓冲调用一次 process()：
+int16→float64、交织 I/Q、构造 ctypes 参数、fexchange0、复制 I 通道、软削波、回转 int16；
+新路径一次 process_block() 对整块完成这些步骤，循环内只剩 fexchange0。
+报告每秒音频的包装层耗时（µs/s 音频）与两条路径输出是否逐样本一致。
+
+有 libwdsp 时测真实 fexchange0（含 DSP 本身）；没有时以空交换（ctypes.memmove 回写
+输入）代替，只测包装层 + ctypes 往返开销：
+    python dev_tools/bench_wdsp_block.py [秒数]
+"""
+
+import ctypes
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import wdsp_wrapper
+from wdsp_wrapper import WDSPProcessor
+
+FRAME_MS = 20
+HAVE_WDSP = wdsp_wrapper.WDSP_AVAILABLE
+
+
+class _NullExchange:
+    """libwdsp 不可用时的 fexchange0 替身：输出 = 输入（一次 C 级 memmove）"""
+
+    def __init__(self, buffer_size):
+        self.nbytes = buffer_size * 2 * 8
+
+    def fexchange0(self, channel, din, dout, error):
+        ctypes.memmove(dout, din, self.nbytes)
+
+
+def make_processor(rate, buffer_size):
+    if HAVE_WDSP:
+        return WDSPProcessor(sample_rate=rate, buffer_size=buffer_size, enable_nr2=True), 'libwdsp'
+    wdsp_wrapper._wdsp = _NullExchange(buffer_size)
+    wdsp_wrapper.WDSP_AVAILABLE = True
+    proc = object.__new__(WDSPProcessor)
+    proc.sample_rate = rate
+    proc.buffer_size = buffer_size
+    proc.channel = 0
+    proc._initialized = True
+    proc._lock = threading.RLock()
+    proc._in_buffer = np.zeros(buffer_size * 2, dtype=np.float64)
+    proc._out_buffer = np.zeros(buffer_size * 2, dtype=np.float64)
+    proc._block_rows = 0
+    return proc, 'null exchange'
+
+
+def frames(rate, buffer_size, seconds):
+    """按 20ms 帧切分后、每帧可取出的整 WDSP 缓冲块（与捕获线程的环形累加一致）"""
+    rng = np.random.default_rng(2)
+    t = np.arange(int(rate * seconds)) / rate
+    pcm = (8000 * np.sin(2 * np.pi * 700 * t) + 600 * rng.standard_normal(t.size)).astype(np.int16)
+    per_frame = rate * FRAME_MS // 1000
+    out, pending = [], 0
+    for start in range(0, pcm.size - per_frame + 1, per_frame):
+        pending += per_frame
+        n = pending // buffer_size * buffer_size
+        if n:
+            end = start + per_frame
+            out.append(pcm[end - pending:end - pending + n])
+            pending -= n
+    return out
+
+
+def run_legacy(proc, blocks):
+    bs = proc.buffer_size
+    out = []
+    for block in blocks:
+        for k in range(0, block.size, bs):
+            out.append(proc.process(block[k:k + bs]))
+    return out
+
+
+def run_block(proc, blocks):
+    return [proc.process_block(block).copy() for block in blocks]
+
+
+def measure(fn, proc, blocks, audio_seconds):
+    fn(proc, blocks[:20])  # 预热
+    start = time.perf_counter()
+    result = fn(proc, blocks)
+    return (time.perf_counter() - start) / audio_seconds, result
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    print(f"WDSP 包装层开销：{seconds:g} 秒音频，{FRAME_MS}ms 捕获帧")
+    print(f"{'采样率':>8}{'缓冲':>6}{'后端':>16}{'调用/秒':>10}{'逐缓冲 µs/s':>14}{'整块 µs/s':>12}{'加速':>8}{'一致':>6}")
+    for rate, buffer_size in ((48000, 256), (16000, 256), (48000, 512)):
+        proc, backend = make_processor(rate, buffer_size)
+        blocks = frames(rate, buffer_size, seconds)
+        old, a = measure(run_legacy, proc, blocks, seconds)
+        new, b = measure(run_block, proc, blocks, seconds)
+        same = '-' if HAVE_WDSP else np.array_equal(np.concatenate(a), np.concatenate(b))
+        calls = rate / buffer_size
+        print(f"{rate:>8}{buffer_size:>6}{backend:>16}{calls:>10.1f}{old * 1e6:>14.0f}{new * 1e6:>12.0f}"
+              f"{old / new:>7.1f}x{str(same):>6}")
+        if HAVE_WDSP:
+            proc.close()
+        else:
+            proc._initialized = False  # 空交换无通道可关
+    print("\n说明: µs/s = 处理 1 秒音频的包装层耗时；libwdsp 下含 DSP 本身，且两路径共用同一 WDSP 通道"
+          "状态，输出不做逐样本比较。")
+
+
+if __name__ == "__main__":
+    main()
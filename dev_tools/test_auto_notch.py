@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""自动陷波检测与批量陷波库更新回归测试（纯 numpy，假 WDSP 陷波库，无需 libwdsp）
+运行: python dev_tools/test_auto_notch.py
+"""
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import wdsp_wrapper
+from auto_notch import AutoNotchDetector
+from wdsp_wrapper import WDSPProcessor
+
+RATE = 16000
+
+
+def run(detector, x, block=320):
+    """按 20ms 块送入，返回 [(时间 s, 陷波列表)]"""
+    events = []
+    for i in range(0, x.size, block):
+        r = detector.feed(x[i:i + block])
+        if r is not None:
+            events.append((i / detector.rate, r))
+    return events
+
+
+def signal(seconds, tones=(), seed=1):
+    """白噪声 + 若干 (频率, 起, 止) 单音，Int16"""
+    t = np.arange(int(RATE * seconds)) / RATE
+    x = 300 * np.random.default_rng(seed).standard_normal(t.size)
+    for freq, start, stop in tones:
+        x += 1500 * np.sin(2 * np.pi * freq * t) * ((t >= start) & (t < stop))
+    return x.astype(np.int16), t
+
+
+class AutoNotchDetectorTests(unittest.TestCase):
+    def test_steady_carrier_confirmed_then_released(self):
+        x, _ = signal(12, [(1234.5, 1, 6)])
+        events = run(AutoNotchDetector(RATE), x)
+        self.assertEqual(len(events), 2)
+        (t_on, on), (t_off, off) = events
+        self.assertEqual(len(on), 1)
+        self.assertAlmostEqual(on[0], 1234.5, delta=1.0)
+        self.assertTrue(2.5 < t_on < 4.0)   # confirm=8 × 0.25s + 窗口填充
+        self.assertEqual(off, [])
+        self.assertTrue(8.5 < t_off < 10.0)  # release=12 × 0.25s + 窗口清空
+
+    def test_moving_speech_harmonics_are_not_notched(self):
+        t = np.arange(RATE * 8) / RATE
+        f0 = 150 + 40 * np.sin(2 * np.pi * 0.7 * t) + 20 * np.sin(2 * np.pi * 3.1 * t)
+        phase = 2 * np.pi * np.cumsum(f0) / RATE
+        speech = sum(np.sin(k * phase) / k for k in range(1, 15)) * 3000
+        x = (speech + 300 * np.random.default_rng(2).standard_normal(t.size)).astype(np.int16)
+        self.assertEqual(run(AutoNotchDetector(RATE), x), [])
+
+    def test_slow_drift_only_updates_past_tolerance(self):
+        t = np.arange(RATE * 12) / RATE
+        x = (300 * np.random.default_rng(3).standard_normal(t.size)
+             + 1500 * np.sin(2 * np.pi * (700 + 0.5 * t) * t)).astype(np.int16)
+        events = run(AutoNotchDetector(RATE), x)
+        self.assertGreaterEqual(len(events), 2)
+        self.assertLessEqual(len(events), 4)
+        self.assertTrue(all(len(n) == 1 for _, n in events))
+
+    def test_limits_to_strongest_notches(self):
+        x, _ = signal(5, [(f, 0, 5) for f in (500, 900, 1300, 1700, 2100, 2500)])
+        det = AutoNotchDetector(RATE, max_notches=3)
+        run(det, x)
+        self.assertEqual(len(det.notches), 3)
+
+
+class FakeNotchLib:
+    """WDSP NBP 陷波库替身：按位置插入/改写/删除；db 为 (fc, fw)，active 为并行的启用标志"""
+
+    def __init__(self):
+        self.db = []
+        self.active = []
+        self.run = 0
+        self.notches_run = 0
+        self.calls = 0
+
+    def RXANBPGetNumNotches(self, ch, out):
+        out._obj.value = len(self.db)
+
+    def RXANBPAddNotch(self, ch, pos, fc, fw, active):
+        self.calls += 1
+        self.db.insert(pos.value, (fc.value, fw.value))
+        self.active.insert(pos.value, active.value)
+        return pos.value
+
+    def RXANBPEditNotch(self, ch, pos, fc, fw, active):
+        self.calls += 1
+        self.db[pos.value] = (fc.value, fw.value)
+        self.active[pos.value] = active.value
+        return 0
+
+    def RXANBPGetNotch(self, ch, pos, fc, fw, active):
+        fc._obj.value, fw._obj.value = self.db[pos.value]
+        active._obj.value = self.active[pos.value]
+        return 0
+
+    def RXANBPDeleteNotch(self, ch, pos):
+        self.calls += 1
+        del self.db[pos.value]
+        del self.active[pos.value]
+        return 0
+
+    def RXANBPSetRun(self, ch, run):
+        self.run = run.value
+
+    def RXANBPSetNotchesRun(self, ch, run):
+        self.notches_run = run.value
+
+
+class SetAutoNotchesTests(unittest.TestCase):
+    def setUp(self):
+        self.lib = FakeNotchLib()
+        self._saved = wdsp_wrapper._wdsp
+        wdsp_wrapper._wdsp = self.lib
+        proc = object.__new__(WDSPProcessor)
+        proc.channel = 0
+        proc._initialized = True
+        proc._lock = threading.RLock()
+        proc._notches_enabled = False
+        proc._auto_notches = []
+        proc._manual_active = []
+        self.proc = proc
+
+    def tearDown(self):
+        self.proc._initialized = False
+        wdsp_wrapper._wdsp = self._saved
+
+    def test_batch_keeps_manual_notches_and_edits_in_place(self):
+        self.lib.db = [(800.0, 100.0)]  # 操作员手动陷波
+        self.lib.active = [1]
+        self.proc.set_auto_notches([(1000, 60), (1500, 60)])
+        self.assertEqual(self.lib.db, [(800.0, 100.0), (1000.0, 60.0), (1500.0, 60.0)])
+        self.assertEqual(self.lib.run, 1)
+        self.lib.calls = 0
+        self.assertEqual(self.proc.set_auto_notches([(1000, 60), (1500, 60)]), 0)  # 未变化不进入 WDSP
+        self.proc.set_auto_notches([(1010, 60)])
+        self.assertEqual(self.lib.db, [(800.0, 100.0), (1010.0, 60.0)])
+        self.assertEqual(self.lib.calls, 2)  # 改写 1 + 删除 1
+        self.proc.set_auto_notches([])
+        self.assertEqual(self.lib.db, [(800.0, 100.0)])
+        self.assertEqual(self.lib.run, 0)
+
+    def test_nf_switch_toggles_manual_notches_under_auto_notch(self):
+        self.proc.add_notch(800, 100)
+        self.assertEqual(self.lib.active, [0])  # NF 未开启：手动陷波暂不生效
+        self.proc.set_auto_notches([(1000, 60)])
+        self.assertEqual(self.lib.active, [0, 1])  # 开自动陷波不会顺带启用手动陷波
+        self.assertEqual(self.lib.notches_run, 1)
+        self.proc.set_notches_enabled(True)
+        self.assertEqual(self.lib.active, [1, 1])
+        self.proc.add_notch(600, 80, active=0)
+        self.assertEqual(self.lib.active, [0, 1, 1])  # 保留请求的 active=0
+        self.proc.set_notches_enabled(False)
+        self.assertEqual(self.lib.active, [0, 0, 1])  # 自动陷波运行中 NF 仍可关闭
+        self.assertEqual(self.lib.notches_run, 1)
+        self.proc.set_notches_enabled(True)
+        self.assertEqual(self.lib.active, [0, 1, 1])
+        self.proc.set_auto_notches([])
+        self.assertEqual((self.lib.db, self.lib.active), ([(600.0, 80.0), (800.0, 100.0)], [0, 1]))
+        self.assertEqual(self.lib.notches_run, 1)
+        self.proc.set_notches_enabled(False)
+        self.assertEqual((self.lib.active, self.lib.notches_run), ([0, 0], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""CAT 调度器优先级/合并回归测试（假执行器，无需电台）
+运行: python dev_tools/test_cat_scheduler.py
+"""
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cat_scheduler import CATScheduler, LANE_POLL, LANE_PTT, LANE_READ, LANE_SET
+from rigctld_client import RigctldError, RigctldResponse
+
+
+class GatedExecutor:
+    """第一批命令阻塞在 gate 上，便于在队列中堆积请求后观察出队顺序"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.batches = []
+
+    def execute_many(self, commands):
+        if not self.batches:
+            self.batches.append(list(commands))
+            self.gate.wait(2.0)
+        else:
+            self.batches.append(list(commands))
+        return [RigctldResponse(c, values=['1']) for c in commands]
+
+
+class CATSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.executor = GatedExecutor()
+        self.sched = CATScheduler(self.executor, max_batch=3)
+        self.sched.start()
+        # 占住工作线程
+        self.blocker = self.sched.submit('l STRENGTH', LANE_POLL)
+        while not self.executor.batches:
+            time.sleep(0.001)
+
+    def tearDown(self):
+        self.executor.gate.set()
+        self.sched.stop()
+
+    def test_ptt_jumps_ahead_of_polling(self):
+        poll = self.sched.submit('t', LANE_POLL)
+        setf = self.sched.submit('F 7074000', LANE_SET)
+        ptt = self.sched.submit('T 0', LANE_PTT)
+        self.executor.gate.set()
+        for f in (self.blocker, poll, setf, ptt):
+            f.result(timeout=2.0)
+        self.assertEqual(self.executor.batches[1:], [['T 0'], ['F 7074000'], ['t']])
+
+    def test_duplicate_reads_are_coalesced_and_promoted(self):
+        first = self.sched.submit('f', LANE_POLL)
+        other = self.sched.submit('t', LANE_POLL)
+        second = self.sched.submit('f', LANE_READ)
+        self.assertIs(first, second)
+        self.executor.gate.set()
+        first.result(timeout=2.0)
+        other.result(timeout=2.0)
+        # 被读取合并的 'f' 提升优先级，与剩余读通道请求流水线同批发送
+        self.assertEqual(self.executor.batches[1], ['f', 't'])
+        stats = self.sched.stats()
+        self.assertEqual(stats['read']['coalesced'], 1)
+        self.assertEqual(stats['poll']['depth'], 0)
+
+    def test_writes_are_never_batched(self):
+        a = self.sched.submit('F 1', LANE_SET)
+        b = self.sched.submit('F 2', LANE_SET)
+        self.executor.gate.set()
+        a.result(timeout=2.0)
+        b.result(timeout=2.0)
+        self.assertEqual(self.executor.batches[1:], [['F 1'], ['F 2']])
+
+    def test_timed_out_write_is_never_sent(self):
+        with self.assertRaises(RigctldError):
+            self.sched.execute('T 1', LANE_PTT, timeout=0.05)
+        retry = self.sched.submit('T 0', LANE_PTT)
+        self.executor.gate.set()
+        retry.result(timeout=2.0)
+        self.sched.submit('t', LANE_READ).result(timeout=2.0)
+        sent = [c for batch in self.executor.batches for c in batch]
+        self.assertNotIn('T 1', sent)
+        st = self.sched.stats()['ptt']
+        self.assertEqual((st['cancelled'], st['executed'], st['depth']), (1, 1, 0))
+
+    def test_executor_failure_propagates(self):
+        self.executor.gate.set()
+        self.blocker.result(timeout=2.0)
+
+        def boom(commands):
+            raise RigctldError("down")
+        self.executor.execute_many = boom
+        with self.assertRaises(RigctldError):
+            self.sched.execute('f', LANE_READ, timeout=2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
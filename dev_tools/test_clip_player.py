@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Tune/CQ 片段播放回归测试：一次衰减缓存、文件变化重载、上下文与输出流复用、循环/停止、停止不阻塞（假 PyAudio）
+运行: python dev_tools/test_clip_player.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import wave
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from clip_player import ClipCache, ClipPlayer, load_clip
+
+RATE = 8000
+
+
+def write_wav(path, samples, rate=RATE, channels=1):
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype='<i2').tobytes())
+
+
+class FakeStream:
+    def __init__(self, owner, **kw):
+        self.owner = owner
+        self.kw = kw
+        self.active = True
+        self.closed = False
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+        time.sleep(self.owner.write_delay)
+
+    def is_active(self):
+        return self.active
+
+    def stop_stream(self):
+        self.active = False
+
+    def start_stream(self):
+        self.active = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakePyAudio:
+    instances = 0
+
+    def __init__(self):
+        FakePyAudio.instances += 1
+        self.streams = []
+        self.terminated = False
+        self.write_delay = 0.001
+
+    def get_device_count(self):
+        return 2
+
+    def get_device_info_by_index(self, i):
+        return [{'name': 'Built-in Mic', 'maxOutputChannels': 0},
+                {'name': 'USB Audio CODEC', 'maxOutputChannels': 2}][i]
+
+    def get_format_from_width(self, width):
+        return 8
+
+    def open(self, **kw):
+        stream = FakeStream(self, **kw)
+        self.streams.append(stream)
+        return stream
+
+    def terminate(self):
+        self.terminated = True
+
+
+class LoadClipTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'tune.wav')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_attenuation_matches_per_sample_int(self):
+        x = np.array([32767, -32768, 1000, -1000, 19, -19, 0] * 300, dtype=np.int16)
+        write_wav(self.path, x)
+        clip = load_clip(self.path, 0.05, chunk_ms=100)
+        got = np.frombuffer(b''.join(clip.chunks), dtype=np.int16)
+        np.testing.assert_array_equal(got, [int(v * 0.05) for v in x.tolist()])
+        self.assertEqual(clip.frames, x.size)
+        self.assertEqual(len(clip.chunks[0]), RATE // 10 * 2)
+
+    def test_cache_hit_and_reload_on_change(self):
+        write_wav(self.path, np.full(800, 1000))
+        cache = ClipCache()
+        a = cache.get(self.path, 0.6)
+        b = cache.get(self.path, 0.6)
+        self.assertIs(a, b)
+        self.assertEqual((cache.loads, cache.hits), (1, 1))
+        write_wav(self.path, np.full(1600, 2000))
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        c = cache.get(self.path, 0.6)
+        self.assertIsNot(c, a)
+        self.assertEqual(c.frames, 1600)
+        self.assertEqual(cache.loads, 2)
+        # 同文件不同增益各自缓存
+        self.assertIsNot(cache.get(self.path, 0.05), c)
+
+    def test_rejects_non_16bit(self):
+        with wave.open(self.path, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(1)
+            wf.setframerate(RATE)
+            wf.writeframes(bytes(100))
+        with self.assertRaises(ValueError):
+            load_clip(self.path)
+
+
+class ClipPlayerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.tune = os.path.join(self.dir.name, 'tune.wav')
+        self.cq = os.path.join(self.dir.name, 'cq.wav')
+        write_wav(self.tune, np.full(RATE // 4, 500))
+        write_wav(self.cq, np.full(RATE // 2, 700))
+        self.cache = ClipCache()
+        FakePyAudio.instances = 0
+        self.player = ClipPlayer('USB Audio', pa_factory=FakePyAudio)
+
+    def tearDown(self):
+        self.player.close()
+        self.dir.cleanup()
+
+    def wait_done(self, timeout=2.0):
+        end = time.time() + timeout
+        while self.player.is_playing and time.time() < end:
+            time.sleep(0.005)
+
+    def test_one_shot_completes_and_reuses_stream(self):
+        done = []
+        clip = self.cache.get(self.cq, 0.6)
+        for _ in range(3):
+            self.player.play(clip, on_done=done.append)
+            self.wait_done()
+        self.assertEqual(done, [True, True, True])
+        self.assertEqual(FakePyAudio.instances, 1)
+        self.assertEqual(self.player.streams_opened, 1)
+        stream = self.player._p.streams[0]
+        self.assertEqual(stream.kw['output_device_index'], 1)
+        self.assertEqual(b''.join(stream.written), b''.join(clip.chunks) * 3)
+        self.assertFalse(stream.active)  # 播完停流，保留复用
+
+    def test_loop_until_stop(self):
+        done = []
+        clip = self.cache.get(self.tune, 0.05)
+        self.player.play(clip, loop=True, on_done=done.append)
+        while self.player.chunks_written < len(clip.chunks) * 3:
+            time.sleep(0.002)
+        self.player.stop()
+        self.assertTrue(self.player.join(1.0))
+        self.assertEqual(done, [False])
+        written = self.player._p.streams[0].written
+        self.assertEqual(written[:len(clip.chunks) * 2], list(clip.chunks) * 2)
+
+    def test_play_preempts_and_reopens_on_format_change(self):
+        write_wav(self.cq, np.full(RATE, 700), rate=16000)
+        done = []
+        self.player.play(self.cache.get(self.tune, 0.05), loop=True, on_done=lambda c: done.append(('tune', c)))
+        time.sleep(0.01)
+        self.player.play(self.cache.get(self.cq, 0.6), on_done=lambda c: done.append(('cq', c)))
+        self.wait_done()
+        self.assertEqual(done, [('tune', False), ('cq', True)])
+        self.assertEqual(self.player.streams_opened, 2)
+        self.assertTrue(self.player._p.streams[0].closed)
+
+    def test_stop_and_play_do_not_wait_for_blocking_write(self):
+        """stop() / play() 在 IOLoop 调用：不等正在进行的 100ms 块写入"""
+        done = []
+        tune = self.cache.get(self.tune, 0.05)
+        self.player.play(tune, loop=True, on_done=lambda c: done.append(('tune', c)))
+        while self.player.chunks_written < 1:
+            time.sleep(0.002)
+        self.player._p.write_delay = 0.2
+        time.sleep(0.01)  # 播放线程进入慢写
+        t0 = time.monotonic()
+        self.player.stop()
+        self.player.play(tune, loop=True, on_done=lambda c: done.append(('again', c)))
+        self.assertLess(time.monotonic() - t0, 0.05)
+        self.player._p.write_delay = 0.001
+        while self.player.chunks_written < 5:
+            time.sleep(0.002)
+        self.assertEqual(done, [('tune', False)])
+        self.assertEqual(self.player.stats()['playing'], self.tune)  # 旧线程退出不清掉新播放
+        self.player.stop()
+        self.assertTrue(self.player.join(1.0))
+        self.assertEqual(done, [('tune', False), ('again', False)])
+
+    def test_stop_from_on_done_does_not_deadlock(self):
+        clip = self.cache.get(self.cq, 0.6)
+        fired = threading.Event()
+
+        def on_done(completed):
+            self.player.stop()
+            fired.set()
+
+        self.player.play(clip, on_done=on_done)
+        self.assertTrue(fired.wait(2.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""全景频谱批量 FFT 引擎回归测试（与 loadFFTdata 原逐段实现逐 bin 对比，无需 RTL-SDR）
+运行: python dev_tools/test_panadapter.py
+"""
+
+import math
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from panadapter import (FRAME_ZLIB, IQFrameBuffer, PanadapterFFT, PanFrameSlot, PanViewBank, SmoothingSettings, SpectrumSmoother,
+                        WaterfallEncoder, decode_frame, flatten_quiet, negotiate_codec, normalize_view,
+                        range_trailer)
+
+
+def legacy_log_power_spectrum(data, fft_size, n_buffers, window, pulse=10):
+    """loadFFTdata.get_log_power_spectrum 原实现（MRRC 依赖 rtlsdr/tornado，此处内联）"""
+    taper = np.empty(fft_size)
+    for i in range(fft_size):
+        taper[i] = 0.5 * (1. - math.cos((2 * math.pi * i) / (fft_size - 1)))
+    power_spectrum = np.zeros(fft_size)
+    db_adjust = 20. * math.log10(fft_size * 2 ** 15)
+    td_threshold = pulse * np.median(np.abs(data[:fft_size]))
+    nbuf_taken = 0
+    for ic in range(n_buffers - 1):
+        start = ic * int(fft_size / 2)
+        td_segment = data[start:start + fft_size] * window
+        td_segment = np.subtract(td_segment, np.average(td_segment))
+        if np.amax(np.abs(td_segment)) < td_threshold:
+            td_segment *= taper
+            rot = np.fft.fftshift(np.fft.fft(td_segment))
+            nbuf_taken += 1
+            power_spectrum = power_spectrum + np.real(rot * rot.conj())
+    if nbuf_taken > 0:
+        power_spectrum = power_spectrum / nbuf_taken
+    else:
+        power_spectrum = np.ones(fft_size)
+    return 10. * np.log10(power_spectrum) - db_adjust
+
+
+def legacy_quantize(power):
+    """loadFFTdata.getFFT_data 原极值搜索 + FFTmymap 逐 bin 映射"""
+    max_pow, min_pow = -254, 0
+    for dat in power:
+        if dat > max_pow:
+            max_pow = dat
+        elif dat < min_pow:
+            min_pow = dat
+    out = bytearray(int((dat - min_pow) * 255 / (max_pow - min_pow)) for dat in power)
+    return bytes(out) + range_trailer(min_pow, max_pow)
+
+
+def iq_frame(n, rng, pulses=()):
+    t = np.arange(n)
+    x = 300 * np.exp(2j * np.pi * 0.1 * t) + 40 * np.exp(-2j * np.pi * 0.31 * t)
+    x = x + 20 * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+    for pos in pulses:
+        x[pos:pos + 8] += 30000
+    return x
+
+
+class PanadapterFFTTests(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(5)
+
+    def test_matches_legacy_spectrum(self):
+        for n in (1024, 4096):
+            eng = PanadapterFFT(n, 24, np.blackman(n))
+            data = iq_frame(eng.n_samples, self.rng)
+            np.testing.assert_allclose(eng.log_power_spectrum(data),
+                                       legacy_log_power_spectrum(data, n, 24, np.blackman(n)),
+                                       atol=1e-9)
+
+    def test_pulse_segments_are_rejected_like_legacy(self):
+        n = 2048
+        eng = PanadapterFFT(n, 24, np.hanning(n))
+        data = iq_frame(eng.n_samples, self.rng, pulses=(5632, 15872))
+        expected = legacy_log_power_spectrum(data, n, 24, np.hanning(n))
+        np.testing.assert_allclose(eng.log_power_spectrum(data), expected, atol=1e-9)
+        # 每个脉冲落在 2 个重叠段的 1/4、3/4 处（窗值 0.5，仍远超阈值）
+        self.assertEqual(eng.rejected, 4)
+
+    def test_all_segments_rejected_gives_flat_floor(self):
+        n = 1024
+        eng = PanadapterFFT(n, 4)
+        data = np.zeros(eng.n_samples, dtype=np.complex128)
+        power = eng.log_power_spectrum(data)  # 中位数为 0 → 阈值 0 → 全部剔除
+        self.assertTrue(np.all(power == -eng.db_adjust))
+        self.assertEqual(eng.rejected, 3)
+
+    def test_quantize_matches_ffmymap(self):
+        n = 4096
+        eng = PanadapterFFT(n, 24, np.hanning(n))
+        data = iq_frame(eng.n_samples, self.rng)
+        power = eng.log_power_spectrum(data)
+        expected = legacy_quantize(power.copy())
+        self.assertEqual(eng.frame(data), expected)
+        self.assertEqual(len(expected), n + 4)
+
+    def test_non_finite_bins_map_to_floor(self):
+        eng = PanadapterFFT(8, 4)
+        power = np.array([-80.0, -np.inf, -20.0, np.nan, -50.0, -60.0, -70.0, -30.0])
+        bins, lo, hi = eng.quantize(power)
+        self.assertEqual((lo, hi), (-80.0, -20.0))
+        self.assertEqual(bins.tolist(), [0, 0, 255, 0, 127, 85, 42, 212])
+
+
+FS = 960000
+FRAME = 49152  # nbBuffer/2*FFTSIZE
+
+
+def tone_frame(freq, k=0, n=FRAME, amp=0.5):
+    t = np.arange(k * n, (k + 1) * n)
+    rng = np.random.default_rng(k)
+    noise = 0.01 * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+    return amp * np.exp(2j * np.pi * freq / FS * t) + noise
+
+
+class PanViewTests(unittest.TestCase):
+    def test_full_view_is_legacy_frame(self):
+        view = normalize_view(FS, FRAME)
+        self.assertEqual((view.decimation, view.fft_size, view.n_buffers), (1, 4096, 24))
+        bank = PanViewBank(FS, FRAME, np.hamming)
+        bank.subscribe('desk')
+        data = tone_frame(50000)
+        self.assertEqual(bank.process(data)['desk'], PanadapterFFT(4096, 24, np.hamming(4096)).frame(data))
+
+    def test_narrow_span_decimates_and_clamps(self):
+        view = normalize_view(FS, FRAME, offset=470000, span=20000, width=800)
+        self.assertEqual(view.decimation, 16)
+        self.assertEqual(view.offset, (FS - 20000) / 2)  # 不越出 SDR 带宽
+        self.assertLessEqual(view.span, FS / view.decimation * 0.6)
+        self.assertEqual(normalize_view(FS, FRAME, width=10).width, 64)
+
+    def test_identical_views_share_one_stage(self):
+        bank = PanViewBank(FS, FRAME)
+        bank.subscribe('phone', 100000, 50000, 400)
+        bank.subscribe('tablet', 100000, 50000, 400)
+        bank.subscribe('desk', 100000, 50000, 420)  # 同一级（1024 点），不同像素映射
+        self.assertEqual(bank.stats(), {'clients': 3, 'views': 2, 'stages': 1})
+        frames = bank.process(tone_frame(110000))
+        self.assertIs(frames['phone'], frames['tablet'])
+        self.assertEqual(len(frames['phone']), 404)
+        self.assertEqual(len(frames['desk']), 424)
+        # 宽度差异大时需要更多 bin，另起一级
+        self.assertNotEqual(normalize_view(FS, FRAME, 100000, 50000, 1600).stage_key,
+                            normalize_view(FS, FRAME, 100000, 50000, 400).stage_key)
+        bank.unsubscribe('desk')
+        bank.unsubscribe('phone')
+        self.assertEqual(bank.stats(), {'clients': 1, 'views': 1, 'stages': 1})
+        bank.unsubscribe('tablet')
+        self.assertEqual(bank.stats(), {'clients': 0, 'views': 0, 'stages': 0})
+
+    def test_zoomed_view_places_tone_on_expected_pixel(self):
+        bank = PanViewBank(FS, FRAME)
+        view = bank.subscribe('c', offset=-200000, span=20000, width=1000)
+        for k in range(3):  # 抽取滤波器需一两帧填充
+            frames = bank.process(tone_frame(-200000 + 4000, k))
+        px = np.frombuffer(frames['c'][:-4], dtype=np.uint8)
+        expected = (4000 + view.span / 2) / view.span * view.width
+        self.assertLessEqual(abs(int(px.argmax()) - expected), 2)
+        # 视图外的强信号被下变频低通滤除，不出现在窄视图中
+        frames = bank.process(tone_frame(-200000 + 4000, 3) + tone_frame(100000, 3, amp=1.0))
+        px = np.frombuffer(frames['c'][:-4], dtype=np.uint8)
+        self.assertLessEqual(abs(int(px.argmax()) - expected), 2)
+
+
+class IQFrameBufferTests(unittest.TestCase):
+    def test_chunks_are_assembled_into_frames(self):
+        buf = IQFrameBuffer(1000)
+        x = np.arange(2500) + 0j
+        for chunk in np.array_split(x, 7):
+            buf.put(chunk)
+        np.testing.assert_array_equal(buf.get(timeout=0), x[1000:2000])  # 丢旧保新
+        self.assertIsNone(buf.get(timeout=0.01))  # 第三帧未满
+        buf.put(x[:500])
+        np.testing.assert_array_equal(buf.get(timeout=0), np.concatenate([x[2000:], x[:500]]))
+        self.assertEqual(buf.stats(), {'frames_in': 3, 'frames_out': 2, 'dropped': 1, 'errors': 0})
+
+    def test_consumer_frame_is_not_overwritten_while_held(self):
+        buf = IQFrameBuffer(4)
+        buf.put(np.full(4, 1j))
+        held = buf.get(timeout=0)
+        for k in range(5):
+            buf.put(np.full(4, k))
+        np.testing.assert_array_equal(held, np.full(4, 1j))
+        np.testing.assert_array_equal(buf.get(timeout=0), np.full(4, 4))
+        self.assertEqual(buf.dropped, 4)
+
+    def test_slow_consumer_never_sees_torn_frames(self):
+        buf = IQFrameBuffer(512)
+        seen = []
+
+        def consume():
+            while True:
+                frame = buf.get(timeout=0.5)
+                if frame is None:
+                    return
+                seen.append(np.unique(frame.real).size)
+
+        t = threading.Thread(target=consume)
+        t.start()
+        for k in range(400):
+            buf.put(np.full(512, float(k)))  # 每帧一个常数：拼接帧会出现两个值
+        t.join()
+        self.assertTrue(seen)
+        self.assertEqual(set(seen), {1})
+        st = buf.stats()
+        self.assertEqual(st['frames_in'], 400)
+        self.assertEqual(st['frames_out'] + st['dropped'], 400)
+
+
+class PanFrameSlotTests(unittest.TestCase):
+    def test_slow_client_keeps_only_latest_frame(self):
+        slot = PanFrameSlot()
+        for k in range(1000):  # 后台标签页：FFT 线程持续出帧，发送端从未取
+            slot.offer(bytes([k % 256]) * 4100)
+        self.assertEqual(slot.take(0.0), bytes([999 % 256]) * 4100)
+        self.assertIsNone(slot.take(0.1))
+        self.assertEqual(slot.stats(), {'fps': None, 'offered': 1000, 'sent': 1, 'dropped': 999,
+                                        'pending': False})
+
+    def test_frame_rate_cap(self):
+        slot = PanFrameSlot(fps=5)
+        sent = 0
+        ptime = 0.0512  # 4096*12/960000
+        for k in range(200):  # 约 10 秒
+            now = k * ptime
+            slot.offer(b'x')
+            if slot.take(now) is not None:
+                sent += 1
+        self.assertAlmostEqual(sent / (200 * ptime), 5, delta=1.0)
+        self.assertEqual(slot.set_fps(500), 60)
+        self.assertEqual(slot.set_fps(0.2), 1)
+        self.assertIsNone(slot.set_fps(0))
+
+    def test_clear_discards_pending_frame(self):
+        slot = PanFrameSlot()
+        slot.offer(b'old view')
+        slot.clear()
+        self.assertIsNone(slot.take(0.0))
+
+
+def noise_spectra(n_frames, n=1024, floor=-100.0, seed=0):
+    """dB 功率谱序列：噪声底 floor ± 约 1dB 抖动（23 段平均后的典型起伏）"""
+    rng = np.random.default_rng(seed)
+    return floor + rng.standard_normal((n_frames, n))
+
+
+class SpectrumSmootherTests(unittest.TestCase):
+    def test_off_mode_is_legacy_frame(self):
+        eng = PanadapterFFT(1024, 24, np.hamming(1024))
+        smoother = SpectrumSmoother(SmoothingSettings('off'))
+        data = iq_frame(eng.n_samples, np.random.default_rng(4))
+        self.assertEqual(eng.frame(data, smoother), PanadapterFFT(1024, 24, np.hamming(1024)).frame(data))
+        self.assertIsNone(smoother.display_range())
+
+    def test_average_reduces_frame_to_frame_jitter(self):
+        smoother = SpectrumSmoother(SmoothingSettings('avg', alpha=0.1))
+        spectra = noise_spectra(200)
+        out = np.array([smoother.process(p).copy() for p in spectra])
+        self.assertLess(np.std(out[100:] - (-100.0)), 0.35 * np.std(spectra[100:] - (-100.0)))
+        self.assertAlmostEqual(float(out[-1].mean()), -100.0, delta=0.2)
+
+    def test_peak_hold_decays_per_frame(self):
+        settings = SmoothingSettings('peak', decay=0.5)
+        smoother = SpectrumSmoother(settings)
+        base = np.full(64, -100.0)
+        spike = base.copy()
+        spike[10] = -40.0
+        smoother.process(spike)
+        for k in range(1, 21):
+            out = smoother.process(base)
+        self.assertAlmostEqual(out[10], -40.0 - 0.5 * 20)
+        self.assertEqual(out[11], -100.0)
+        # 改设置即清空保持值（所有共享此设置的平滑器）
+        settings.update(mode='avg')
+        self.assertEqual(smoother.process(base)[10], -100.0)
+
+    def test_noise_floor_ignores_signals_and_follows_slowly(self):
+        smoother = SpectrumSmoother(SmoothingSettings('avg'), floor_rise=0.05)
+        spectra = noise_spectra(100)
+        spectra[:, :300] = -40.0  # 约 30% 频段被强信号占满
+        for p in spectra:
+            smoother.process(p)
+        self.assertAlmostEqual(smoother.noise_floor, -101.5, delta=1.5)  # 下包络，略低于均值
+        # 噪声底整体抬高 10dB：估计每帧最多上浮 floor_rise
+        before = smoother.noise_floor
+        for p in noise_spectra(20, floor=-90.0, seed=1):
+            smoother.process(p)
+        self.assertLessEqual(smoother.noise_floor - before, 20 * 0.05 + 1e-9)
+        self.assertGreater(smoother.noise_floor, before)
+
+    def test_incremental_noise_floor_tracks_full_median(self):
+        smoother = SpectrumSmoother(SmoothingSettings('avg'))
+        spectra = noise_spectra(100)
+        spectra[:, :300] = -40.0
+        for p in spectra:
+            smoother.process(p)
+        self.assertAlmostEqual(smoother.noise_floor, float(np.median(smoother._floor)), delta=0.5)
+
+    def test_display_range_does_not_pump(self):
+        smoother = SpectrumSmoother(SmoothingSettings('avg', alpha=1.0), margin=10.0, range_decay=0.2)
+        spectra = noise_spectra(60)
+        ranges = []
+        for k, p in enumerate(spectra):
+            if k % 10 == 0:
+                p[500] = -20.0  # 间歇强信号
+            smoother.process(p)
+            ranges.append(smoother.display_range())
+        lo = [r[0] for r in ranges[5:]]
+        hi = [r[1] for r in ranges[5:]]
+        self.assertLessEqual(max(lo) - min(lo), 1)
+        # 强信号消失后上限只缓慢回落（逐帧 min/max 会在 -20 与约 -97 之间来回跳）
+        self.assertLessEqual(max(hi) - min(hi), 10 * 0.2 + 1)
+        bins, lo0, hi0 = PanadapterFFT(1024, 2).quantize(spectra[-1], ranges[-1])
+        self.assertEqual((lo0, hi0), ranges[-1])
+
+    def test_settings_are_shared_by_all_view_stages(self):
+        settings = SmoothingSettings('off')
+        bank = PanViewBank(FS, FRAME, smoothing=settings)
+        bank.subscribe('wide')
+        bank.subscribe('zoom', offset=100000, span=20000, width=500)
+        bank.process(tone_frame(50000))
+        self.assertEqual(len(bank.stats()['noise_floor']), 2)
+        settings.update(mode='peak', decay=1.0)
+        self.assertTrue(all(s.smoother.settings.mode == 'peak' for s in bank._stages.values()))
+        with self.assertRaises(ValueError):
+            settings.update(mode='max')
+        with self.assertRaises(ValueError):
+            settings.update(alpha=0)
+        self.assertEqual(settings.as_dict(), {'mode': 'peak', 'alpha': 0.25, 'decay': 1.0})
+
+
+def waterfall_rows(n_rows, fft_size=1024, seed=0):
+    """真实感瀑布行：噪声底 + 几个缓慢漂移的载波，经 PanadapterFFT 量化"""
+    rng = np.random.default_rng(seed)
+    eng = PanadapterFFT(fft_size, 24)
+    t = np.arange(eng.n_samples)
+    rows = []
+    for k in range(n_rows):
+        x = 0.01 * (rng.standard_normal(t.size) + 1j * rng.standard_normal(t.size))
+        for f, a in ((0.11, 0.3), (-0.23, 0.05), (0.31 + 0.0005 * k, 0.1)):
+            x = x + a * np.exp(2j * np.pi * f * t)
+        rows.append(eng.frame(x))
+    return rows
+
+
+class WaterfallCodecTests(unittest.TestCase):
+    def test_negotiation_prefers_client_order(self):
+        self.assertEqual(negotiate_codec(['brotli', 'zlib', 'quiet']), 'zlib')
+        self.assertEqual(negotiate_codec(['lz4']), 'raw')
+        self.assertEqual(negotiate_codec(None), 'raw')
+
+    def test_zlib_is_lossless(self):
+        enc = WaterfallEncoder('zlib')
+        for row in waterfall_rows(5):
+            data = enc.encode(row)
+            self.assertEqual(data[0], FRAME_ZLIB)
+            self.assertEqual(decode_frame(data), row)
+        self.assertGreater(enc.stats()['ratio'], 1.5)
+
+    def test_quiet_keeps_signals_and_trailer(self):
+        enc = WaterfallEncoder('quiet')
+        for row in waterfall_rows(5):
+            got = np.frombuffer(decode_frame(enc.encode(row)), dtype=np.uint8)
+            orig = np.frombuffer(row, dtype=np.uint8)
+            self.assertEqual(got[-4:].tobytes(), orig[-4:].tobytes())
+            floor = int(got[:-4].min())
+            # 噪声底以上的 bin 原样保留，以下的统一为分位值
+            above = orig[:-4] >= floor
+            np.testing.assert_array_equal(got[:-4][above], orig[:-4][above])
+            self.assertTrue(np.all(got[:-4][~above] == floor))
+            self.assertGreaterEqual(np.count_nonzero(got[:-4] == floor), 0.7 * (got.size - 4))
+        self.assertGreater(enc.stats()['ratio'], 3.0)
+
+    def test_flatten_quiet_percentile(self):
+        body = np.arange(100, dtype=np.uint8)
+        self.assertEqual(flatten_quiet(body, 75), 74)
+        self.assertEqual(int(body.min()), 74)
+        self.assertEqual(int(body[-1]), 99)
+
+    def test_raw_is_passthrough(self):
+        row = waterfall_rows(1, fft_size=256)[0]
+        self.assertIs(WaterfallEncoder('raw').encode(row), row)
+
+
+if __name__ == "__main__":
+    unittest.main()
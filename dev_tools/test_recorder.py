@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""流式录音写盘回归测试（WAV 增量写入、RX/TX 共享时钟对齐与补静音、有界队列丢块、Ogg 页结构）
+运行: python dev_tools/test_recorder.py
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import wave
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from recorder import StreamingRecorder, ogg_crc
+
+
+class FakeEncoder:
+    """定长假 Opus 包：首 2 字节为帧内首样本，便于校验顺序"""
+
+    def __init__(self, rate, channels):
+        self.calls = 0
+
+    def encode(self, pcm, frame_size):
+        self.calls += 1
+        return pcm[:2] + bytes(298)  # >255 字节，覆盖多段 lacing
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as w:
+        return w.getnchannels(), w.getframerate(), \
+            np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16).reshape(-1, 2)
+
+
+def ogg_pages(data):
+    pages, pos = [], 0
+    while pos < len(data):
+        assert data[pos:pos + 4] == b'OggS'
+        flags, granule, _, seq, crc, nseg = struct.unpack('<BqIIIB', data[pos + 5:pos + 27])
+        lacing = data[pos + 27:pos + 27 + nseg]
+        end = pos + 27 + nseg + sum(lacing)
+        raw = bytearray(data[pos:end])
+        raw[22:26] = b'\0\0\0\0'
+        pages.append({'flags': flags, 'granule': granule, 'seq': seq,
+                      'crc_ok': ogg_crc(bytes(raw)) == crc, 'body': data[pos + 27 + nseg:end]})
+        pos = end
+    return pages
+
+
+T0 = 1000.0
+
+
+def at(pos, rate=16000):
+    """共享时钟位置 pos（样本）对应的时间戳"""
+    return T0 + pos / rate
+
+
+class StreamingRecorderTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self.tmp.name, '14270kHz_20260101_120000')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def recorder(self, **kw):
+        # 固定时钟：start() 时刻为 T0，各块时间戳由测试显式给出
+        return StreamingRecorder(self.base, clock=lambda: T0, **kw).start()
+
+    def test_wav_streams_rx_left_and_tx_right(self):
+        rec = self.recorder()
+        rx = np.arange(3200, dtype=np.int16)
+        for i, chunk in enumerate(np.split(rx, 10)):
+            rec.write_rx(chunk, t=at(320 * (i + 1)))
+            if i == 4:
+                # 500 个 TX 样本在共享时钟 960 处开始（按到达时间顺序入队）
+                rec.write_tx(np.full(500, -7, dtype=np.int16), t=at(960 + 500))
+        path = rec.stop()
+        self.assertTrue(path.endswith('.wav'))
+        ch, rate, frames = read_wav(path)
+        self.assertEqual((ch, rate), (2, 16000))
+        np.testing.assert_array_equal(frames[:, 0], rx)
+        self.assertEqual(int(np.count_nonzero(frames[:, 1] == -7)), 500)
+        self.assertEqual(int(np.flatnonzero(frames[:, 1])[0]), 960)
+        self.assertEqual(rec.stats()['dropped_chunks'], 0)
+
+    def test_ptt_toggles_keep_channels_aligned(self):
+        rec = self.recorder(queue_chunks=1024)  # 测试一次性灌入全部块，队列需容纳
+        # 10 秒连续 RX；TX 只在 2~3 秒、6~6.5 秒发射（20ms 一块），另有 ±3ms 网络抖动
+        rng = np.random.default_rng(0)
+        tx_blocks = [(int(a * 16000), int(b * 16000)) for a, b in ((2, 3), (6, 6.5))]
+        events = [(at(320 * (i + 1)), 'rx', 320 * i) for i in range(500)]
+        for a, b in tx_blocks:
+            for pos in range(a, b, 320):
+                events.append((at(pos + 320) + rng.uniform(-0.003, 0.003), 'tx', pos))
+        for t, kind, pos in sorted(events):
+            pcm = np.full(320, 1 if kind == 'rx' else 2, dtype=np.int16)
+            (rec.write_rx if kind == 'rx' else rec.write_tx)(pcm, t=t)
+        _, _, frames = read_wav(rec.stop())
+        self.assertEqual(len(frames), 160000)
+        self.assertTrue(np.all(frames[:, 0] == 1))
+        tx = np.flatnonzero(frames[:, 1])
+        self.assertEqual(tx.size, 24000)
+        # 每段发射起点误差不超过一块抖动
+        starts = tx[np.r_[0, np.flatnonzero(np.diff(tx) > 1) + 1]]
+        for got, (a, _) in zip(starts, tx_blocks):
+            self.assertLessEqual(abs(int(got) - a), 64)
+
+    def test_rx_gap_is_filled_with_silence_in_place(self):
+        rec = self.recorder()
+        for i in list(range(10)) + list(range(20, 30)):  # 第 10~19 块丢失（采集停顿/队列满）
+            rec.write_rx(np.full(320, 3, dtype=np.int16), t=at(320 * (i + 1)))
+        _, _, frames = read_wav(rec.stop())
+        self.assertEqual(len(frames), 9600)
+        self.assertTrue(np.all(frames[3200:6400, 0] == 0))
+        self.assertTrue(np.all(frames[6400:, 0] == 3))
+        self.assertEqual(rec.stats()['silence_inserted_ms'][0], 200)
+
+    def test_delayed_rx_bursts_keep_capture_alignment(self):
+        """RX DSP 线程停顿 200ms 后成批补处理：按采集时刻打戳，不插静音、TX 不错位"""
+        rec = self.recorder()
+        events = []
+        for i in range(100):
+            t_capture = at(320 * (i + 1))
+            # 第 20~29 块在 DSP 停顿结束（第 30 块采集时刻）才成批送达录音器
+            t_process = at(320 * 31) if 20 <= i < 30 else t_capture
+            events.append((t_process, i, 'rx', t_capture))
+        for pos in range(320 * 40, 320 * 60, 320):
+            events.append((at(pos + 320), -1, 'tx', at(pos + 320)))
+        for _, _, kind, t in sorted(events):
+            pcm = np.full(320, 1 if kind == 'rx' else 2, dtype=np.int16)
+            (rec.write_rx if kind == 'rx' else rec.write_tx)(pcm, t=t)
+        _, _, frames = read_wav(rec.stop())
+        self.assertEqual(len(frames), 32000)
+        self.assertTrue(np.all(frames[:, 0] == 1))
+        self.assertEqual(rec.stats()['silence_inserted_ms'][0], 0)
+        tx = np.flatnonzero(frames[:, 1])
+        self.assertEqual((int(tx[0]), tx.size), (320 * 40, 6400))
+
+    def test_long_gap_does_not_overflow_buffers(self):
+        rec = self.recorder()
+        rec.write_rx(np.ones(320, dtype=np.int16), t=at(320))
+        rec.write_tx(np.ones(320, dtype=np.int16), t=at(16000 * 60))  # 1 分钟后才发射
+        _, _, frames = read_wav(rec.stop())
+        self.assertEqual(len(frames), 16000 * 60)
+        self.assertEqual(int(np.flatnonzero(frames[:, 1])[0]), 16000 * 60 - 320)
+        self.assertEqual(sum(r.overflows for r in rec._rings), 0)
+
+    def test_header_is_valid_while_recording(self):
+        rec = self.recorder(gap_ms=0)
+        rec.write_rx(np.ones(1600, dtype=np.int16), t=at(1600))
+        deadline = time.monotonic() + 2.0
+        while rec.frames_written < 1600 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        _, _, frames = read_wav(rec.path)
+        self.assertEqual(len(frames), 1600)
+        rec.stop()
+
+    def test_tx_after_rx_stops_is_flushed(self):
+        rec = self.recorder()
+        rec.write_rx(np.zeros(320, dtype=np.int16), t=at(320))
+        rec.write_tx(np.full(1000, 5, dtype=np.int16), t=at(1320))
+        _, _, frames = read_wav(rec.stop())
+        self.assertEqual(int(np.count_nonzero(frames[:, 1] == 5)), 1000)
+
+    def test_bounded_queue_drops_instead_of_blocking(self):
+        rec = StreamingRecorder(self.base, queue_chunks=4)  # 写线程未启动，队列不消费
+        for _ in range(10):
+            rec.write_rx(np.zeros(320, dtype=np.int16))
+        self.assertEqual(rec.dropped_chunks, 6)
+        self.assertIsNone(rec.stop())
+        self.assertFalse(os.path.exists(rec.path))
+
+    def test_stop_does_not_report_file_while_writer_is_stuck(self):
+        rec = self.recorder(gap_ms=0)
+        rec.write_rx(np.ones(1600, dtype=np.int16), t=at(1600))
+        deadline = time.monotonic() + 2.0
+        while rec.frames_written < 1600 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        gate = threading.Event()
+        write = rec.sink.write
+
+        def stalled(frames):
+            gate.wait(2.0)
+            write(frames)
+
+        rec.sink.write = stalled
+        rec.write_rx(np.ones(320, dtype=np.int16), t=at(1920))
+        self.assertIsNone(rec.stop(timeout=0.1))
+        gate.set()
+        rec._thread.join(2.0)
+        self.assertFalse(rec._thread.is_alive())
+
+    def test_ogg_pages_are_well_formed(self):
+        rec = self.recorder(fmt='ogg', encoder_factory=FakeEncoder)
+        for i in range(120):
+            rec.write_rx(np.full(320, i, dtype=np.int16), t=at(320 * (i + 1)))
+        path = rec.stop()
+        self.assertTrue(path.endswith('.ogg'))
+        with open(path, 'rb') as f:
+            pages = ogg_pages(f.read())
+        self.assertTrue(all(p['crc_ok'] for p in pages))
+        self.assertEqual([p['seq'] for p in pages], list(range(len(pages))))
+        self.assertTrue(pages[0]['body'].startswith(b'OpusHead'))
+        self.assertEqual(pages[0]['flags'], 0x02)
+        self.assertTrue(pages[1]['body'].startswith(b'OpusTags'))
+        self.assertEqual(pages[-1]['flags'], 0x04)
+        self.assertEqual(pages[-1]['granule'], 120 * 960)
+        self.assertEqual(sum(len(p['body']) for p in pages[2:]), 120 * 300)
+
+    def test_ogg_falls_back_to_wav_without_encoder(self):
+        def broken(rate, channels):
+            raise OSError("libopus not found")
+        rec = StreamingRecorder(self.base, fmt='ogg', encoder_factory=broken)
+        self.assertTrue(rec.path.endswith('.wav'))
+        rec.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""rigctld 长连接会话层回归测试（本地假 rigctld，无需电台）
+运行: python dev_tools/test_rigctld_client.py
+"""
+
+import socket
+import socketserver
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rigctld_client import RigctldError, RigctldPool, RigctldSession, parse_extended_response
+
+
+class FakeRigctld(socketserver.ThreadingTCPServer):
+    """按 rigctld 扩展协议应答 f/F/m/t/T/l 的最小假服务器"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRigctldHandler)
+        self.freq = 14074000
+        self.ptt = 0
+        self.connections = 0
+        self.drop_after = None  # 处理 N 条命令后主动断开
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class FakeRigctldHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        srv = self.server
+        srv.connections += 1
+        handled = 0
+        for raw in self.rfile:
+            line = raw.decode().strip()
+            assert line.startswith('+'), line
+            parts = line[1:].split()
+            cmd, args = parts[0], parts[1:]
+            if cmd == 'f':
+                out = f"get_freq:\nFrequency: {srv.freq}\nRPRT 0\n"
+            elif cmd == 'F':
+                srv.freq = int(args[0])
+                out = f"set_freq: {args[0]}\nRPRT 0\n"
+            elif cmd == 'm':
+                out = "get_mode:\nMode: USB\nPassband: 2400\nRPRT 0\n"
+            elif cmd == 't':
+                out = f"get_ptt:\nPTT: {srv.ptt}\nRPRT 0\n"
+            elif cmd == 'T':
+                srv.ptt = int(args[0])
+                out = f"set_ptt: {args[0]}\nRPRT 0\n"
+            elif cmd == 'l':
+                out = "get_level: STRENGTH\n-12\nRPRT 0\n"
+            else:
+                out = "RPRT -1\n"
+            self.wfile.write(out.encode())
+            handled += 1
+            if srv.drop_after is not None and handled >= srv.drop_after:
+                srv.drop_after = None
+                return
+
+
+class ParseTests(unittest.TestCase):
+    def test_parse_mode_with_fields(self):
+        r = parse_extended_response('m', ['get_mode:', 'Mode: USB', 'Passband: 2400', 'RPRT 0'])
+        self.assertTrue(r.ok)
+        self.assertEqual(r.values, ['USB', '2400'])
+        self.assertEqual(r.fields['Passband'], '2400')
+        self.assertEqual(r.legacy_text(), 'USB\n2400')
+
+    def test_parse_error_reply(self):
+        r = parse_extended_response('l STRENGTH', ['get_level: STRENGTH', 'RPRT -11'])
+        self.assertFalse(r.ok)
+        self.assertEqual(r.legacy_text(), 'RPRT -11')
+
+
+class SessionTests(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeRigctld()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_pipelined_commands_share_one_connection(self):
+        session = RigctldSession('127.0.0.1', self.server.port)
+        responses = session.execute_many(['F 7074000', 'f', 'm', 'l STRENGTH'])
+        self.assertEqual([r.ok for r in responses], [True] * 4)
+        self.assertEqual(responses[1].values, ['7074000'])
+        self.assertEqual(responses[3].values, ['-12'])
+        session.execute('t')
+        self.assertEqual(self.server.connections, 1)
+        session.close()
+
+    def test_reconnects_after_peer_close(self):
+        session = RigctldSession('127.0.0.1', self.server.port)
+        self.server.drop_after = 1
+        self.assertTrue(session.execute('T 1').ok)
+        self.assertEqual(session.execute('t').values, ['1'])
+        self.assertEqual(session.reconnects, 1)
+        session.close()
+
+    def test_pool_records_per_command_stats(self):
+        pool = RigctldPool('127.0.0.1', self.server.port, size=2)
+        for _ in range(3):
+            pool.execute('f')
+        pool.execute('T 0')
+        stats = pool.stats()
+        self.assertEqual(stats['commands']['f']['count'], 3)
+        self.assertEqual(stats['commands']['T']['count'], 1)
+        self.assertEqual(stats['commands']['T']['errors'], 0)
+        pool.close()
+
+    def test_unreachable_daemon_raises(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        pool = RigctldPool('127.0.0.1', port, size=1)
+        with self.assertRaises(RigctldError):
+            pool.execute('f')
+        self.assertEqual(pool.stats()['commands']['f']['errors'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
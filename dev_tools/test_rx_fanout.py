@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""RX 音频推送式分发回归测试（假 IOLoop/假 WebSocket，无需音频设备）
+运行: python dev_tools/test_rx_fanout.py
+"""
+
+import sys
+import unittest
+from concurrent.futures import Future
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rx_fanout import DEFAULT_PROFILE, RXFanout, RXFrameRing, RXTierController, profile_from_request
+
+
+class FakeLoop:
+    """记录 add_callback，run() 时按序执行（模拟 IOLoop 跨线程唤醒）"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback(self, fn):
+        self.callbacks.append(fn)
+
+    def run(self):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
+class FakeSocket:
+    """write_message 返回未完成 Future，complete() 模拟内核缓冲写完"""
+
+    def __init__(self):
+        self.written = []
+        self.pending = []
+
+    def send(self, frame):
+        self.written.append(frame)
+        f = Future()
+        self.pending.append(f)
+        return f
+
+    def complete(self, n=None):
+        n = len(self.pending) if n is None else n
+        for _ in range(n):
+            self.pending.pop(0).set_result(None)
+
+
+class RXFrameRingTests(unittest.TestCase):
+    def test_overwritten_slot_reads_none(self):
+        ring = RXFrameRing(capacity=4)
+        for i in range(6):
+            ring.publish(bytes([i]))
+        self.assertIsNone(ring.read(1))
+        self.assertEqual(ring.read(5)[1], b'\x05')
+        self.assertIsNone(ring.read(6))  # 尚未发布
+
+
+class RXFanoutTests(unittest.TestCase):
+    def setUp(self):
+        self.loop = FakeLoop()
+        self.sock = FakeSocket()
+        self.fanout = RXFanout(self.loop.add_callback, capacity=16, max_backlog=4, max_inflight=2)
+        self.sub = self.fanout.subscribe(self.sock.send)
+
+    def test_burst_coalesces_into_one_wakeup(self):
+        for i in range(3):
+            self.fanout.publish(DEFAULT_PROFILE, bytes([i]))
+        self.assertEqual(len(self.loop.callbacks), 1)
+        self.loop.run()
+        self.assertEqual(self.sock.written, [b'\x00', b'\x01'])  # in-flight 上限 2
+        self.sock.complete()
+        self.assertEqual(self.sock.written, [b'\x00', b'\x01', b'\x02'])
+        self.sock.complete()
+        self.assertEqual(self.sub.stats()['sent'], 3)
+
+    def test_slow_client_skips_ahead_fast_client_unaffected(self):
+        fast = []
+        self.fanout.subscribe(lambda f: fast.append(f))
+        self.fanout.publish(DEFAULT_PROFILE, b'a')
+        self.fanout.publish(DEFAULT_PROFILE, b'b')
+        self.loop.run()  # 慢客户端 a/b 在途未写完
+        for f in (b'c', b'd', b'e', b'f', b'g', b'h'):
+            self.fanout.publish(DEFAULT_PROFILE, f)
+            self.loop.run()
+        self.assertEqual(len(fast), 8)
+        self.assertEqual(self.sub.lag, 6)
+        self.sock.complete(1)
+        stats = self.sub.stats()
+        self.assertEqual(stats['dropped'], 2)
+        self.sock.complete()
+        self.sock.complete()
+        self.sock.complete()
+        self.assertEqual(self.sock.written, [b'a', b'b', b'e', b'f', b'g', b'h'])
+
+    def test_overrun_beyond_ring_capacity_counts_drops(self):
+        self.fanout.publish(DEFAULT_PROFILE, b'a')
+        self.fanout.publish(DEFAULT_PROFILE, b'b')
+        self.loop.run()
+        for i in range(40):
+            self.fanout.publish(DEFAULT_PROFILE, bytes([i]))
+        self.loop.run()
+        self.sock.complete()
+        self.assertEqual(self.sub.stats()['dropped'], 36)
+
+    def test_flush_and_unsubscribe(self):
+        self.fanout.publish(DEFAULT_PROFILE, b'a')
+        self.fanout.flush()
+        self.loop.run()
+        self.assertEqual(self.sock.written, [])
+        self.assertEqual(self.sub.stats()['flushed'], 1)
+        self.fanout.unsubscribe(self.sub)
+        self.fanout.publish(DEFAULT_PROFILE, b'b')
+        self.loop.run()
+        self.assertEqual(self.sock.written, [])
+        self.assertFalse(self.fanout.has_subscribers())
+
+    def test_send_error_closes_subscriber(self):
+        def boom(frame):
+            raise IOError("closed")
+        sub = self.fanout.subscribe(boom)
+        self.fanout.publish(DEFAULT_PROFILE, b'a')
+        self.loop.run()
+        self.fanout.publish(DEFAULT_PROFILE, b'b')
+        self.loop.run()
+        self.assertEqual(sub.stats()['errors'], 1)
+        self.assertEqual(sub.stats()['sent'], 0)
+
+
+class RXProfileTests(unittest.TestCase):
+    def setUp(self):
+        self.loop = FakeLoop()
+        self.fanout = RXFanout(self.loop.add_callback, capacity=16)
+
+    def test_request_parsing_clamps_to_supported_values(self):
+        pcm = profile_from_request({'action': 'set_opus_encode', 'enabled': False, 'rate': 16000, 'frame_dur': 20})
+        self.assertEqual(pcm, DEFAULT_PROFILE)
+        opus = profile_from_request({'enabled': True, 'rate': 15000, 'frame_dur': 25, 'bitrate': 999999})
+        self.assertEqual((opus.codec, opus.rate, opus.frame_dur, opus.bitrate), ('opus', 16000, 20, 64000))
+        self.assertEqual(opus.label, 'opus/16000/20ms/64k')
+
+    def test_each_profile_has_its_own_ring(self):
+        opus = profile_from_request({'enabled': True, 'rate': 16000, 'frame_dur': 20})
+        pcm_out, opus_out = [], []
+        pcm_sub = self.fanout.subscribe(pcm_out.append)
+        opus_sub = self.fanout.subscribe(opus_out.append)
+        self.fanout.resubscribe(opus_sub, opus)
+        self.fanout.subscribe(lambda f: None, opus)
+        self.assertEqual(set(self.fanout.active_profiles()), {DEFAULT_PROFILE, opus})
+        self.fanout.publish(DEFAULT_PROFILE, b'\x00pcm')
+        self.fanout.publish(opus, b'\x01opus')
+        self.loop.run()
+        self.assertEqual(pcm_out, [b'\x00pcm'])
+        self.assertEqual(opus_out, [b'\x01opus'])
+        self.assertEqual(self.fanout.stats()['profiles'][opus.label]['subscribers'], 2)
+
+    def test_last_unsubscribe_retires_profile(self):
+        opus = profile_from_request({'enabled': True})
+        sub = self.fanout.subscribe(lambda f: None, opus)
+        self.fanout.unsubscribe(sub)
+        self.assertEqual(self.fanout.active_profiles(), ())
+        self.fanout.publish(opus, b'late')  # capture 线程迟到的帧直接丢弃
+        self.assertEqual(self.loop.callbacks, [])
+
+
+class RXTierTests(unittest.TestCase):
+    def setUp(self):
+        self.base = profile_from_request({'enabled': True, 'rate': 16000, 'frame_dur': 20})
+
+    def test_ladder_steps_down_with_hold_and_up_after_drain(self):
+        ctl = RXTierController(self.base, down_ms=120, up_ms=40, down_hold=1.0, up_hold=5.0)
+        self.assertEqual([(p.bitrate, p.frame_dur) for p in ctl.tiers],
+                         [(32000, 20), (24000, 20), (16000, 40), (12000, 60)])
+        self.assertEqual(ctl.update(200, 0, now=0.0).bitrate, 24000)
+        self.assertIsNone(ctl.update(200, 0, now=0.5))           # 降级保持期内不连降
+        self.assertEqual(ctl.update(0, 3, now=1.5).bitrate, 16000)  # 新丢帧也触发降级
+        self.assertIsNone(ctl.update(20, 3, now=2.0))
+        self.assertIsNone(ctl.update(80, 3, now=6.0))             # 积压回升打断恢复计时
+        self.assertIsNone(ctl.update(20, 3, now=6.5))
+        self.assertIsNone(ctl.update(20, 3, now=11.0))
+        self.assertEqual(ctl.update(20, 3, now=11.5).bitrate, 24000)
+        self.assertEqual(ctl.changes, 3)
+
+    def test_fanout_moves_congested_client_and_reports_tier(self):
+        clock = [0.0]
+        loop = FakeLoop()
+        fanout = RXFanout(loop.add_callback, capacity=64, max_backlog=10, max_inflight=4,
+                          clock=lambda: clock[0])
+        sock = FakeSocket()
+        reports = []
+        sub = fanout.subscribe(sock.send, on_tier=reports.append)
+        fanout.resubscribe(sub, self.base, adaptive=True)
+        self.assertEqual(reports[-1]['bitrate'], 32000)
+        for i in range(8):  # 4 在途 + 4 积压 = 160ms
+            fanout.publish(self.base, bytes([i]))
+            loop.run()
+        self.assertEqual(reports[-1]['bitrate'], 24000)
+        self.assertEqual(sub.profile.bitrate, 24000)
+        self.assertEqual(set(fanout.active_profiles()), {sub.profile})
+        sock.complete()
+        for t in (1.0, 7.0):
+            clock[0] = t
+            fanout.publish(sub.profile, b'x')
+            loop.run()
+            sock.complete()
+        self.assertEqual(reports[-1]['bitrate'], 32000)
+        self.assertEqual(sub.stats()['tier_changes'], 2)
+
+    def test_dsp_profile_keys_its_own_ring_and_survives_tier_changes(self):
+        from wdsp_pool import DEFAULT_DSP_PROFILE
+        strong = DEFAULT_DSP_PROFILE._replace(nr2_level=4)
+        fanout = RXFanout(FakeLoop().add_callback)
+        a = fanout.subscribe(FakeSocket().send, self.base)
+        b = fanout.subscribe(FakeSocket().send, self.base)
+        fanout.resubscribe(b, self.base._replace(dsp=strong), adaptive=True)
+        self.assertEqual(len(fanout.active_profiles()), 2)
+        self.assertIsNot(a.ring, b.ring)
+        self.assertTrue(all(t.dsp == strong for t in b.tiers.tiers))
+        self.assertIn('@nr2:4', b.profile.label)
+
+    def test_pcm_clients_are_never_adaptive(self):
+        fanout = RXFanout(FakeLoop().add_callback)
+        sub = fanout.subscribe(lambda f: None)
+        fanout.resubscribe(sub, DEFAULT_PROFILE, adaptive=True)
+        self.assertIsNone(sub.tiers)
+
+
+if __name__ == "__main__":
+    unittest.main()
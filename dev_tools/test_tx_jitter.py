@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""TX 抖动缓冲回归测试：重排、迟到、FEC/PLC 隐藏、欠载重缓冲、延迟收敛、话段间停顿（纯 Python，假解码器）
+运行: python dev_tools/test_tx_jitter.py
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tx_jitter import AUDIO, FEC, PLC, TXJitterBuffer, next_frame
+from tx_pipeline import TXFramePipeline
+
+FRAME_MS = 20
+
+
+def pkt(seq):
+    return bytes([seq & 0xFF, 1])
+
+
+class FakeDecoder:
+    """普通解码输出首字节；FEC 输出首字节 - 1（即上一帧）；PLC 输出 -1"""
+
+    def decode_into(self, data, pcm, frame_size, decode_fec=False):
+        pcm[:frame_size] = -1 if data is None else data[0] - (1 if decode_fec else 0)
+        return frame_size
+
+
+def drain(jb, n):
+    return [jb.pop() for _ in range(n)]
+
+
+class TXJitterBufferTests(unittest.TestCase):
+    def make(self, **kw):
+        kw.setdefault('target_ms', 60)
+        return TXJitterBuffer(FRAME_MS, adaptive=False, **kw)
+
+    def test_prebuffer_then_in_order(self):
+        jb = self.make()
+        jb.put(0, pkt(0), now=0.0)
+        jb.put(1, pkt(1), now=0.02)
+        self.assertIsNone(jb.pop())  # 未到 3 帧目标深度
+        jb.put(2, pkt(2), now=0.04)
+        out = drain(jb, 3)
+        self.assertEqual(out, [(AUDIO, pkt(0)), (AUDIO, pkt(1)), (AUDIO, pkt(2))])
+
+    def test_reorder(self):
+        jb = self.make()
+        for s in (0, 2, 1, 3):
+            jb.put(s, pkt(s), now=0.0)
+        self.assertEqual([p for _, p in drain(jb, 4)], [pkt(0), pkt(1), pkt(2), pkt(3)])
+        self.assertEqual(jb.stats()['lost'], 0)
+
+    def test_fec_when_next_present_plc_otherwise(self):
+        jb = self.make(target_ms=100)
+        for s in (0, 2, 5, 6):
+            jb.put(s, pkt(s), now=0.0)
+        # 0 正常；1 缺、2 已到 → FEC(2)；2 正常；3 缺、4 也缺 → PLC；4 缺、5 到 → FEC(5)；5 正常
+        kinds = drain(jb, 6)
+        self.assertEqual(kinds, [(AUDIO, pkt(0)), (FEC, pkt(2)), (AUDIO, pkt(2)), (PLC, None),
+                                 (FEC, pkt(5)), (AUDIO, pkt(5))])
+        st = jb.stats()
+        self.assertEqual((st['lost'], st['concealed'], st['fec'], st['plc']), (3, 3, 2, 1))
+
+    def test_late_and_duplicate(self):
+        jb = self.make(target_ms=20)
+        jb.put(10, pkt(10), now=0.0)
+        jb.put(10, pkt(10), now=0.0)
+        jb.pop()
+        self.assertFalse(jb.put(9, pkt(9), now=0.0))
+        self.assertFalse(jb.put(10, pkt(10), now=0.0))
+        st = jb.stats()
+        self.assertEqual((st['duplicates'], st['late']), (1, 2))
+
+    def test_sequence_wraparound(self):
+        jb = self.make(target_ms=80)
+        seqs = [65534, 65535, 0, 1]
+        for s in seqs:
+            jb.put(s, pkt(s), now=0.0)
+        self.assertEqual([p for _, p in drain(jb, 4)], [pkt(s) for s in seqs])
+        self.assertEqual(jb.stats()['lost'], 0)
+
+    def test_underrun_rebuffers(self):
+        jb = self.make(target_ms=40)
+        jb.put(0, pkt(0), now=0.0)
+        jb.put(1, pkt(1), now=0.0)
+        drain(jb, 2)
+        self.assertIsNone(jb.pop())
+        self.assertEqual(jb.stats()['underruns'], 1)
+        jb.put(2, pkt(2), now=0.0)
+        self.assertIsNone(jb.pop())  # 重新预缓冲到 2 帧
+        jb.put(3, pkt(3), now=0.0)
+        self.assertEqual(jb.pop(), (AUDIO, pkt(2)))
+
+    def test_backlog_trimmed_to_target(self):
+        jb = self.make(target_ms=60)
+        for s in range(20):
+            jb.put(s, pkt(s), now=0.0)
+        # 目标 3 帧 + 2 帧余量：20 帧积压跳到只剩 5 帧再播放
+        self.assertEqual(jb.pop(), (AUDIO, pkt(15)))
+        st = jb.stats()
+        self.assertEqual(st['dropped'], 15)
+        self.assertLessEqual(st['depth_ms'], st['target_ms'] + 2 * FRAME_MS)
+
+    def test_resync_on_large_jump(self):
+        jb = self.make(target_ms=20)
+        jb.put(0, pkt(0), now=0.0)
+        jb.put(5000, pkt(5000), now=0.0)
+        self.assertEqual(jb.stats()['resyncs'], 1)
+        self.assertEqual(jb.pop(), (AUDIO, pkt(5000)))
+
+    def test_adaptive_target_follows_jitter(self):
+        jb = TXJitterBuffer(FRAME_MS, target_ms=40, max_ms=200)
+        rng = np.random.default_rng(1)
+        for s in range(200):
+            jb.put(s, pkt(s), now=s * 0.02 + rng.uniform(0, 0.08))
+            jb.pop()
+        st = jb.stats()
+        self.assertGreater(st['jitter_ms'], 10)
+        self.assertGreater(st['target_ms'], 40)
+        self.assertLessEqual(st['target_ms'], 200)
+
+    def test_delay_spikes_beyond_target_grow_the_buffer(self):
+        """10% 的包延迟 100~150ms（超过 60ms 初始目标）：迟到包计入估计，目标上调后拉伸到位，迟到减少"""
+
+        def run(adaptive):
+            jb = TXJitterBuffer(FRAME_MS, target_ms=60, max_ms=200, adaptive=adaptive)
+            rng = np.random.default_rng(3)
+            arrivals = []
+            for s in range(1500):
+                delay = rng.uniform(0, 0.005)
+                if rng.random() < 0.1:
+                    delay += rng.uniform(0.1, 0.15)
+                arrivals.append((s * 0.02 + delay, s))
+            arrivals.sort()
+            i = 0
+            late_early = None
+            for tick in range(1500):
+                now = tick * 0.02 + 0.01
+                while i < len(arrivals) and arrivals[i][0] <= now:
+                    jb.put(arrivals[i][1], pkt(arrivals[i][1]), now=arrivals[i][0])
+                    i += 1
+                jb.pop()
+                if tick == 500:
+                    late_early = jb.stats()['late']
+            return jb, late_early
+
+        fixed, _ = run(False)
+        jb, late_early = run(True)
+        st = jb.stats()
+        self.assertGreater(jb.target_frames, jb.base_frames)
+        self.assertGreater(st['stretched'], 0)
+        self.assertLess(st['late'] * 4, fixed.stats()['late'])
+        # 目标到位后几乎不再迟到
+        self.assertLessEqual(st['late'] - late_early, 3)
+
+    def test_pause_between_overs_starts_new_talkspurt(self):
+        """两段话之间停顿 5s：停顿不计入抖动，下一段按配置目标（3 帧）起播且不跳帧"""
+        jb = TXJitterBuffer(FRAME_MS, target_ms=60, max_ms=200)
+        rng = np.random.default_rng(2)
+        arrivals = [(s, s * 0.02 + rng.uniform(0, 0.01)) for s in range(100)]
+        arrivals += [(s, 5.0 + s * 0.02 + rng.uniform(0, 0.01)) for s in range(100, 200)]
+        first_audio = None
+        i = 0
+        for tick in range(500):
+            now = tick * 0.02 + 0.015
+            while i < len(arrivals) and arrivals[i][1] <= now:
+                jb.put(arrivals[i][0], pkt(arrivals[i][0]), now=arrivals[i][1])
+                i += 1
+            item = jb.pop()
+            if tick == 99:
+                self.assertEqual(jb.stats()['target_ms'], 60)
+                dropped = jb.stats()['dropped']
+            if item is not None and now > 7.0 and first_audio is None:
+                first_audio = tick
+        self.assertGreaterEqual(jb.stats()['talkspurts'], 1)
+        # 第二段首包约在 7.0s 到达，攒够 3 帧目标深度（~60ms）即起播
+        self.assertLessEqual(first_audio * 0.02 + 0.015 - 7.0, 0.08)
+        self.assertEqual(jb.stats()['dropped'], dropped)
+        self.assertEqual(jb.stats()['target_ms'], 60)
+
+    def test_next_frame_decodes_once_and_conceals(self):
+        dec = FakeDecoder()
+        pipe = TXFramePipeline(dec, 160)
+        seen = []
+        pipe.add_sink('recorder', lambda pcm: seen.append(int(pcm[0])))
+        jb = self.make(target_ms=100)
+        for s in (1, 3):
+            jb.put(s, pkt(s), now=0.0)
+        jb.put(6, pkt(6), now=0.0)
+        frames = [next_frame(jb, pipe) for _ in range(6)]
+        self.assertTrue(all(f is not None for f in frames))
+        self.assertEqual(seen, [1, 2, 3, -1, 5, 6])
+        st = pipe.stats()
+        self.assertEqual((st['packets'], st['decodes'], st['fec_decodes'], st['plc_frames']), (3, 3, 2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""TX 逐包解码一次 + 分发回归测试（纯 numpy，假 Opus 解码器，无需 libopus）
+运行: python dev_tools/test_tx_pipeline.py
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tx_pipeline import TXFramePipeline
+
+FRAME = 320
+
+
+class FakeDecoder:
+    """包内容 = 首字节重复成 PCM，第二字节（非零时）为包含的帧数；记录解码调用次数，
+    b'bad' 抛异常；包长超过 frame_size 时与 libopus 一样报错（OPUS_BUFFER_TOO_SMALL）"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def decode_into(self, data, pcm, frame_size, decode_fec=False):
+        self.calls += 1
+        if data == b'bad':
+            raise ValueError('corrupt packet')
+        n = frame_size if data is None or decode_fec else FRAME * (data[1] if len(data) > 1 and data[1] else 1)
+        if n > frame_size:
+            raise ValueError('buffer too small')
+        pcm[:n] = -1 if data is None else data[0]
+        return n
+
+
+class TXFramePipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.dec = FakeDecoder()
+        self.pipe = TXFramePipeline(self.dec, FRAME, max_frame_size=FRAME * 6)
+        self.seen = {'playback': [], 'analyzer': [], 'recorder': []}
+        for name in self.seen:
+            self.pipe.add_sink(name, self.seen[name].append)
+
+    def test_one_decode_per_packet_shared_view(self):
+        for k in range(1, 11):
+            self.pipe.feed(bytes([k, 0, 0]))
+        st = self.pipe.stats()
+        self.assertEqual(self.dec.calls, 10)
+        self.assertEqual(st['packets'], 10)
+        self.assertEqual(st['decodes'], 10)
+        self.assertEqual(st['samples_out'], 10 * FRAME)
+        for name in self.seen:
+            self.assertEqual(st['sinks'][name], {'calls': 10, 'errors': 0})
+        # 三个 sink 拿到的是同一个视图对象，且指向复用缓冲
+        a, b, c = (self.seen[n][-1] for n in ('playback', 'analyzer', 'recorder'))
+        self.assertIs(a, b)
+        self.assertIs(b, c)
+        self.assertTrue(np.shares_memory(a, self.pipe._pcm))
+        self.assertFalse(a.flags.writeable)
+
+    def test_buffer_reused_and_detach_owns_data(self):
+        first = self.pipe.feed(bytes([7]))
+        kept = self.pipe.detach(first)
+        self.pipe.feed(bytes([9]))
+        self.assertFalse(np.shares_memory(kept, self.pipe._pcm))
+        self.assertTrue(np.all(kept == 7))
+        self.assertTrue(np.all(first == 9))  # 视图被下一包覆盖
+
+    def test_multi_frame_packet_uses_buffer_capacity(self):
+        pcm = self.pipe.feed(bytes([5, 3]))  # 3 帧（60ms）长包
+        self.assertEqual(pcm.size, 3 * FRAME)
+        self.assertTrue(np.all(pcm == 5))
+        self.assertEqual(self.pipe.stats()['decode_errors'], 0)
+        # FEC / PLC 仍按协商帧长恢复一帧
+        self.assertEqual(self.pipe.feed(bytes([6, 3]), fec=True).size, FRAME)
+        self.assertEqual(self.pipe.conceal().size, FRAME)
+
+    def test_decode_error_counted_and_not_dispatched(self):
+        self.assertIsNone(self.pipe.feed(b'bad'))
+        self.pipe.feed(bytes([1]))
+        st = self.pipe.stats()
+        self.assertEqual(st['decode_errors'], 1)
+        self.assertEqual(st['packets'], 2)
+        self.assertEqual(st['sinks']['playback']['calls'], 1)
+
+    def test_sink_error_isolated(self):
+        pipe = TXFramePipeline(FakeDecoder(), FRAME)
+        got = []
+
+        def broken(pcm):
+            raise RuntimeError('device gone')
+
+        pipe.add_sink('playback', broken)
+        pipe.add_sink('recorder', got.append)
+        pipe.feed(bytes([3]))
+        st = pipe.stats()
+        self.assertEqual(st['sinks']['playback'], {'calls': 1, 'errors': 1})
+        self.assertEqual(len(got), 1)
+
+    def test_int16_passthrough_zero_copy(self):
+        pipe = TXFramePipeline(None, FRAME)
+        got = []
+        pipe.add_sink('playback', got.append)
+        raw = np.arange(FRAME, dtype=np.int16).tobytes() + b'\x01'  # 奇数字节尾巴丢弃
+        pipe.feed(raw)
+        st = pipe.stats()
+        self.assertEqual((st['packets'], st['decodes']), (1, 0))
+        np.testing.assert_array_equal(got[0], np.arange(FRAME, dtype=np.int16))
+        self.assertIs(pipe.detach(got[0]), got[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""TX 回调模式播放环回归测试：目标延迟钳位、欠载统计、推送模式有界、供料节拍（纯 numpy，无音频设备）
+运行: python dev_tools/test_tx_playout.py
+"""
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rx_dsp import SampleRing
+from tx_playout import TXPlayoutRing
+
+RATE = 16000
+FRAME = 320      # 20ms
+PERIOD = 160     # 10ms 回调
+
+
+def frame(v):
+    return np.full(FRAME, v, dtype=np.int16)
+
+
+class TXPlayoutRingTests(unittest.TestCase):
+    def test_target_clamped(self):
+        ring = TXPlayoutRing(RATE, 80)
+        self.assertEqual(ring.target_samples, RATE * 80 // 1000)
+        self.assertEqual(ring.set_target(5), 20)
+        self.assertEqual(ring.set_target(10000), 500)
+        self.assertEqual(ring.set_target(40), 40)
+        self.assertEqual(ring.stats()['target_ms'], 40)
+
+    def test_read_order_and_zero_pad(self):
+        ring = TXPlayoutRing(RATE, 40)
+        ring.write(frame(1))
+        ring.write(frame(2))
+        out = [ring.read(PERIOD).copy() for _ in range(5)]
+        self.assertTrue(np.all(out[0] == 1) and np.all(out[1] == 1))
+        self.assertTrue(np.all(out[2] == 2) and np.all(out[3] == 2))
+        self.assertTrue(np.all(out[4] == 0))
+        st = ring.stats()
+        self.assertEqual(st['underruns'], 1)
+        # 空闲时持续输出静音不再计欠载
+        for _ in range(10):
+            ring.read(PERIOD)
+        self.assertEqual(ring.stats()['underruns'], 1)
+
+    def test_partial_underrun(self):
+        ring = TXPlayoutRing(RATE, 40)
+        ring.write(np.ones(PERIOD + 40, dtype=np.int16))
+        ring.read(PERIOD)
+        out = ring.read(PERIOD)
+        self.assertTrue(np.all(out[:40] == 1) and np.all(out[40:] == 0))
+        self.assertEqual(ring.stats()['underrun_ms'], round((PERIOD - 40) * 1000 / RATE, 1))
+
+    def test_push_mode_latency_bounded(self):
+        ring = TXPlayoutRing(RATE, 40)
+        for v in range(30):
+            ring.write(frame(v))
+        self.assertLessEqual(len(ring), ring.target_samples + FRAME)
+        self.assertGreater(ring.stats()['overflow_ms'], 0)
+        # 留下最新的 目标(2 帧) + 1 帧
+        self.assertEqual(int(ring.read(PERIOD)[0]), 27)
+
+    def test_need_and_wait_for_space(self):
+        ring = TXPlayoutRing(RATE, 40)
+        self.assertTrue(ring.wait_for_space(0.0))
+        ring.write(frame(1))
+        ring.write(frame(1))
+        self.assertLessEqual(ring.need(), 0)
+        self.assertFalse(ring.wait_for_space(0.01))
+        ring.read(PERIOD)
+        self.assertTrue(ring.wait_for_space(0.0))
+
+    def test_fill_measurement_and_dac(self):
+        ring = TXPlayoutRing(RATE, 80)
+        for _ in range(4):
+            ring.write(frame(5))
+        ring.read(PERIOD, dac_delay=0.03)
+        st = ring.stats()
+        self.assertEqual(st['fill_ms'], 80.0)
+        self.assertEqual(st['fill_max_ms'], 80.0)
+        self.assertGreater(st['dac_ms'], 0)
+        self.assertEqual(ring.stats()['fill_max_ms'], 0.0)  # 区间统计已清零
+
+    def test_feeder_keeps_fill_near_target(self):
+        """模拟回调线程按 10ms 取数、供料线程按需补帧：环深度始终不超过 目标 + 1 帧"""
+        for target in (40, 80, 120):
+            ring = TXPlayoutRing(RATE, target)
+            stop = threading.Event()
+            fills = []
+
+            def feeder():
+                while not stop.is_set():
+                    if ring.wait_for_space(0.05):
+                        ring.write(frame(1))
+
+            t = threading.Thread(target=feeder, daemon=True)
+            t.start()
+            for _ in range(200):
+                while ring.need() > 0 and not stop.is_set():
+                    stop.wait(0.0005)
+                fills.append(len(ring))
+                ring.read(PERIOD)
+            stop.set()
+            t.join(1.0)
+            self.assertLessEqual(max(fills), ring.target_samples + FRAME)
+            self.assertGreaterEqual(min(fills), ring.target_samples)
+            self.assertEqual(ring.stats()['underruns'], 0)
+
+
+class SampleRingDiscardTests(unittest.TestCase):
+    def test_discard_oldest(self):
+        ring = SampleRing(8)
+        ring.write(np.arange(6, dtype=np.int16))
+        self.assertEqual(ring.discard(4), 4)
+        out = np.zeros(2, dtype=np.int16)
+        np.testing.assert_array_equal(ring.read_into(out), [4, 5])
+        self.assertEqual(ring.overflows, 4)
+        self.assertEqual(ring.discard(3), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
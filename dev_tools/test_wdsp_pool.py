@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""按 DSP 档位共享的 WDSP 通道池回归测试（假处理器，无需 libwdsp）
+运行: python dev_tools/test_wdsp_pool.py
+"""
+
+import configparser
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from wdsp_pool import (DEFAULT_DSP_PROFILE, WDSPChannelPool, WDSPSettings, apply_dsp_profile,
+                       dsp_profile_from_request, wdsp_config_from_section)
+
+
+class FakeProcessor:
+    """记录 setter 调用的 WDSPProcessor 替身"""
+
+    def __init__(self, channel, profile):
+        self.channel = channel
+        self.profile = profile
+        self.calls = []
+        self.closed = False
+
+    def set_nr2_level(self, level):
+        self.calls.append(('nr2', level))
+
+    def set_nb_enabled(self, on):
+        self.calls.append(('nb', on))
+
+    def set_anf_enabled(self, on):
+        self.calls.append(('anf', on))
+
+    def set_agc_mode(self, mode):
+        self.calls.append(('agc', mode))
+
+    def set_bandpass(self, low, high):
+        self.calls.append(('bp', low, high))
+
+    def close(self):
+        self.closed = True
+
+
+class DSPProfileTests(unittest.TestCase):
+    def test_config_maps_disabled_nr2_to_level_zero(self):
+        parser = configparser.ConfigParser()
+        parser.read_string("[WDSP]\nnr2_enabled = False\nnr2_level = 3\nagc_mode = 2\n"
+                           "bandpass_low = 200\nbandpass_high = 3000\nsample_rate = 16000\n")
+        cfg = wdsp_config_from_section(parser['WDSP'])
+        self.assertEqual((cfg.sample_rate, cfg.nr2_enabled), (16000, False))
+        p = cfg.profile
+        self.assertEqual(p.nr2_level, 0)
+        self.assertEqual((p.agc_mode, p.bp_low, p.bp_high), (2, 200.0, 3000.0))
+
+    def test_request_overrides_base_and_clamps(self):
+        p = dsp_profile_from_request({'nr2_level': 9, 'anf': 'true', 'bp_high': 99999}, DEFAULT_DSP_PROFILE)
+        self.assertEqual(p.nr2_level, 4)
+        self.assertTrue(p.anf)
+        self.assertEqual(p.nb, DEFAULT_DSP_PROFILE.nb)
+        self.assertEqual(p.bp_high, 6000.0)
+        # 带宽过窄回落到 base 带通
+        p = dsp_profile_from_request({'bp_low': 1000, 'bp_high': 1050}, DEFAULT_DSP_PROFILE)
+        self.assertEqual((p.bp_low, p.bp_high), (DEFAULT_DSP_PROFILE.bp_low, DEFAULT_DSP_PROFILE.bp_high))
+
+    def test_apply_only_changed_fields(self):
+        proc = FakeProcessor(0, DEFAULT_DSP_PROFILE)
+        self.assertEqual(apply_dsp_profile(proc, DEFAULT_DSP_PROFILE), 5)
+        proc.calls.clear()
+        new = DEFAULT_DSP_PROFILE._replace(nr2_level=4)
+        self.assertEqual(apply_dsp_profile(proc, new, DEFAULT_DSP_PROFILE), 1)
+        self.assertEqual(proc.calls, [('nr2', 4)])
+
+
+class WDSPSettingsTests(unittest.TestCase):
+    def test_update_bumps_version_only_on_change(self):
+        settings = WDSPSettings()
+        v0, cfg0 = settings.snapshot()
+        self.assertEqual(settings.update(nr2_level=4, nb_enabled=cfg0.nb_enabled), ('nr2_level',))
+        v1, cfg1 = settings.snapshot()
+        self.assertEqual((v1, cfg1.nr2_level), (v0 + 1, 4))
+        self.assertEqual(cfg0.nr2_level, 2)  # 旧快照不可变
+        self.assertEqual(settings.update(nr2_level=4), ())
+        self.assertEqual(settings.version, v1)
+
+    def test_invalid_update_leaves_snapshot_untouched(self):
+        settings = WDSPSettings()
+        before = settings.snapshot()
+        for bad in ({'agc_mode': 7}, {'bandpass_low': 2650}, {'sample_rate': 8000}, {'nr2_level': 'x'}):
+            with self.assertRaises(ValueError):
+                settings.update(**bad)
+        self.assertIs(settings.snapshot(), before)
+
+    def test_profile_change_retunes_only_changed_setters(self):
+        settings = WDSPSettings()
+        made = []
+        pool = WDSPChannelPool(lambda ch, p: made.append(FakeProcessor(ch, p)) or made[-1])
+        pool.sync([settings.config.profile])
+        old = settings.config.profile
+        settings.update(agc_mode=4)
+        pool.sync([settings.config.profile])
+        self.assertEqual(made[0].calls, [('agc', 4)])
+        self.assertEqual((pool.opened, pool.retuned, pool.setter_calls), (1, 1, 1))
+        self.assertIsNone(pool.get(old))
+
+
+class WDSPChannelPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.made = []
+        self.pool = WDSPChannelPool(self._factory, max_channels=3)
+        self.shared = DEFAULT_DSP_PROFILE
+        self.strong = DEFAULT_DSP_PROFILE._replace(nr2_level=4)
+        self.wide = DEFAULT_DSP_PROFILE._replace(bp_high=3600.0)
+
+    def _factory(self, channel, profile):
+        proc = FakeProcessor(channel, profile)
+        self.made.append(proc)
+        return proc
+
+    def test_same_profile_shares_one_channel(self):
+        self.pool.sync([self.shared, self.strong, self.strong, self.shared])
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(sorted(p.channel for p in self.made), [0, 1])
+        self.pool.sync([self.shared, self.strong])
+        self.assertEqual(self.pool.opened, 2)
+
+    def test_released_channel_is_retuned_not_reopened(self):
+        self.pool.sync([self.shared, self.strong])
+        proc = self.pool.get(self.strong)
+        proc.calls.clear()
+        self.pool.sync([self.shared, self.wide])
+        self.assertIs(self.pool.get(self.wide), proc)
+        self.assertEqual(proc.calls, [('nr2', 2), ('bp', 300.0, 3600.0)])
+        self.assertEqual((self.pool.opened, self.pool.retuned, self.pool.closed), (2, 1, 0))
+
+    def test_unused_channels_close_and_numbers_are_reused(self):
+        self.pool.sync([self.shared, self.strong, self.wide])
+        closed = self.pool.get(self.strong)
+        self.pool.sync([self.shared, self.wide])
+        self.assertTrue(closed.closed)
+        self.pool.sync([self.shared, self.wide, self.strong])
+        self.assertEqual(self.pool.get(self.strong).channel, closed.channel)
+
+    def test_overflow_falls_back_to_shared_profile(self):
+        extra = DEFAULT_DSP_PROFILE._replace(agc_mode=4)
+        self.pool.sync([self.shared, self.strong, self.wide, extra])
+        self.assertEqual(len(self.pool), 3)
+        self.assertIsNone(self.pool.get(extra))
+        self.assertEqual(self.pool.resolve(extra), self.shared)
+        self.assertEqual(self.pool.resolve(self.strong), self.strong)
+        self.assertEqual(self.pool.stats()['overflow'], [extra.label])
+
+    def test_failed_sync_closes_leftover_spares(self):
+        self.pool.sync([self.shared, self.strong, self.wide])
+        strong, wide = self.pool.get(self.strong), self.pool.get(self.wide)
+        extra = DEFAULT_DSP_PROFILE._replace(agc_mode=4)
+
+        def fail(*args):
+            raise RuntimeError('retune failed')
+
+        strong.set_nr2_level = wide.set_nr2_level = fail  # 空闲通道改调失败
+        with self.assertRaises(RuntimeError):
+            self.pool.sync([self.shared, extra])
+        self.assertTrue(strong.closed and wide.closed)
+        self.assertEqual(len(self.pool), 1)
+        # 已关闭的通道号重新可用，不会与仍打开的通道冲突
+        self.pool.sync([self.shared, extra])
+        self.assertEqual(self.pool.get(extra).channel, 1)
+        open_channels = [p.channel for p in self.made if not p.closed]
+        self.assertEqual(sorted(open_channels), [0, 1])
+
+    def test_factory_error_leaves_pool_consistent(self):
+        self.pool.sync([self.shared])
+        made = self._factory
+
+        def factory(channel, profile):
+            if profile == self.wide:
+                raise OSError('OpenChannel failed')
+            return made(channel, profile)
+
+        self.pool._factory = factory
+        with self.assertRaises(OSError):
+            self.pool.sync([self.shared, self.strong, self.wide])
+        self.assertEqual(sorted(self.pool._channels.values()), [0, 1])
+        self.pool._factory = made
+        self.pool.sync([self.shared, self.strong, self.wide])
+        self.assertEqual(sorted(p.channel for p in self.made), [0, 1, 2])
+        self.assertFalse(any(p.closed for p in self.made))
+
+    def test_close_releases_everything(self):
+        self.pool.sync([self.shared, self.strong])
+        self.pool.close()
+        self.assertTrue(all(p.closed for p in self.made))
+        self.assertEqual(len(self.pool), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -150,6 +150,21 @@ def decode(decoder, data, length, frame_size, decode_fec, channels=2):
     return array.array('h', pcm[ :result * channels ]).tobytes()
 
 
+def decode_into(decoder, data, length, pcm, frame_size, decode_fec, channels=2):
+    """Decode an Opus frame into a caller-owned writable int16 buffer (no per-call allocation)
+
+    `pcm` must hold at least `frame_size * channels` int16 samples.
+    Returns the number of decoded samples per channel.
+    """
+
+    pcm_pointer = ctypes.cast((ctypes.c_int16 * (frame_size * channels)).from_buffer(pcm), c_int16_pointer)
+    result = _decode(decoder, data, length, pcm_pointer, frame_size, int(bool(decode_fec)))
+    if result < 0:
+        raise OpusError(result)
+
+    return result
+
+
 _decode_float = libopus.opus_decode_float
 _decode_float.argtypes = (DecoderPointer, ctypes.c_char_p, ctypes.c_int32, c_float_pointer, ctypes.c_int, ctypes.c_int)
 _decode_float.restype = ctypes.c_int
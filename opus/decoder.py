@@ -29,6 +29,11 @@ class Decoder(object):
     def decode(self, data, frame_size, decode_fec=False):
         return decoder.decode(self._state, data, len(data), frame_size, decode_fec, channels=self._channels)
 
+    def decode_into(self, data, pcm, frame_size, decode_fec=False):
+        # data=None signals a lost packet: libopus runs packet loss concealment
+        return decoder.decode_into(self._state, data, len(data) if data else 0, pcm, frame_size, decode_fec,
+                                   channels=self._channels)
+
     def decode_float(self, data, frame_size, decode_fec=False):
         return decoder.decode_float(self._state, data, len(data), frame_size, decode_fec, channels=self._channels)
 
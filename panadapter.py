@@ -0,0 +1,725 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+全景频谱（RTL-SDR panadapter）批量 FFT 引擎
+
+loadFFTdata 原先逐段 Python 循环：每段单独加窗、np.average 去直流、
+np.amax(np.abs()) 判脉冲、fft、fftshift、累加；getFFT_data 再两次遍历 power
+找极值，并对每个 bin 调用一次 FFTmymap（带 try/except）映射为字节。
+FFTSIZE=4096 时每帧约 2.5 万次 Python 级调用。本模块改为整批向量化：
+
+- 50% 重叠的各段以 sliding_window_view 组成 (段数, FFTSIZE) 的跨步视图，不复制
+- 加窗 / 去直流 / 峰值检测一次完成，脉冲段以布尔掩码剔除
+- 保留段一次 np.fft.fft(axis=1)（IQ 为复数，需全谱 fft 而非 rfft），|z|² 沿段求和
+- 量化为 uint8 一步完成；分贝范围尾部（2+2 字节）格式与原协议一致
+
+多分辨率视图（PanViewBank）：客户端请求 offset/span/width，服务端 NCO 下变频 +
+多相抽取后做 FFT，按像素取最大值；相同的下变频级 / 视图在所有客户端间只算一次。
+
+IQ 帧缓冲（IQFrameBuffer）：RTL-SDR 异步回调线程只负责把样本拷进缓冲，FFT 线程
+阻塞等待整帧，USB 读取与 FFT 计算并行，帧节奏由采样时钟决定；处理不过来时丢弃旧帧并计数。
+
+每客户端最新帧槽（PanFrameSlot）：FFT 线程只覆盖一个槽位（丢旧保新），发送协程按
+客户端请求的帧率上限取用；后台标签页或慢速链路不再无限堆积旧帧。
+
+跨帧平滑（SpectrumSmoother）：EMA 平均 / 峰值保持 / 噪声底估计，设置由完整帧与全部
+视图级共享，显示范围随噪声底稳定，不再逐帧按 min/max 重新缩放。
+
+瀑布帧压缩（WaterfallEncoder）：init 握手协商 zlib（无损，前端默认）或 quiet
+（噪声底压平 + deflate，有损，前端需用户显式开启）。
+
+纯 numpy，无 SDR 依赖。基准见 dev_tools/bench_panadapter.py。
+"""
+
+import math
+import threading
+import zlib
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from resampler import PolyphaseResampler
+from rx_dsp import SampleRing
+
+
+def hann_taper(n):
+    """loadFFTdata 原有的附加 Hann 锥形窗（0.5*(1-cos(2πi/(N-1)))）"""
+    return 0.5 * (1.0 - np.cos(2.0 * np.pi * np.arange(n) / (n - 1)))
+
+
+class FrameQuantizer:
+    """功率谱 → uint8 帧的量化器，输出与工作缓冲按 size 一次分配。
+
+    PanadapterFFT 的完整帧与 ViewMapper 的像素帧共用；同一实例只应由一个线程调用，
+    返回的 bins 为内部缓冲视图，下一次 quantize 前有效。
+    """
+
+    def __init__(self, size):
+        self._bytes = np.empty(int(size), dtype=np.uint8)
+        self._scaled = np.empty(int(size), dtype=np.float64)
+
+    def quantize(self, power, display_range=None):
+        """功率谱 → (uint8 bins, min_pow, max_pow)。
+
+        范围与原 getFFT_data 相同：max 不低于 -254，min 不高于 0；
+        线性映射到 0..255 并向下取整（运算顺序同 FFTmymap，边界取整一致）。
+        非有限值（log10(0) 等）记为 0；原实现遇到时整帧丢弃。
+        display_range=(lo, hi) 时使用给定的固定范围（SpectrumSmoother.display_range）。
+        """
+        finite = np.isfinite(power)
+        all_finite = bool(finite.all())
+        vals = power if all_finite else power[finite]
+        if display_range is not None:
+            min_pow, max_pow = display_range
+        else:
+            max_pow = max(-254.0, float(vals.max())) if vals.size else -254.0
+            min_pow = min(0.0, float(vals.min())) if vals.size else 0.0
+        span = max_pow - min_pow
+        out = self._bytes[:power.size]
+        if span <= 0:
+            out.fill(0)
+            return out, min_pow, max_pow
+        scaled = self._scaled[:power.size]
+        np.subtract(power, min_pow, out=scaled)
+        scaled *= 255.0
+        scaled /= span
+        np.clip(scaled, 0, 255, out=scaled)
+        if not all_finite:
+            scaled[~finite] = 0
+        np.copyto(out, scaled, casting='unsafe')
+        return out, min_pow, max_pow
+
+
+class PanadapterFFT:
+    """一帧 IQ 样本 → 平均对数功率谱 → uint8 帧。
+
+    fft_size: FFT 点数；n_buffers: 原 nbBuffer（段数 = n_buffers-1，50% 重叠）；
+    window: 与 fft_size 等长的窗函数（配置 fft_window）；pulse: 脉冲判定倍数。
+    工作缓冲预分配，同一实例只应由一个线程调用。
+    """
+
+    def __init__(self, fft_size, n_buffers=24, window=None, pulse=10):
+        self.fft_size = int(fft_size)
+        self.hop = self.fft_size // 2
+        self.n_segments = n_buffers - 1
+        self.n_samples = self.hop * n_buffers
+        self.pulse = pulse
+        win = np.hanning(self.fft_size) if window is None else np.asarray(window, dtype=np.float64)
+        self.window = win
+        self.taper = hann_taper(self.fft_size)
+        self.db_adjust = 20.0 * math.log10(self.fft_size * 2 ** 15)
+        self._td = np.empty((self.n_segments, self.fft_size), dtype=np.complex128)
+        self._mag = np.empty((self.n_segments, self.fft_size), dtype=np.float64)
+        self._power = np.empty(self.fft_size, dtype=np.float64)
+        self._quantizer = FrameQuantizer(self.fft_size)
+        self.rejected = 0       # 累计剔除的脉冲段数
+        self.frames = 0
+
+    def segments(self, data):
+        """(段数, fft_size) 跨步视图（不复制）"""
+        return sliding_window_view(data, self.fft_size)[::self.hop][:self.n_segments]
+
+    def log_power_spectrum(self, data):
+        """平均对数功率谱（dB，0 频居中，满幅 = 0dB）；返回内部缓冲，下一帧前有效"""
+        data = np.asarray(data)
+        n = self.fft_size
+        segs = self.segments(data)
+        nseg = segs.shape[0]
+        td = self._td[:nseg]
+        mag = self._mag[:nseg]
+
+        # 时域脉冲剔除：以首段中位幅度为基准，峰值超过 pulse 倍的段整段丢弃
+        threshold = self.pulse * np.median(np.abs(data[:n]))
+        np.multiply(segs, self.window, out=td)
+        td -= td.mean(axis=1, keepdims=True)  # 去 0Hz 尖峰
+        np.abs(td, out=mag)
+        keep = mag.max(axis=1) < threshold
+        taken = int(np.count_nonzero(keep))
+        self.rejected += nseg - taken
+        self.frames += 1
+
+        power = self._power
+        if taken:
+            good = td if taken == nseg else td[keep]
+            good *= self.taper
+            spec = np.fft.fft(good, axis=1)
+            np.einsum('ij,ij->j', spec.real, spec.real, out=power)
+            power += np.einsum('ij,ij->j', spec.imag, spec.imag)
+            power /= taken
+        else:
+            power.fill(1.0)  # 无有效段
+        # 0 频移到中间（fftshift）
+        power[:] = np.roll(power, n // 2)
+        with np.errstate(divide='ignore'):
+            np.log10(power, out=power)
+        power *= 10.0
+        power -= self.db_adjust
+        return power
+
+    def quantize(self, power, display_range=None):
+        """功率谱 → (uint8 bins, min_pow, max_pow)，见 FrameQuantizer.quantize"""
+        return self._quantizer.quantize(power, display_range)
+
+    def frame(self, data, smoother=None):
+        """一帧 IQ → 下发给 WS_panFFTHandler 的二进制帧：bins + min/max 尾部"""
+        power = self.log_power_spectrum(data)
+        display_range = None
+        if smoother is not None:
+            power = smoother.process(power)
+            display_range = smoother.display_range()
+        bins, min_pow, max_pow = self.quantize(power, display_range)
+        return bins.tobytes() + range_trailer(min_pow, max_pow)
+
+
+def range_trailer(min_pow, max_pow):
+    """分贝范围尾部：两个 big-endian uint16，值为 65280+int(dB)"""
+    return (65280 + int(min_pow)).to_bytes(2, byteorder="big") + \
+        (65280 + int(max_pow)).to_bytes(2, byteorder="big")
+
+
+# ========== RTL-SDR 读取与 FFT 解耦：有界 IQ 帧缓冲 ==========
+
+class IQFrameBuffer:
+    """单生产者（read_samples_async 回调）/ 单消费者（FFT 线程）的有界 IQ 帧缓冲。
+
+    三个预分配的 frame_samples 长数组：生产者填充一个，就绪帧占一个，FFT 线程持有一个。
+    回调块长与帧长无需一致；凑满一帧即与就绪槽交换并唤醒消费者。就绪帧尚未被取走时
+    被新帧替换（丢旧保新，dropped 计数）。生产者永不阻塞、不拷贝第二次，消费者也
+    不会拿到新旧拼接的帧。get() 返回的数组在下一次 get() 之前有效。
+    """
+
+    def __init__(self, frame_samples, dtype=np.complex128):
+        self.frame_samples = int(frame_samples)
+        self._slots = [np.zeros(self.frame_samples, dtype=dtype) for _ in range(3)]
+        self._write, self._ready, self._held = 0, 1, 2
+        self._fill = 0
+        self._has_ready = False
+        self._cond = threading.Condition()
+        self.frames_in = 0      # 凑满的帧
+        self.frames_out = 0     # 被 FFT 取走的帧
+        self.dropped = 0        # 未被取走即被新帧替换的帧
+        self.errors = 0         # 读取异常（由读取线程累加）
+
+    def put(self, samples):
+        """回调线程调用：追加任意长度的样本块"""
+        samples = np.asarray(samples)
+        pos = 0
+        n = samples.size
+        while pos < n:
+            # 填充槽只有生产者访问，拷贝不持锁
+            take = min(n - pos, self.frame_samples - self._fill)
+            self._slots[self._write][self._fill:self._fill + take] = samples[pos:pos + take]
+            self._fill += take
+            pos += take
+            if self._fill == self.frame_samples:
+                self._fill = 0
+                with self._cond:
+                    self._write, self._ready = self._ready, self._write
+                    self.frames_in += 1
+                    if self._has_ready:
+                        self.dropped += 1
+                    self._has_ready = True
+                    self._cond.notify()
+
+    def get(self, timeout=None):
+        """FFT 线程调用：等待一个完整帧；超时返回 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._has_ready, timeout):
+                return None
+            self._held, self._ready = self._ready, self._held
+            self._has_ready = False
+            self.frames_out += 1
+            return self._slots[self._held]
+
+    def stats(self):
+        with self._cond:
+            return {'frames_in': self.frames_in, 'frames_out': self.frames_out,
+                    'dropped': self.dropped, 'errors': self.errors}
+
+
+# ========== 每客户端帧槽：丢旧保新 + 帧率上限 ==========
+
+FPS_RANGE = (1, 60)
+
+
+class PanFrameSlot:
+    """单个 FFT 客户端的待发帧槽，取代原无界 fftframes 列表。
+
+    offer() 在 FFT 线程调用：槽内旧帧未发出即被替换（dropped 计数）；
+    take(now) 在 IOLoop 调用：距上次发出不足 1/fps 时返回 None，帧留在槽内等待。
+    内存上限为一帧（加上正在写出的一帧）。
+    """
+
+    def __init__(self, fps=None):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._last_sent = None
+        self.fps = None
+        self.offered = 0
+        self.sent = 0
+        self.dropped = 0
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        """帧率上限（帧/秒），0 或 None 为不限；返回规整后的值"""
+        fps = float(fps) if fps else 0.0
+        self.fps = min(max(fps, FPS_RANGE[0]), FPS_RANGE[1]) if fps > 0 else None
+        return self.fps
+
+    def offer(self, frame):
+        with self._lock:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.offered += 1
+
+    def take(self, now):
+        with self._lock:
+            if self._frame is None:
+                return None
+            # 轮询周期与 1/fps 不成整数倍时允许 5% 提前，避免帧率被向下取整
+            if self.fps and self._last_sent is not None and now - self._last_sent < 0.95 / self.fps:
+                return None
+            frame, self._frame = self._frame, None
+            self._last_sent = now
+            self.sent += 1
+            return frame
+
+    def clear(self):
+        with self._lock:
+            self._frame = None
+
+    def stats(self):
+        with self._lock:
+            return {'fps': self.fps, 'offered': self.offered, 'sent': self.sent,
+                    'dropped': self.dropped, 'pending': self._frame is not None}
+
+
+# ========== 跨帧平滑：平均 / 峰值保持 / 噪声底 ==========
+
+FFT_MODES = ('off', 'avg', 'peak')
+FLOOR_DB = -254.0      # 与量化下限一致；log10(0) 等非有限值按此处理
+FLOOR_EVERY = 4        # 噪声底估计每 4 帧更新一次
+FLOOR_STRIDE = 8       # 每次只取 1/8 的 bin（起点轮转，8 次覆盖全部 bin）求中位数
+
+
+class SmoothingSettings:
+    """平滑设置。以引用方式由完整帧和全部视图级的 SpectrumSmoother 共享，
+    一次 update() 对所有客户端同时生效；在 IOLoop 中修改，FFT 线程按 version 感知。
+
+    mode: off（逐帧，与原行为一致）/ avg（dB 域指数平均，alpha 为新帧权重）/
+    peak（峰值保持，每帧回落 decay dB）。
+    """
+
+    def __init__(self, mode='avg', alpha=0.25, decay=0.5):
+        self.mode = 'off'
+        self.alpha = 1.0
+        self.decay = 0.0
+        self.version = 0
+        self.update(mode, alpha, decay)
+
+    def update(self, mode=None, alpha=None, decay=None):
+        mode = self.mode if mode is None else str(mode)
+        alpha = self.alpha if alpha is None else float(alpha)
+        decay = self.decay if decay is None else float(decay)
+        if mode not in FFT_MODES:
+            raise ValueError(f"unknown panadapter mode {mode!r}")
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        if not 0.0 <= decay <= 60.0:
+            raise ValueError(f"decay must be in [0, 60] dB/frame, got {decay}")
+        self.mode, self.alpha, self.decay = mode, alpha, decay
+        self.version += 1
+        return self.as_dict()
+
+    def as_dict(self):
+        return {'mode': self.mode, 'alpha': self.alpha, 'decay': self.decay}
+
+
+class SpectrumSmoother:
+    """一路功率谱的跨帧状态（均为 fft_size 长的数组，逐帧 O(FFTSIZE) 原地更新）。
+
+    噪声底：逐 bin 下包络跟踪（遇更低值立即跟随，否则每帧上浮 floor_rise dB），
+    取各 bin 的中位数，强信号占满部分频段也不会抬高估计。中位数增量计算：每
+    FLOOR_EVERY 帧对 1/FLOOR_STRIDE 的抽样 bin 原地 partition，再做 floor_ema 平滑，
+    不在每帧对整个 FFTSIZE 数组求 np.median（成本见 dev_tools/bench_panadapter.py）。
+    avg/peak 模式下显示范围固定为 [噪声底 - margin, 回落峰值]，不随单帧 min/max 跳变；
+    off 模式沿用原逐帧范围。只应由 FFT 线程调用 process()。
+    """
+
+    def __init__(self, settings=None, floor_rise=0.05, margin=10.0, min_span=30.0, range_decay=0.2,
+                 floor_ema=0.5):
+        self.settings = SmoothingSettings() if settings is None else settings
+        self.floor_rise = floor_rise
+        self.floor_ema = floor_ema
+        self.margin = margin
+        self.min_span = min_span
+        self.range_decay = range_decay
+        self.noise_floor = None
+        self.frames = 0
+        self._version = None
+        self._size = 0
+        self._top = None
+
+    def _reset(self, power):
+        n = power.size
+        if n != self._size:
+            self._size = n
+            self._cur = np.empty(n, dtype=np.float64)
+            self._acc = np.empty(n, dtype=np.float64)
+            self._tmp = np.empty(n, dtype=np.float64)
+            self._floor = np.empty(n, dtype=np.float64)
+            np.fmax(power, FLOOR_DB, out=self._floor)
+            # 太短的谱（小视图）不抽样
+            self._stride = FLOOR_STRIDE if n >= 64 * FLOOR_STRIDE else 1
+            self._sample = np.empty(-(-n // self._stride), dtype=np.float64)
+            self.noise_floor = None
+        np.fmax(power, FLOOR_DB, out=self._acc)
+        self._top = None
+        self._version = self.settings.version
+
+    def process(self, power):
+        """dB 功率谱 → 平滑后的谱（本对象的缓冲，下一帧前有效）"""
+        settings = self.settings
+        if power.size != self._size or self._version != settings.version:
+            self._reset(power)
+        cur = np.fmax(power, FLOOR_DB, out=self._cur)
+        self.frames += 1
+
+        floor = self._floor
+        floor += self.floor_rise
+        np.minimum(floor, cur, out=floor)
+        if self.noise_floor is None or self.frames % FLOOR_EVERY == 0:
+            self._update_noise_floor(floor)
+
+        if settings.mode == 'avg':
+            out = self._acc
+            np.subtract(cur, out, out=self._tmp)
+            self._tmp *= settings.alpha
+            out += self._tmp
+        elif settings.mode == 'peak':
+            out = self._acc
+            out -= settings.decay
+            np.maximum(out, cur, out=out)
+        else:
+            out = cur
+
+        top = float(out.max())
+        self._top = top if self._top is None else max(top, self._top - self.range_decay)
+        return out
+
+    def _update_noise_floor(self, floor):
+        """抽样 bin 的中位数（预分配缓冲内原地 partition），按 floor_ema 平滑进估计"""
+        stride = self._stride
+        picked = floor[(self.frames // FLOOR_EVERY) % stride::stride]
+        sample = self._sample[:picked.size]
+        np.copyto(sample, picked)
+        mid = sample.size // 2
+        sample.partition(mid)
+        median = float(sample[mid])
+        if self.noise_floor is None:
+            self.noise_floor = median
+        else:
+            self.noise_floor += (median - self.noise_floor) * self.floor_ema
+
+    def display_range(self):
+        """(lo, hi) 整数 dB；off 模式或尚无数据时返回 None（按帧 min/max）"""
+        if self.settings.mode == 'off' or self.noise_floor is None:
+            return None
+        lo = math.floor(self.noise_floor - self.margin)
+        hi = max(math.ceil(self._top), lo + math.ceil(self.min_span))
+        return lo, hi
+
+    def stats(self):
+        return dict(self.settings.as_dict(), frames=self.frames,
+                    noise_floor=None if self.noise_floor is None else round(self.noise_floor, 1),
+                    display_range=self.display_range())
+
+
+# ========== 多分辨率视图（服务端缩放：数字下变频 + 抽取 + 按像素出 bin） ==========
+
+MAX_DECIMATION = 256
+VIEW_WIDTH_RANGE = (64, 4096)
+VIEW_FFT_RANGE = (256, 16384)
+# 抽取后可用带宽占比（多相抗混叠低通 -6dB 点在 0.8 奈奎斯特，0.6 以内平坦）
+VIEW_USABLE = 0.6
+
+
+class PanView(namedtuple('PanView', 'offset span width decimation stage_offset fft_size n_buffers')):
+    """规范化后的视图：offset/span 以 Hz 计（相对 SDR 中心频率），width 为像素数。
+
+    decimation/stage_offset/fft_size/n_buffers 决定共享的下变频 + FFT 级；
+    同一级可服务多个 span/width 不同的视图。
+    """
+
+    __slots__ = ()
+
+    @property
+    def stage_key(self):
+        return (self.decimation, self.stage_offset, self.fft_size, self.n_buffers)
+
+    @property
+    def bin_hz(self):
+        return self.span / self.width
+
+    def describe(self):
+        return {'offset': self.offset, 'span': self.span, 'width': self.width,
+                'bin_hz': round(self.bin_hz, 3), 'decimation': self.decimation,
+                'fft_size': self.fft_size}
+
+
+def normalize_view(sample_rate, frame_samples, offset=0.0, span=None, width=None):
+    """客户端请求 → PanView（全部取值规整化，便于相近请求共享同一级）。
+
+    frame_samples: 每帧 IQ 样本数（nbsamples）；抽取后一帧至少要够两个半重叠段。
+    """
+    fs = int(sample_rate)
+    lo_w, hi_w = VIEW_WIDTH_RANGE
+    width = int(min(max(int(width or hi_w), lo_w), hi_w))
+    min_span = fs / MAX_DECIMATION * VIEW_USABLE
+    span = float(fs if span is None else min(max(float(span), min_span), fs))
+    # 视图不得越出 SDR 带宽
+    limit = (fs - span) / 2.0
+    offset = float(min(max(float(offset or 0.0), -limit), limit))
+
+    decimation = 1
+    while (decimation * 2 <= MAX_DECIMATION
+           and span <= fs / (decimation * 2) * VIEW_USABLE
+           and frame_samples // (decimation * 2) >= 2 * VIEW_FFT_RANGE[0]):
+        decimation *= 2
+    band = fs / decimation
+    if decimation == 1:
+        stage_offset = 0.0
+    else:
+        # 下变频中心按 band/16 栅格量化：中心相近的视图共享同一级，残差在可用带内
+        grid = band / 16.0
+        stage_offset = round(offset / grid) * grid
+
+    m = int(frame_samples) // decimation
+    need = width * band / span  # 覆盖 span 需要的 bin 数
+    fft_size = VIEW_FFT_RANGE[0]
+    while fft_size < need and fft_size * 2 <= min(VIEW_FFT_RANGE[1], m):
+        fft_size *= 2
+    n_buffers = max(2, min(48, 2 * m // fft_size))
+    return PanView(offset, span, width, decimation, stage_offset, fft_size, n_buffers)
+
+
+class DDCStage:
+    """一个共享的下变频级：NCO 混频 → 多相低通抽取 → PanadapterFFT。
+
+    decimation == 1 时不混频不抽取，直接对原始 IQ 做 FFT（中心即 SDR 中心）。
+    NCO 相位与抽取滤波状态跨帧连续。smoothing 为共享的 SmoothingSettings 时，
+    本级输出经 SpectrumSmoother 平滑（同级的所有视图共用一份状态）。
+    """
+
+    def __init__(self, view, sample_rate, window_fn=np.hanning, smoothing=None):
+        self.decimation = view.decimation
+        self.offset = view.stage_offset
+        self.sample_rate = int(sample_rate)
+        self.band = self.sample_rate / self.decimation
+        self.engine = PanadapterFFT(view.fft_size, view.n_buffers, window_fn(view.fft_size))
+        self.smoother = SpectrumSmoother(smoothing) if smoothing is not None else None
+        self._phase = 0.0
+        self._osc = None
+        if self.decimation > 1:
+            self._rs = (PolyphaseResampler(self.decimation, 1), PolyphaseResampler(self.decimation, 1))
+            self._ring = SampleRing(self.engine.n_samples * 4, dtype=np.complex128)
+            self._block = np.zeros(self.engine.n_samples, dtype=np.complex128)
+
+    def _mix(self, data):
+        n = data.size
+        if self._osc is None or self._osc.size != n:
+            self._osc = np.exp(-2j * np.pi * self.offset / self.sample_rate * np.arange(n))
+        out = data * self._osc
+        if self._phase:
+            out *= np.exp(-1j * self._phase)
+        self._phase = (self._phase + 2 * np.pi * self.offset / self.sample_rate * n) % (2 * np.pi)
+        return out
+
+    def process(self, data):
+        """输入一帧原始 IQ；返回本级功率谱（dB，0 频居中），样本不足时返回 None"""
+        power = self._spectrum(data)
+        if power is not None and self.smoother is not None:
+            power = self.smoother.process(power)
+        return power
+
+    def display_range(self):
+        return self.smoother.display_range() if self.smoother is not None else None
+
+    def _spectrum(self, data):
+        if self.decimation == 1:
+            return self.engine.log_power_spectrum(data)
+        mixed = self._mix(data) if self.offset else np.asarray(data)
+        re = self._rs[0].process(mixed.real)
+        im = self._rs[1].process(mixed.imag)
+        dec = re + 1j * im
+        self._ring.write(dec)
+        if len(self._ring) < self._block.size:
+            return None
+        # 只算最新一块：多余的旧样本丢弃，保持与原始帧同步
+        while len(self._ring) >= 2 * self._block.size:
+            self._ring.read_into(self._block)
+        self._ring.read_into(self._block)
+        return self.engine.log_power_spectrum(self._block)
+
+
+class ViewMapper:
+    """把级的功率谱裁剪到视图 span 并映射为 width 个像素（像素内取最大值，保留窄峰）"""
+
+    def __init__(self, view, stage):
+        n = stage.engine.fft_size
+        bin_hz = stage.band / n
+        center = n // 2 + (view.offset - stage.offset) / bin_hz
+        half = view.span / bin_hz / 2.0
+        edges = np.linspace(center - half, center + half, view.width + 1)
+        self.starts = np.clip(np.floor(edges[:-1]).astype(np.intp), 0, n - 1)
+        # reduceat 的最后一段延伸到数组末尾，先切到 span 右边界
+        self.stop = int(min(n, max(self.starts[-1] + 1, np.ceil(edges[-1]))))
+        self.view = view
+        self._quantizer = FrameQuantizer(view.width)
+
+    def pixels(self, power):
+        return np.maximum.reduceat(power[:self.stop], self.starts)
+
+    def frame(self, power, display_range=None):
+        bins, min_pow, max_pow = self._quantizer.quantize(self.pixels(power), display_range)
+        return bins.tobytes() + range_trailer(min_pow, max_pow)
+
+
+class PanViewBank:
+    """全部客户端视图的注册表：相同 stage_key 共享一次下变频 + FFT，
+    相同视图共享一次量化成帧。subscribe/unsubscribe 在 IOLoop，process 在 FFT 线程。
+    smoothing: 共享的 SmoothingSettings（None 则不做跨帧平滑）。
+    """
+
+    def __init__(self, sample_rate, frame_samples, window_fn=np.hanning, smoothing=None):
+        self.sample_rate = int(sample_rate)
+        self.frame_samples = int(frame_samples)
+        self.window_fn = window_fn
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._subs = {}       # client -> PanView
+        self._stages = {}     # stage_key -> DDCStage
+        self._mappers = {}    # PanView -> ViewMapper
+
+    def subscribe(self, client, offset=0.0, span=None, width=None):
+        view = normalize_view(self.sample_rate, self.frame_samples, offset, span, width)
+        with self._lock:
+            self._subs[client] = view
+            if view.stage_key not in self._stages:
+                self._stages[view.stage_key] = DDCStage(view, self.sample_rate, self.window_fn,
+                                                        self.smoothing)
+            if view not in self._mappers:
+                self._mappers[view] = ViewMapper(view, self._stages[view.stage_key])
+            self._prune()
+        return view
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._subs.pop(client, None)
+            self._prune()
+
+    def _prune(self):
+        live = set(self._subs.values())
+        for v in [v for v in self._mappers if v not in live]:
+            del self._mappers[v]
+        keys = {v.stage_key for v in live}
+        for k in [k for k in self._stages if k not in keys]:
+            del self._stages[k]
+
+    def __len__(self):
+        return len(self._subs)
+
+    def process(self, data):
+        """一帧原始 IQ → {client: 帧字节}；每个不同的级只算一次，每个不同视图只量化一次"""
+        with self._lock:
+            stages = dict(self._stages)
+            mappers = dict(self._mappers)
+            subs = dict(self._subs)
+        spectra = {key: stage.process(data) for key, stage in stages.items()}
+        frames = {}
+        for view, mapper in mappers.items():
+            power = spectra.get(view.stage_key)
+            if power is not None:
+                frames[view] = mapper.frame(power, stages[view.stage_key].display_range())
+        return {client: frames[view] for client, view in subs.items() if view in frames}
+
+    def stats(self):
+        with self._lock:
+            stages = list(self._stages.values())
+            out = {'clients': len(self._subs), 'views': len(self._mappers), 'stages': len(stages)}
+        if self.smoothing is not None:
+            out['noise_floor'] = {f"{s.decimation}@{s.offset:g}": s.smoother.stats()['noise_floor']
+                                  for s in stages}
+        return out
+
+
+# ========== 瀑布图帧压缩（init 握手协商；未协商的客户端仍收原始帧） ==========
+
+FFT_CODECS = ('quiet', 'zlib', 'raw')
+FRAME_ZLIB = 0x01    # [类型][zlib(完整帧)]
+QUIET_PERCENTILE = 75
+
+
+def negotiate_codec(offered):
+    """客户端按偏好列出的编码 → 双方都支持的第一个；无交集时 'raw'"""
+    for name in offered or ():
+        if name in FFT_CODECS:
+            return name
+    return 'raw'
+
+
+def flatten_quiet(body, percentile=QUIET_PERCENTILE):
+    """把低于本行 percentile 分位的 bin（噪声底）原地抬到该分位值，返回该值。
+
+    噪声底每个 bin 在十来个量化级间随机跳动（约 3.6 bit/bin 熵），是无损压缩的
+    上限所在；压平后静默区成为长游程，deflate 即退化为 RLE。信号（高于分位）不变。
+    """
+    counts = np.cumsum(np.bincount(body, minlength=256))
+    floor = int(np.searchsorted(counts, body.size * percentile / 100.0))
+    np.maximum(body, floor, out=body)
+    return floor
+
+
+class WaterfallEncoder:
+    """单个客户端的帧编码器。
+
+    zlib: 逐帧无损 deflate（约 1.7 倍，前端默认）；quiet: 先压平噪声底再 deflate
+    （约 3.5 倍，有损：低于分位的弱 CW/数字信号痕迹一并抹平，只作为用户显式选择）。相邻行差分实测不优于逐帧压缩（噪声底逐行独立），
+    未采用，见 dev_tools/bench_panadapter.py。
+    """
+
+    def __init__(self, codec='raw', level=1):
+        self.codec = codec
+        self.level = level
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._buf = np.zeros(0, dtype=np.uint8)
+
+    def encode(self, frame):
+        self.bytes_in += len(frame)
+        if self.codec == 'raw':
+            out = frame
+        else:
+            if self.codec == 'quiet':
+                if self._buf.size != len(frame):
+                    self._buf = np.zeros(len(frame), dtype=np.uint8)
+                self._buf[:] = np.frombuffer(frame, dtype=np.uint8)
+                flatten_quiet(self._buf[:-4])  # 末 4 字节为 min/max 尾部
+                frame = self._buf.tobytes()
+            out = bytes((FRAME_ZLIB,)) + zlib.compress(frame, self.level)
+        self.bytes_out += len(out)
+        return out
+
+    def stats(self):
+        return {'codec': self.codec, 'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out,
+                'ratio': round(self.bytes_in / self.bytes_out, 2) if self.bytes_out else None}
+
+
+def decode_frame(data):
+    """参考解码（与 www/panadapter/panfft.js 一致）"""
+    if data[0] != FRAME_ZLIB:
+        raise ValueError(f"unknown waterfall frame type {data[0]}")
+    return zlib.decompress(data[1:])
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式录音写盘（专用写线程，内存有界，停止近乎瞬时）
+
+原实现把整段会话的 RX/TX 块堆在 PyAudioCapture 的类级列表里（仅靠
+RECORDING_MAX_CHUNKS 封顶），停止时 np.concatenate → 补齐 → 交错 → 整段经管道
+交给阻塞的 ffmpeg（30 秒超时）。一小时录音即数百 MB 内存，停止要等数秒到数十秒。
+本模块改为边录边写：
+
+- StreamingRecorder: 音频线程 / IOLoop 只做 put_nowait 入有界队列（满则丢块计数，
+  绝不阻塞音频路径）；写线程按共享样本时钟把 RX/TX 对齐交错成立体声（左 RX /
+  右 TX），空缺当场补静音，增量写入容器
+- WavSink: 标准库 wave，每次写入后回填头部长度，进程中途退出文件仍可播放
+- OggOpusSink: 最小 Ogg 封装（OpusHead/OpusTags + 按约 1 秒成页），opus 编码器
+  不可用时由 open_sink() 回退为 WAV
+- stop(): 投递哨兵，写线程排空（队列有界，至多数秒音频）后关闭文件
+
+纯 numpy + 标准库，无音频设备依赖。测试见 dev_tools/test_recorder.py。
+"""
+
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import wave
+
+import numpy as np
+
+from rx_dsp import SampleRing
+
+logger = logging.getLogger(__name__)
+
+RECORDING_FORMATS = ('wav', 'ogg')
+# 录音文件扩展名 → MIME（.mp3 为旧版 ffmpeg 整段编码的录音，仍可列出/下载）
+RECORDING_EXTENSIONS = {
+    '.wav': 'audio/wav',
+    '.ogg': 'audio/ogg',
+    '.mp3': 'audio/mpeg',
+}
+
+_RX = 0
+_TX = 1
+_STOP = object()
+
+
+def _ogg_crc_table():
+    table = []
+    for i in range(256):
+        r = i << 24
+        for _ in range(8):
+            r = ((r << 1) ^ 0x04C11DB7) if r & 0x80000000 else (r << 1)
+        table.append(r & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC = _ogg_crc_table()
+
+
+def ogg_crc(data):
+    """Ogg 页校验（CRC-32，多项式 0x04C11DB7，不反射，初值 0）"""
+    crc = 0
+    for b in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _OGG_CRC[((crc >> 24) ^ b) & 0xFF]
+    return crc
+
+
+class WavSink:
+    """16-bit PCM WAV 增量写入"""
+
+    extension = '.wav'
+
+    def __init__(self, path, rate, channels=2):
+        self.path = path
+        self._wav = wave.open(path, 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(rate)
+
+    def write(self, frames):
+        """frames: (n, channels) int16，C 连续"""
+        self._wav.writeframes(frames)
+
+    def close(self):
+        self._wav.close()
+
+
+class OggOpusSink:
+    """Opus-in-Ogg 增量写入（RFC 7845 最小实现，单逻辑流）。
+
+    输入按 20ms 切帧编码，凑满 page_packets 个包写一页；granule 以 48kHz 计。
+    encoder_factory(rate, channels) 返回带 encode(pcm_bytes, frame_size) 的对象。
+    """
+
+    extension = '.ogg'
+    PRE_SKIP = 312  # libopus 默认前导延迟（48kHz 样本）
+
+    def __init__(self, path, rate, channels=2, encoder_factory=None, page_packets=50):
+        if encoder_factory is None:
+            from opus.encoder import Encoder as OpusEncoder
+
+            def encoder_factory(r, c):
+                return OpusEncoder(r, c, 'audio')
+        self.path = path
+        self.rate = rate
+        self.channels = channels
+        self.frame_size = rate // 50
+        self._encoder = encoder_factory(rate, channels)
+        self._f = open(path, 'wb')
+        self._serial = int.from_bytes(os.urandom(4), 'little')
+        self._seq = 0
+        self._granule = 0
+        self._page_packets = page_packets
+        self._packets = []
+        self._pending = SampleRing(self.frame_size * channels * 4)
+        self._frame = np.zeros(self.frame_size * channels, dtype=np.int16)
+        head = struct.pack('<8sBBHIhB', b'OpusHead', 1, channels, self.PRE_SKIP, rate, 0, 0)
+        vendor = b'MRRC'
+        tags = b'OpusTags' + struct.pack('<I', len(vendor)) + vendor + struct.pack('<I', 0)
+        self._write_page([head], 0, bos=True)
+        self._write_page([tags], 0)
+
+    def _write_page(self, packets, granule, bos=False, eos=False):
+        lacing = bytearray()
+        for p in packets:
+            lacing.extend(b'\xff' * (len(p) // 255))
+            lacing.append(len(p) % 255)
+        flags = (0x02 if bos else 0) | (0x04 if eos else 0)
+        header = struct.pack('<4sBBqIIIB', b'OggS', 0, flags, granule, self._serial,
+                             self._seq, 0, len(lacing)) + bytes(lacing)
+        body = b''.join(packets)
+        crc = ogg_crc(header + body)
+        self._f.write(header[:22] + struct.pack('<I', crc) + header[26:] + body)
+        self._seq += 1
+
+    def write(self, frames):
+        self._pending.write(frames.reshape(-1))
+        step = self.frame_size * self.channels
+        while len(self._pending) >= step:
+            self._pending.read_into(self._frame)
+            self._packets.append(self._encoder.encode(self._frame.tobytes(), self.frame_size))
+            self._granule += self.frame_size * 48000 // self.rate
+            if len(self._packets) >= self._page_packets:
+                self._write_page(self._packets, self._granule)
+                self._packets = []
+
+    def close(self):
+        # 末帧不足 20ms 时补零编码，保证尾部不丢
+        n = len(self._pending)
+        if n:
+            self._frame[:] = 0
+            self._pending.read_into(self._frame, n)
+            self._packets.append(self._encoder.encode(self._frame.tobytes(), self.frame_size))
+            self._granule += self.frame_size * 48000 // self.rate
+        self._write_page(self._packets, self._granule, eos=True)
+        self._packets = []
+        self._f.close()
+
+
+def open_sink(path_base, fmt, rate, channels=2, encoder_factory=None):
+    """按格式打开容器；ogg 不可用（无 opus 库）时回退 wav"""
+    if fmt == 'ogg':
+        try:
+            return OggOpusSink(path_base + OggOpusSink.extension, rate, channels, encoder_factory)
+        except Exception as e:
+            logger.warning(f"Ogg/Opus 录音不可用，回退 WAV: {e}")
+    return WavSink(path_base + WavSink.extension, rate, channels)
+
+
+class StreamingRecorder:
+    """立体声流式录音器：左声道 RX，右声道 TX，两声道按共享样本时钟对齐。
+
+    write_rx()/write_tx() 线程安全、非阻塞；入队时打上到达时间戳（或由调用方传入
+    t），传入的数组之后不得再修改。写线程把每块映射到共享时钟上的样本位置：
+
+    - 时钟以 RX 已写样本数为主（与声卡采样时钟同步，长时间录音不随系统时钟漂移），
+      RX 锚点之间以到达时间外推；尚无 RX 时退化为自 start() 起的墙钟
+    - 某声道块的预期起点比该声道已写位置超前 gap_ms 以上（RX 采集停顿、队列丢块）
+      时当场插入静音补齐，小于 gap_ms 的抖动连续拼接；空闲声道（PTT 松开后）的
+      下一块按时钟精确落位
+    - 输出推进到两声道中较新者减 gap_ms；空闲声道（未发射时的 TX）补静音跟上
+
+    各声道只在环形缓冲中保留未写出的几十毫秒样本，内存与会话时长无关，停止时也
+    无需整段补齐/交错。
+    """
+
+    def __init__(self, path_base, rate=16000, fmt='wav', queue_chunks=256,
+                 gap_ms=60, encoder_factory=None, clock=time.monotonic):
+        self.rate = rate
+        self.sink = open_sink(path_base, fmt, rate, 2, encoder_factory)
+        self.path = self.sink.path
+        self._clock = clock
+        self._queue = queue.Queue(maxsize=queue_chunks)
+        self._gap = rate * gap_ms // 1000
+        # 单声道待写样本环：容量需大于 gap + 单块长度；大段静音分片写入，不受容量限制
+        self._rings = (SampleRing(rate * 2), SampleRing(rate * 2))
+        self._cursor = [0, 0]          # 各声道已入环的共享时钟位置（样本）
+        self._anchor = (0, None)       # (RX 位置, 对应时间戳)：共享时钟锚点
+        self._idle = [True, True]      # 声道是否处于空闲补静音状态（尚无数据/未发射）
+        self._zeros = np.zeros(rate // 10, dtype=np.int16)
+        self._stereo = np.zeros((rate // 50, 2), dtype=np.int16)
+        self._scratch = np.zeros(rate // 50, dtype=np.int16)
+        self._thread = None
+        self._error = None
+        self.frames_written = 0
+        self.rx_samples = 0
+        self.tx_samples = 0
+        self.silence_inserted = [0, 0]
+        self.dropped_chunks = 0
+        self.started_at = None
+
+    def start(self):
+        self.started_at = self._clock()
+        self._anchor = (0, self.started_at)
+        self._thread = threading.Thread(target=self._run, name='recorder-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # 丢块后下一块的时间戳会暴露空缺，写线程补静音，对齐不受影响
+            self.dropped_chunks += 1
+
+    def write_rx(self, pcm, t=None):
+        self._put((_RX, pcm, self._clock() if t is None else t))
+
+    def write_tx(self, pcm, t=None):
+        self._put((_TX, pcm, self._clock() if t is None else t))
+
+    def _position(self, t):
+        pos, t_anchor = self._anchor
+        return pos + int(round((t - t_anchor) * self.rate))
+
+    def _pad(self, ch, n):
+        """声道 ch 追加 n 个静音样本，分片写入并随时写出，环不会溢出"""
+        self.silence_inserted[ch] += n
+        while n > 0:
+            piece = min(n, self._zeros.size)
+            self._rings[ch].write(self._zeros[:piece])
+            self._cursor[ch] += piece
+            n -= piece
+            self._commit()
+
+    def _append(self, ch, pcm, t):
+        n = len(pcm)
+        start = self._position(t) - n  # 时间戳为块到达（末样本）时刻
+        lag = start - self._cursor[ch]
+        # 连续流中小于 gap 的抖动直接拼接；空闲后的第一块（如 PTT 按下）按时钟精确落位
+        if lag > (0 if self._idle[ch] else self._gap):
+            self._pad(ch, lag)
+        self._idle[ch] = False
+        self._rings[ch].write(pcm)
+        self._cursor[ch] += n
+        if ch == _RX:
+            self.rx_samples += n
+            self._anchor = (self._cursor[_RX], t)
+        else:
+            self.tx_samples += n
+        self._commit()
+
+    def _commit(self, final=False):
+        head = max(self._cursor)
+        target = head if final else head - self._gap
+        for ch in (_RX, _TX):
+            if self._cursor[ch] < target:
+                # 空闲声道补静音（不计入 silence_inserted：未发射时 TX 本就无声）
+                need = target - self._cursor[ch]
+                self._idle[ch] = True
+                while need > 0:
+                    piece = min(need, self._zeros.size)
+                    self._rings[ch].write(self._zeros[:piece])
+                    self._cursor[ch] += piece
+                    need -= piece
+                    self._emit()
+        self._emit()
+
+    def _emit(self):
+        """写出两声道都已就绪的样本（共享时钟位置 frames_written .. min(cursor)）"""
+        n = min(len(self._rings[_RX]), len(self._rings[_TX]))
+        step = self._stereo.shape[0]
+        while n > 0:
+            k = min(n, step)
+            frames = self._stereo[:k]
+            for ch in (_RX, _TX):
+                frames[:, ch] = self._rings[ch].read_into(self._scratch, k)
+            self.sink.write(frames)
+            self.frames_written += k
+            n -= k
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                kind, pcm, t = item
+                self._append(kind, pcm, t)
+            # 停止：两声道补齐到较新者并全部写出
+            self._commit(final=True)
+        except Exception as e:
+            self._error = e
+            logger.error(f"录音写线程异常: {e}")
+        finally:
+            try:
+                self.sink.close()
+            except Exception as e:
+                logger.error(f"关闭录音文件失败: {e}")
+
+    def stop(self, timeout=5.0):
+        """停止并关闭文件，返回文件路径；未写入任何样本或写入失败时删除文件并返回 None。
+
+        写线程在 timeout 内没写完（磁盘卡顿等）时记错误并返回 None：文件仍被写线程
+        持有、稍后才关闭，不能当作完整录音交给调用方。
+        """
+        if self._thread is not None:
+            deadline = time.monotonic() + timeout
+            try:
+                # 哨兵必须送达：队列满时等待写线程腾出空间（队列有界，至多数秒音频）
+                self._queue.put(_STOP, timeout=timeout)
+                self._thread.join(max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                pass
+            if self._thread.is_alive():
+                logger.error(f"录音写线程 {timeout}s 内未完成，{os.path.basename(self.path)} 不完整")
+                return None
+        else:
+            self.sink.close()
+        if self._error is not None or self.frames_written == 0:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            return None
+        return self.path
+
+    @property
+    def duration(self):
+        return self.frames_written / self.rate
+
+    def stats(self):
+        return {
+            'path': os.path.basename(self.path),
+            'duration': round(self.duration, 2),
+            'frames_written': self.frames_written,
+            'rx_samples': self.rx_samples,
+            'tx_samples': self.tx_samples,
+            'dropped_chunks': self.dropped_chunks,
+            'silence_inserted_ms': [int(n * 1000 / self.rate) for n in self.silence_inserted],
+            'queue_depth': self._queue.qsize(),
+            'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+有状态多相重采样器（任意有理比 L/M，流式，纯 numpy 向量化）
+
+重采样原先散落在五处且各自为政：RX Opus 与录音的 reshape(-1,3).mean 盒式平均
+（阻带仅约 -10dB，8kHz 以上噪声直接混叠进话音带）、TX 录音的 [::ratio] 直接抽取
+（无任何抗混叠）、WDSP 前的 _StatefulDecimator，以及 FileAudioCapture 的线性插值。
+本模块统一为一个实现：
+
+- PolyphaseResampler: Kaiser 窗 sinc 低通按 L 个相位拆分；每次 process() 对同一相位
+  的输出用 sliding_window_view + 矩阵向量乘一次算完，无逐样本 Python 循环
+- 跨调用保留 T-1 个输入样本历史和输出相位，块边界连续无咔哒声，输出帧不漂移
+- 历史与输入拼接缓冲预分配、按需扩容
+- resample(): 一次性整段重采样（补偿群延迟，输出与输入时间对齐）
+
+基准见 dev_tools/bench_resampler.py。
+"""
+
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def design_lowpass(up, down, taps_per_phase, cutoff=0.8, beta=8.0):
+    """设计上采样率（in_rate*up）下的 Kaiser 窗 sinc 原型低通，长度 up*taps_per_phase。
+
+    cutoff 为 -6dB 点相对较低一侧奈奎斯特频率的比例（默认 0.8：48k→16k 时 6.4kHz，
+    过渡带约 ±0.8kHz，8kHz 以上阻带 ≥80dB）；直流增益为 up（补偿插零）。
+    总长为偶数时末尾补一个 0 抽头，使群延迟为整数个上采样样本（便于精确对齐）。
+    """
+    n_taps = up * taps_per_phase
+    odd = n_taps - 1 + n_taps % 2
+    fc = cutoff * 0.5 / max(up, down)  # 单位：周期/样本（上采样率）
+    n = np.arange(odd) - (odd - 1) / 2.0
+    h = np.zeros(n_taps)
+    h[:odd] = 2.0 * fc * np.sinc(2.0 * fc * n) * np.kaiser(odd, beta)
+    h *= up / np.sum(h)
+    return h
+
+
+class PolyphaseResampler:
+    """流式有理比重采样器 in_rate → out_rate。
+
+    process(x) 接受任意长度的一维块，返回本块可产出的全部输出样本（float32）；
+    process_int16(x) 为 Int16 进出的便捷接口（四舍五入并限幅）。
+    """
+
+    def __init__(self, in_rate, out_rate, taps_per_phase=None, cutoff=0.8, beta=8.0):
+        g = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        if taps_per_phase is None:
+            # 抽取比越大过渡带越窄，每相位抽头数随之增加（48k→16k: 48，48k→8k: 96）
+            taps_per_phase = 16 * max(2, -(-self.down // self.up))
+        self.taps = int(taps_per_phase)
+        h = design_lowpass(self.up, self.down, self.taps, cutoff, beta).astype(np.float32)
+        # 相位 p 的子滤波器 h[p::up]，反转后与时间正序窗口做点积
+        self._phases = np.ascontiguousarray(h.reshape(self.taps, self.up).T[:, ::-1])
+        # 群延迟（上采样率下的整数样本）：一次性 resample() 用于对齐
+        self.delay_up = (h.size - 2 + h.size % 2) // 2
+        self._hist_len = self.taps - 1
+        self._buf = np.zeros(self._hist_len + 4096, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self._buf[:self._hist_len] = 0.0
+        self._k = 0       # 下一个输出样本序号
+        self._n_in = 0    # 已输入样本数
+
+    def output_length(self, n):
+        """下一次输入 n 个样本时将产出的输出样本数"""
+        return -(-(self._n_in + n) * self.up // self.down) - self._k
+
+    def process(self, x):
+        x = np.asarray(x)
+        n = x.size
+        H = self._hist_len
+        if H + n > self._buf.size:
+            grown = np.zeros(H + n, dtype=np.float32)
+            grown[:H] = self._buf[:H]
+            self._buf = grown
+        buf = self._buf
+        buf[H:H + n] = x
+
+        up, down = self.up, self.down
+        k0 = self._k
+        k_end = -(-(self._n_in + n) * up // down)
+        nout = k_end - k0
+        out = np.empty(max(nout, 0), dtype=np.float32)
+        if nout > 0:
+            windows = sliding_window_view(buf[:H + n], self.taps)
+            for r in range(min(up, nout)):
+                k = k0 + r
+                start = (k * down) // up - self._n_in
+                count = len(range(r, nout, up))
+                seg = windows[start:start + (count - 1) * down + 1:down]
+                if up == 1:
+                    np.dot(seg, self._phases[0], out=out)
+                else:
+                    out[r::up] = seg @ self._phases[(k * down) % up]
+
+        # 保留最后 H 个样本作为下一块的历史（n < H 时区间重叠，numpy 自动处理）
+        buf[:H] = buf[n:n + H]
+        self._k = k_end
+        self._n_in += n
+        # 每 up 个输出对应 down 个输入：周期性归一，计数器保持很小
+        q = self._k // up
+        self._k -= q * up
+        self._n_in -= q * down
+        return out
+
+    def process_int16(self, x):
+        y = self.process(x)
+        np.rint(y, out=y)
+        np.clip(y, -32768, 32767, out=y)
+        return y.astype(np.int16)
+
+
+def resample(x, in_rate, out_rate, taps_per_phase=None, cutoff=0.8):
+    """整段一次性重采样，补偿滤波器群延迟使输出与输入对齐（长度 ≈ len(x)*out/in）。"""
+    x = np.asarray(x, dtype=np.float32)
+    if in_rate == out_rate or x.size == 0:
+        return x
+    rs = PolyphaseResampler(in_rate, out_rate, taps_per_phase, cutoff)
+    # 前补 pad 个输入零，使 (pad*up + 群延迟) 恰为 down 的整数倍 → 输出延迟为整数样本
+    pad = next(p for p in range(rs.down) if (p * rs.up + rs.delay_up) % rs.down == 0)
+    skip = (pad * rs.up + rs.delay_up) // rs.down
+    tail = rs.taps + 1
+    y = np.concatenate([
+        rs.process(np.zeros(pad, dtype=np.float32)),
+        rs.process(x),
+        rs.process(np.zeros(tail, dtype=np.float32)),
+    ])
+    n_out = int(x.size * out_rate // in_rate)
+    return y[skip:skip + n_out]
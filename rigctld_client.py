@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+rigctld 长连接会话层
+
+TRXRIG 原先每条命令都新建 TCP 连接 → 发一行 → 关闭，0.5s S 表轮询、2s 频率同步
+和每个 UI 命令都要付出一次 connect/teardown。本模块提供：
+
+- RigctldSession: 单条长连接，断线自动重连，使用 rigctld 扩展响应协议
+  （命令前加 '+'，每个应答以 "RPRT n" 行结束），因此应答边界确定，可以把多条
+  命令一次写出再按序读回（流水线）。
+- RigctldPool: 每实例一个小连接池（默认 1~2 条），多线程并发时各取一条空闲会话。
+- 每条命令（按命令字母，如 f/F/T/l）的延迟统计：次数、错误数、平均/最大/最近延迟。
+"""
+
+import socket
+import threading
+import time
+import logging
+import queue
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class RigctldError(Exception):
+    """rigctld 连接/协议错误（不含 RPRT 非 0 的正常失败应答）"""
+
+
+class RigctldResponse:
+    """一条扩展协议应答。
+
+    rigctld 扩展应答格式（'+' 前缀命令）::
+
+        get_mode:
+        Mode: USB
+        Passband: 2400
+        RPRT 0
+
+    values 按出现顺序保存值（"Key: value" 取 value，无键的行原样保存），
+    fields 保存带键的值，rprt 为结尾 RPRT 码（0 = 成功）。
+    """
+
+    __slots__ = ('command', 'values', 'fields', 'rprt', 'latency')
+
+    def __init__(self, command, values=None, fields=None, rprt=0, latency=0.0):
+        self.command = command
+        self.values = values if values is not None else []
+        self.fields = fields if fields is not None else {}
+        self.rprt = rprt
+        self.latency = latency
+
+    @property
+    def ok(self):
+        return self.rprt == 0
+
+    def legacy_text(self):
+        """还原旧短协议的文本形式，兼容 TRXRIG 既有解析逻辑。
+
+        成功的查询返回各值换行拼接（如 "USB\\n2400"），失败返回 "RPRT -n"。
+        """
+        if self.rprt != 0:
+            return f"RPRT {self.rprt}"
+        if self.values:
+            return "\n".join(self.values)
+        return "RPRT 0"
+
+    def __repr__(self):
+        return f"RigctldResponse({self.command!r}, values={self.values!r}, rprt={self.rprt})"
+
+
+def parse_extended_response(command, lines):
+    """解析一条扩展应答的全部行（含首行回显与末行 RPRT）。"""
+    values = []
+    fields = {}
+    rprt = 0
+    for i, line in enumerate(lines):
+        if line.startswith('RPRT'):
+            try:
+                rprt = int(line.split()[1])
+            except (IndexError, ValueError):
+                rprt = -1
+            continue
+        if i == 0:
+            # 首行为命令回显（"get_freq:" / "set_freq: 14074000"）
+            continue
+        if ':' in line:
+            # "Mode:" 这类空值行也按键值处理，保持 values 与字段位置对应
+            key, _, val = line.partition(':')
+            fields[key.strip()] = val.strip()
+            values.append(val.strip())
+        elif line:
+            values.append(line.strip())
+    return RigctldResponse(command, values, fields, rprt)
+
+
+class CommandStats:
+    """单个命令字母的延迟统计"""
+
+    __slots__ = ('count', 'errors', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, latency, ok):
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.total += latency
+        self.last = latency
+        if latency > self.max:
+            self.max = latency
+
+    def as_dict(self):
+        avg = self.total / self.count if self.count else 0.0
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(avg * 1000, 2),
+            'max_ms': round(self.max * 1000, 2),
+            'last_ms': round(self.last * 1000, 2),
+        }
+
+
+class RigctldSession:
+    """到 rigctld 的一条长连接，断线自动重连。
+
+    线程安全：同一会话内的 execute/execute_many 以锁串行化；并发请使用 RigctldPool。
+    """
+
+    def __init__(self, host='127.0.0.1', port=4532, timeout=3.0, connect_timeout=2.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._sock = None
+        self._rbuf = b''
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+        self._sock = sock
+        self._rbuf = b''
+        if self.connects:
+            self.reconnects += 1
+        self.connects += 1
+
+    def close(self):
+        with self._lock:
+            self._close_unlocked()
+
+    def _close_unlocked(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._rbuf = b''
+
+    def _readline(self):
+        while b'\n' not in self._rbuf:
+            chunk = self._sock.recv(4096)
+            if not chunk:
+                raise RigctldError("rigctld closed connection")
+            self._rbuf += chunk
+        line, _, self._rbuf = self._rbuf.partition(b'\n')
+        return line.decode(errors='replace').strip()
+
+    def _read_response(self, command):
+        lines = []
+        while True:
+            line = self._readline()
+            lines.append(line)
+            if line.startswith('RPRT'):
+                return parse_extended_response(command, lines)
+
+    def _exchange(self, commands):
+        if self._sock is None:
+            self._connect()
+        payload = ''.join(f"+{cmd}\n" for cmd in commands).encode()
+        self._sock.sendall(payload)
+        return [self._read_response(cmd) for cmd in commands]
+
+    def execute_many(self, commands):
+        """流水线执行多条命令：一次写出，按序读回。
+
+        连接异常时重连并整体重试一次（MRRC 使用的 rigctld 命令均为幂等命令）。
+        """
+        commands = list(commands)
+        if not commands:
+            return []
+        with self._lock:
+            start = time.monotonic()
+            try:
+                responses = self._exchange(commands)
+            except (OSError, RigctldError) as e:
+                logger.debug(f"rigctld 会话异常，重连重试: {e}")
+                self._close_unlocked()
+                try:
+                    responses = self._exchange(commands)
+                except (OSError, RigctldError) as e2:
+                    self._close_unlocked()
+                    raise RigctldError(str(e2)) from e2
+            elapsed = time.monotonic() - start
+        # 流水线内各命令共享一次往返，延迟按条均摊
+        per_cmd = elapsed / len(responses)
+        for r in responses:
+            r.latency = per_cmd
+        return responses
+
+    def execute(self, command):
+        return self.execute_many([command])[0]
+
+
+class RigctldPool:
+    """每个 MRRC 实例的 rigctld 会话池，附带每命令延迟统计。"""
+
+    def __init__(self, host='127.0.0.1', port=4532, size=2, timeout=3.0):
+        self.host = host
+        self.port = port
+        self.size = max(1, int(size))
+        self._sessions = [RigctldSession(host, port, timeout) for _ in range(self.size)]
+        self._idle = queue.LifoQueue()
+        for s in self._sessions:
+            self._idle.put(s)
+        self._stats: Dict[str, CommandStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def _acquire(self, wait):
+        try:
+            return self._idle.get(timeout=wait)
+        except queue.Empty:
+            raise RigctldError("no idle rigctld session")
+
+    def _record(self, command, latency, ok):
+        key = command.split()[0] if command else '?'
+        with self._stats_lock:
+            st = self._stats.get(key)
+            if st is None:
+                st = self._stats[key] = CommandStats()
+            st.record(latency, ok)
+
+    def execute_many(self, commands, wait=5.0) -> List[RigctldResponse]:
+        commands = list(commands)
+        session = self._acquire(wait)
+        start = time.monotonic()
+        try:
+            responses = session.execute_many(commands)
+        except RigctldError:
+            elapsed = time.monotonic() - start
+            for cmd in commands:
+                self._record(cmd, elapsed / max(1, len(commands)), False)
+            raise
+        finally:
+            self._idle.put(session)
+        for cmd, r in zip(commands, responses):
+            self._record(cmd, r.latency, r.ok)
+        return responses
+
+    def execute(self, command, wait=5.0) -> RigctldResponse:
+        return self.execute_many([command], wait)[0]
+
+    def stats(self):
+        """延迟统计快照：{'commands': {'f': {...}, ...}, 'connects': n, 'reconnects': n}"""
+        with self._stats_lock:
+            commands = {k: v.as_dict() for k, v in self._stats.items()}
+        return {
+            'commands': commands,
+            'sessions': self.size,
+            'connected': sum(1 for s in self._sessions if s.connected),
+            'connects': sum(s.connects for s in self._sessions),
+            'reconnects': sum(s.reconnects for s in self._sessions),
+        }
+
+    def close(self):
+        for s in self._sessions:
+            s.close()
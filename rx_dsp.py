@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RX 逐帧 DSP 流水线（预分配缓冲，原地运算）
+
+PyAudioCapture.run 原先每 20ms 帧都要新建十余个 numpy 数组：frombuffer、去直流、
+AGC 乘法、soft_peak_limiter 的中间量、astype(int16)，以及 wdsp_resample_buffer /
+Opus 累加器的 np.concatenate + 切片。树莓派级主机上这些分配与 GC 抖动占据了
+相当比例的 CPU。本模块提供：
+
+- soft_peak_limiter_inplace: 与 audio_interface.soft_peak_limiter 数值一致的原地版本
+- SampleRing: 定容环形累加器（写入/按块取出均复制到预分配缓冲，无 concatenate）
+- RXFramePipeline: 声道选择 → 去直流 → AGC → 软限幅 → Int16，全部在预分配的
+  float32/int16 工作缓冲中完成，返回输出缓冲的视图
+- SPSCFrameRing: 捕获线程 → DSP 线程的单生产者/单消费者帧环（无锁交接，满则丢帧计数）
+
+纯 numpy，无音频设备依赖。基准见 dev_tools/bench_rx_pipeline.py。
+"""
+
+import threading
+
+import numpy as np
+
+
+def soft_peak_limiter_inplace(x, knee=0.9, ceiling=0.98, ratio=2.0, scratch=None):
+    """原地软膝峰值限幅（float32）。scratch 为两块与 x 等长的 float32 缓冲。
+
+    峰值未超过 knee 时直接返回（常见情况零运算）。
+    """
+    if ratio <= 1.0:
+        np.clip(x, -ceiling, ceiling, out=x)
+        return x
+    if scratch is None:
+        scratch = (np.empty_like(x), np.empty_like(x))
+    ax, over = scratch[0][:x.size], scratch[1][:x.size]
+    np.abs(x, out=ax)
+    if ax.max(initial=0.0) <= knee:
+        return x
+    np.subtract(ax, knee, out=over)
+    np.maximum(over, 0.0, out=over)
+    over *= (1.0 - 1.0 / ratio)
+    np.subtract(ax, over, out=ax)
+    np.minimum(ax, ceiling, out=ax)
+    np.copysign(ax, x, out=x)
+    return x
+
+
+class SampleRing:
+    """定容单线程环形样本累加器。
+
+    write() 追加样本（溢出时丢弃最旧样本并计数），read_into() 按块取出到调用方
+    提供的缓冲。底层存储一次分配，不随帧增长。
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        self._start = 0
+        self._len = 0
+        self.overflows = 0
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def write(self, x):
+        n = x.size
+        if n == 0:
+            return
+        if n > self.capacity:
+            self.overflows += n - self.capacity
+            x = x[-self.capacity:]
+            n = self.capacity
+        excess = self._len + n - self.capacity
+        if excess > 0:
+            self.overflows += excess
+            self._start = (self._start + excess) % self.capacity
+            self._len -= excess
+        end = (self._start + self._len) % self.capacity
+        first = min(n, self.capacity - end)
+        self._buf[end:end + first] = x[:first]
+        if first < n:
+            self._buf[:n - first] = x[first:]
+        self._len += n
+
+    def discard(self, n):
+        """丢弃最旧的 n 个样本（计入 overflows），返回实际丢弃数"""
+        n = min(int(n), self._len)
+        if n > 0:
+            self._start = (self._start + n) % self.capacity
+            self._len -= n
+            self.overflows += n
+        return n
+
+    def read_into(self, out, n=None):
+        """取出 n 个样本（默认 out.size）写入 out，返回 out[:n]；样本不足时返回 None"""
+        n = out.size if n is None else n
+        if self._len < n:
+            return None
+        first = min(n, self.capacity - self._start)
+        out[:first] = self._buf[self._start:self._start + first]
+        if first < n:
+            out[first:n] = self._buf[:n - first]
+        self._start = (self._start + n) % self.capacity
+        self._len -= n
+        return out[:n]
+
+
+class RXFramePipeline:
+    """RX 逐帧前处理：声道选择 → 去直流 → AGC → 软限幅 → Int16。
+
+    process() 返回内部 int16 缓冲的视图，下一次 process() 前有效；
+    调用方若需跨帧保留请自行 copy。
+    """
+
+    AGC_TARGET = 0.6      # 目标电平 -4dB
+    AGC_MAX_GAIN = 4.0
+    DC_THRESHOLD = 0.001
+
+    def __init__(self, frame_samples=960, stereo=False):
+        self.stereo = stereo
+        self._alloc(frame_samples)
+
+    def _alloc(self, n):
+        self.frame_samples = n
+        self._work = np.zeros(n, dtype=np.float32)
+        self._scratch = (np.zeros(n, dtype=np.float32), np.zeros(n, dtype=np.float32))
+        self._out = np.zeros(n, dtype=np.int16)
+
+    def process(self, data, agc=True):
+        raw = np.frombuffer(data, dtype=np.float32)
+        if self.stereo:
+            # 只取右声道（电台录音通常右声道是RX输出）
+            raw = raw[1::2]
+        n = raw.size
+        if n > self.frame_samples:
+            self._alloc(n)
+        work = self._work[:n]
+        np.copyto(work, raw)
+
+        # 1. 去除直流偏移
+        dc_offset = work.mean() if n else 0.0
+        if abs(dc_offset) > self.DC_THRESHOLD:
+            work -= dc_offset
+
+        # 2. 自动增益控制 (AGC)；顺带得到增益后的峰值，供限幅级跳过整帧扫描
+        peak = None
+        if agc and n:
+            max_val = np.abs(work, out=self._scratch[0][:n]).max()
+            peak = max_val
+            if max_val > 0.001:
+                if max_val < self.AGC_TARGET * 0.3:
+                    # 弱信号：提升增益（最大4倍）
+                    gain = min(self.AGC_TARGET / max_val, self.AGC_MAX_GAIN)
+                    work *= gain
+                    peak = max_val * gain
+                elif max_val > 0.9:
+                    # 强信号：略微衰减，防止削波
+                    work *= 0.85
+                    peak = max_val * 0.85
+
+        # 3. 软膝峰值限幅（仅>0.95 介入）
+        if peak is None or peak > 0.95 * 0.999:
+            soft_peak_limiter_inplace(work, knee=0.95, ceiling=0.99, scratch=self._scratch)
+
+        work *= 32767
+        out = self._out[:n]
+        np.copyto(out, work, casting='unsafe')
+        return out
+
+    def limit_int16(self, pcm, knee=0.97, ceiling=0.99):
+        """对 Int16 块原地做软限幅（WDSP 输出后级），返回 pcm"""
+        n = pcm.size
+        if n > self.frame_samples:
+            self._alloc(n)
+        work = self._work[:n]
+        np.copyto(work, pcm, casting='unsafe')
+        work /= 32767.0
+        soft_peak_limiter_inplace(work, knee=knee, ceiling=ceiling, scratch=self._scratch)
+        work *= 32767.0
+        np.copyto(pcm, work, casting='unsafe')
+        return pcm
+
+
+class SPSCFrameRing:
+    """单生产者 / 单消费者的定长帧环（捕获线程 push，DSP 线程 pop）。
+
+    每个槽位只由一方写：生产者写槽位后推进 head，消费者读出后推进 tail；两个游标
+    各自只有一个写者，交接无需加锁（CPython 下整数/列表元素赋值是原子的）。
+    环满时 push 直接丢弃新帧并计数，捕获线程永不等待。Event 只用于唤醒空闲的消费者。
+    """
+
+    def __init__(self, capacity=16):
+        self.capacity = max(2, int(capacity))
+        self._slots = [None] * self.capacity
+        self._head = 0   # 生产者写
+        self._tail = 0   # 消费者写
+        self._wake = threading.Event()
+        self.pushed = 0
+        self.overflows = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, item):
+        depth = self._head - self._tail
+        if depth >= self.capacity:
+            self.overflows += 1
+            return False
+        self._slots[self._head % self.capacity] = item
+        self._head += 1
+        self.pushed += 1
+        if depth + 1 > self.max_depth:
+            self.max_depth = depth + 1
+        self._wake.set()
+        return True
+
+    def pop(self, timeout=None):
+        """取出最旧的一帧；环空时最多等待 timeout 秒，仍为空返回 None"""
+        if self._head == self._tail:
+            # 先清再查：清除后才到达的 push 会重新置位，不会丢失唤醒
+            self._wake.clear()
+            if self._head == self._tail and not self._wake.wait(timeout):
+                return None
+            if self._head == self._tail:
+                return None
+        i = self._tail % self.capacity
+        item = self._slots[i]
+        self._slots[i] = None
+        self._tail += 1
+        return item
+
+
+class LatencyStats:
+    """单线程写入的耗时统计（毫秒）：次数 / 平均 / 最大 / 最近"""
+
+    def __init__(self):
+        self.count = 0
+        self._total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000.0
+        self.count += 1
+        self._total += ms
+        self.last = ms
+        if ms > self.max:
+            self.max = ms
+
+    def stats(self):
+        return {'count': self.count, 'avg_ms': round(self._total / self.count, 3) if self.count else 0.0,
+                'max_ms': round(self.max, 3), 'last_ms': round(self.last, 3)}
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RX 音频推送式分发（capture 线程 → IOLoop → 各 WebSocket 客户端）
+
+WS_AudioRXHandler.tailstream 原先每个客户端一个协程以 2~3ms 轮询 Wavframes 列表，
+每帧平均多等半个轮询周期；capture 线程还要把每帧引用复制进每个客户端列表，
+拥塞时用 pop(0)/切片裁剪。本模块改为：
+
+- RXFrameRing: 同档位全部客户端共享的定长环形缓冲，编码帧只存一份；
+  capture 线程写入槽位后再推进 head，读者按槽内序号校验，无需加锁
+- RXSubscriber: 每客户端只持有一个读游标；落后超过 max_backlog 时游标直接跳到
+  最新帧附近（计为丢帧），不做列表搬移
+- RXFanout: capture 线程 publish() 后经线程安全的 schedule（MAIN_IOLOOP.add_callback）
+  唤醒 IOLoop；同一时刻最多挂起一次唤醒，一次 drain 分发给全部订阅者
+- 发送积压以未完成的 write_message Future 数衡量，达到 max_inflight 暂停，
+  写完成回调后继续
+- 每客户端统计：已发/丢弃/清空帧数，入队→写完成延迟（平均/最大/最近）
+- 每客户端编解码档位（RXProfile）：每个档位一条环，capture 线程对每个有订阅者的
+  档位每帧只编码一次；PCM 与 Opus 客户端、不同采样率/帧长可以混用
+- 每客户端 DSP 档位（RXProfile.dsp，wdsp_pool.DSPProfile）：同 DSP 档位的客户端共享
+  一次 WDSP 处理，dsp=None 表示跟随控制端的共享配置
+- 自适应 Opus 档位（RXTierController）：按客户端发送积压在 32→24→16→12 kbps
+  （后两级加长帧）阶梯间升降，带迟滞；切换结果通过 on_tier 回调告知客户端
+"""
+
+import time
+import threading
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+CODEC_PCM = 'pcm'
+CODEC_OPUS = 'opus'
+
+PCM_RATES = (8000, 16000)
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+OPUS_FRAME_DURS = (10, 20, 40, 60)
+OPUS_BITRATE_RANGE = (6000, 64000)
+DEFAULT_OPUS_BITRATE = 32000
+
+# 自适应阶梯 (bitrate, frame_dur)：低码率档加长帧，减少包头开销和每秒包数
+OPUS_TIERS = ((32000, 20), (24000, 20), (16000, 40), (12000, 60))
+
+
+class RXProfile(namedtuple('RXProfile', 'codec rate frame_dur bitrate dsp', defaults=(None,))):
+    """RX 编解码档位。PCM 档位 frame_dur/bitrate 为 0；dsp 为听众选择的 DSP 档位
+    （None = 共享配置）。可哈希，用作环/编码器的键。"""
+
+    __slots__ = ()
+
+    @property
+    def is_opus(self):
+        return self.codec == CODEC_OPUS
+
+    @property
+    def label(self):
+        if self.is_opus:
+            label = f"opus/{self.rate}/{self.frame_dur}ms/{self.bitrate // 1000}k"
+        else:
+            label = f"pcm/{self.rate}"
+        return label if self.dsp is None else f"{label}@{self.dsp.label}"
+
+
+DEFAULT_PROFILE = RXProfile(CODEC_PCM, 16000, 0, 0)
+
+
+def profile_from_request(data):
+    """把 set_opus_encode 请求解析为 RXProfile；越界参数回落到最接近的合法值。"""
+    def nearest(value, choices, default):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return default
+        return min(choices, key=lambda c: abs(c - value))
+
+    if not data.get('enabled', False):
+        return RXProfile(CODEC_PCM, nearest(data.get('rate', 16000), PCM_RATES, 16000), 0, 0)
+    rate = nearest(data.get('rate', 16000), OPUS_RATES, 16000)
+    frame_dur = nearest(data.get('frame_dur', 20), OPUS_FRAME_DURS, 20)
+    try:
+        bitrate = int(data.get('bitrate', DEFAULT_OPUS_BITRATE))
+    except (TypeError, ValueError):
+        bitrate = DEFAULT_OPUS_BITRATE
+    bitrate = max(OPUS_BITRATE_RANGE[0], min(OPUS_BITRATE_RANGE[1], bitrate))
+    return RXProfile(CODEC_OPUS, rate, frame_dur, bitrate)
+
+
+def tier_ladder(base):
+    """以客户端请求档位为首级，向下接上更低码率的阶梯档位"""
+    ladder = [base]
+    for bitrate, frame_dur in OPUS_TIERS:
+        if bitrate < base.bitrate:
+            ladder.append(base._replace(frame_dur=max(frame_dur, base.frame_dur), bitrate=bitrate))
+    return ladder
+
+
+class RXTierController:
+    """单客户端 Opus 档位升降（迟滞）。
+
+    - 降级：发送积压 >= down_ms 或出现新的丢帧，且距上次切换 >= down_hold 秒
+    - 升级：积压持续 <= up_ms 达 up_hold 秒，每次只升一级
+    """
+
+    def __init__(self, base, down_ms=120, up_ms=40, down_hold=1.0, up_hold=5.0):
+        self.tiers = tier_ladder(base)
+        self.index = 0
+        self.down_ms = down_ms
+        self.up_ms = up_ms
+        self.down_hold = down_hold
+        self.up_hold = up_hold
+        self.changes = 0
+        self._last_change = None
+        self._clear_since = None
+        self._last_dropped = 0
+
+    @property
+    def profile(self):
+        return self.tiers[self.index]
+
+    def _step(self, delta, now):
+        self.index += delta
+        self.changes += 1
+        self._last_change = now
+        self._clear_since = now if delta < 0 else None
+        return self.profile
+
+    def update(self, backlog_ms, dropped, now):
+        """返回新档位（需要切换时）或 None"""
+        congested = backlog_ms >= self.down_ms or dropped > self._last_dropped
+        self._last_dropped = dropped
+        since_change = float('inf') if self._last_change is None else now - self._last_change
+        if congested:
+            self._clear_since = None
+            if self.index < len(self.tiers) - 1 and since_change >= self.down_hold:
+                return self._step(1, now)
+            return None
+        if backlog_ms > self.up_ms:
+            self._clear_since = None
+            return None
+        if self._clear_since is None:
+            self._clear_since = now
+        elif self.index > 0 and now - self._clear_since >= self.up_hold:
+            return self._step(-1, now)
+        return None
+
+
+class RXFrameRing:
+    """单写者多读者的编码帧环形缓冲。
+
+    槽位保存 (seq, 入队时间, frame)。写者先写槽位再推进 head；读者读取后校验
+    槽内 seq，若已被覆盖（读者落后超过容量）则返回 None。
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = max(2, int(capacity))
+        self._slots = [None] * self.capacity
+        self.head = 0  # 下一帧的序号；已发布帧为 [head - capacity, head)
+
+    def publish(self, frame):
+        seq = self.head
+        self._slots[seq % self.capacity] = (seq, time.monotonic(), frame)
+        self.head = seq + 1
+        return seq
+
+    def read(self, seq):
+        """返回 (入队时间, frame)；未发布或已被覆盖返回 None"""
+        slot = self._slots[seq % self.capacity]
+        if slot is None or slot[0] != seq:
+            return None
+        return slot[1], slot[2]
+
+
+class RXSubscriber:
+    """单个 RX 客户端：所订阅档位环上的读游标 + 发送统计。
+
+    send(frame) 在 IOLoop 线程调用，返回 Future（如 write_message(..., binary=True)）
+    或 None。除统计读取外，所有方法只在 IOLoop 线程调用。
+    """
+
+    def __init__(self, ring, send, profile=DEFAULT_PROFILE, max_backlog=10, max_inflight=4, on_tier=None):
+        self.ring = ring
+        self.profile = profile
+        self._send = send
+        self.on_tier = on_tier  # on_tier(info) 档位变化回调（仅自适应客户端）
+        self.tiers = None       # RXTierController，None 表示固定档位
+        self.max_backlog = max(1, int(max_backlog))
+        self.max_inflight = max(1, int(max_inflight))
+        self.cursor = ring.head
+        self.inflight = 0
+        self.closed = False
+        # 统计
+        self.sent = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.errors = 0
+        self._lat_total = 0.0
+        self._lat_max = 0.0
+        self._lat_last = 0.0
+
+    @property
+    def lag(self):
+        return self.ring.head - self.cursor
+
+    @property
+    def backlog_ms(self):
+        """未发送 + 在途帧对应的音频时长（PCM 档位按 20ms/帧计）"""
+        return (self.lag + self.inflight) * (self.profile.frame_dur or 20)
+
+    def tier_info(self):
+        return {
+            'tier': self.tiers.index if self.tiers else 0,
+            'tiers': len(self.tiers.tiers) if self.tiers else 1,
+            'codec': self.profile.codec,
+            'rate': self.profile.rate,
+            'bitrate': self.profile.bitrate,
+            'frame_dur': self.profile.frame_dur,
+            'adaptive': self.tiers is not None,
+        }
+
+    def flush(self):
+        """跳过尚未发送的帧（PTT 释放/TUNE/CQ 停止时避免播放旧 RX 音频）"""
+        head = self.ring.head
+        self.flushed += head - self.cursor
+        self.cursor = head
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        """在 in-flight 上限内把游标之后的帧写出"""
+        while not self.closed and self.inflight < self.max_inflight:
+            head = self.ring.head
+            if self.cursor >= head:
+                return
+            if head - self.cursor > self.max_backlog:
+                # 客户端落后：游标前移到最新 max_backlog 帧，保持新鲜度
+                skip = head - self.max_backlog - self.cursor
+                self.dropped += skip
+                self.cursor += skip
+            entry = self.ring.read(self.cursor)
+            self.cursor += 1
+            if entry is None:
+                self.dropped += 1
+                continue
+            enqueued, frame = entry
+            self.inflight += 1
+            try:
+                future = self._send(frame)
+            except Exception as e:
+                self._on_error(e)
+                return
+            if future is None:
+                self._on_written(enqueued, None)
+            else:
+                future.add_done_callback(lambda f, t=enqueued: self._on_written(t, f))
+
+    def _on_written(self, enqueued, future):
+        if future is not None and future.exception() is not None:
+            self._on_error(future.exception())
+            return
+        latency = time.monotonic() - enqueued
+        self.inflight -= 1
+        self.sent += 1
+        self._lat_total += latency
+        self._lat_last = latency
+        if latency > self._lat_max:
+            self._lat_max = latency
+        if future is not None:
+            self.drain()
+
+    def _on_error(self, error):
+        self.inflight -= 1
+        self.errors += 1
+        self.closed = True
+        logger.info(f"RX 音频发送失败，停止该客户端推送: {type(error).__name__}: {error}")
+
+    def stats(self):
+        avg = self._lat_total / self.sent if self.sent else 0.0
+        return {
+            'profile': self.profile.label,
+            'adaptive': self.tiers is not None,
+            'tier': self.tiers.index if self.tiers else 0,
+            'tier_changes': self.tiers.changes if self.tiers else 0,
+            'lag': self.lag,
+            'inflight': self.inflight,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'flushed': self.flushed,
+            'errors': self.errors,
+            'latency_avg_ms': round(avg * 1000, 2),
+            'latency_max_ms': round(self._lat_max * 1000, 2),
+            'latency_last_ms': round(self._lat_last * 1000, 2),
+        }
+
+
+class RXFanout:
+    """capture 线程与 IOLoop 之间的 RX 帧分发中心，每个活动档位一条环。
+
+    schedule(fn) 必须线程安全（如 IOLoop.add_callback）。subscribe/resubscribe/
+    unsubscribe/flush 在 IOLoop 线程调用；active_profiles/publish 在 capture 线程调用。
+    """
+
+    def __init__(self, schedule, capacity=64, max_backlog=10, max_inflight=4, clock=time.monotonic):
+        self._schedule = schedule
+        self._clock = clock
+        self.capacity = capacity
+        self.max_backlog = max_backlog
+        self.max_inflight = max_inflight
+        self._rings = {}        # RXProfile -> RXFrameRing
+        self._subscribers = []
+        self._profiles = ()     # capture 线程读取的活动档位快照（整体替换）
+        self._wakeup_lock = threading.Lock()
+        self._wakeup_pending = False
+        self.published = 0
+
+    def _ring_for(self, profile):
+        ring = self._rings.get(profile)
+        if ring is None:
+            ring = self._rings[profile] = RXFrameRing(self.capacity)
+        return ring
+
+    def _refresh_profiles(self):
+        active = {s.profile for s in self._subscribers}
+        for profile in list(self._rings):
+            if profile not in active:
+                del self._rings[profile]
+        # dsp 字段可能为 None，按标签排序（仅为快照顺序稳定）
+        self._profiles = tuple(sorted(active, key=lambda p: p.label))
+
+    def subscribe(self, send, profile=DEFAULT_PROFILE, on_tier=None):
+        sub = RXSubscriber(self._ring_for(profile), send, profile, self.max_backlog, self.max_inflight, on_tier)
+        self._subscribers = self._subscribers + [sub]
+        self._refresh_profiles()
+        return sub
+
+    def resubscribe(self, sub, profile, adaptive=False):
+        """按客户端请求切换档位；adaptive 仅对 Opus 生效，以 profile 为首级自动升降"""
+        sub.tiers = RXTierController(profile) if adaptive and profile.is_opus else None
+        self._switch(sub, profile)
+        if sub.tiers is not None:
+            self._report_tier(sub)
+
+    def _switch(self, sub, profile):
+        """客户端改挂到另一档位的环，从最新帧开始；旧环上未发送的帧计为清空"""
+        if profile == sub.profile:
+            return
+        sub.flushed += sub.lag
+        sub.profile = profile
+        sub.ring = self._ring_for(profile)
+        sub.cursor = sub.ring.head
+        self._refresh_profiles()
+
+    def _report_tier(self, sub):
+        if sub.on_tier is None:
+            return
+        try:
+            sub.on_tier(sub.tier_info())
+        except Exception as e:
+            logger.debug(f"RX 档位通知失败: {e}")
+
+    def _adapt(self, sub, now):
+        new_profile = sub.tiers.update(sub.backlog_ms, sub.dropped, now)
+        if new_profile is None:
+            return
+        logger.info(f"RX 自适应档位 → {new_profile.label}（积压 {sub.backlog_ms}ms）")
+        self._switch(sub, new_profile)
+        self._report_tier(sub)
+
+    def unsubscribe(self, sub):
+        sub.close()
+        self._subscribers = [s for s in self._subscribers if s is not sub]
+        self._refresh_profiles()
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def active_profiles(self):
+        return self._profiles
+
+    def publish(self, profile, frame):
+        """capture 线程调用：帧写入该档位的环并按需唤醒 IOLoop"""
+        ring = self._rings.get(profile)
+        if ring is None:
+            return  # 最后一个订阅者已离开
+        ring.publish(frame)
+        self.published += 1
+        with self._wakeup_lock:
+            if self._wakeup_pending:
+                return
+            self._wakeup_pending = True
+        self._schedule(self._drain_all)
+
+    def flush(self):
+        for sub in self._subscribers:
+            sub.flush()
+
+    def _drain_all(self):
+        with self._wakeup_lock:
+            self._wakeup_pending = False
+        now = self._clock()
+        for sub in self._subscribers:
+            sub.drain()
+            if sub.tiers is not None and not sub.closed:
+                self._adapt(sub, now)
+
+    def stats(self):
+        profiles = {}
+        for sub in self._subscribers:
+            entry = profiles.setdefault(sub.profile.label, {'subscribers': 0, 'published': sub.ring.head})
+            entry['subscribers'] += 1
+        return {
+            'published': self.published,
+            'subscribers': len(self._subscribers),
+            'profiles': profiles,
+        }
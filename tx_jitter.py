@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+TX 自适应抖动缓冲（按帧序号重排 + Opus FEC/PLC 丢包隐藏）
+
+PyAudioPlayback 原先把解码后的帧按到达顺序塞进 queue.Queue(maxsize=50)，满了丢最旧，
+没有重排、没有播放时钟、没有丢包隐藏，移动网络的抖动直接变成发射音频的断续。
+
+线格式（m: 第 5 字段 = 2）：每帧 1 字节编解码标签 + 2 字节大端帧序号 + 负载。
+旧客户端（标签模式 1）没有序号，由服务端按到达顺序编号，仍享有播放延迟与欠载处理。
+
+- put(seq, payload)：IOLoop 线程收包。序号按 16 位回绕展开；早于播放位置的记 late 丢弃，
+  重复包记 duplicates；跳变超过容量视为重新同步
+- pop()：播放线程按帧时钟取下一帧，返回 (AUDIO, 负载) / (FEC, 下一包负载) / (PLC, None)：
+  缺帧时若下一包已到，用其带内 FEC 恢复（decode_fec=True），否则 Opus PLC 外推
+- 目标播放延迟 = max(配置值, 3×到达抖动 + 1 帧)，抖动按 RFC 3550 一阶估计；迟到 / 重复包
+  同样计入估计（延迟尖峰正是要吸收的抖动）。两包到达间隔超过 silence_ms（PTT 两段话之间
+  的停顿，客户端此时不发包）视为新话段，抖动估计清零重来，停顿本身不计入抖动。
+  目标上调立即生效、下调每 DECAY_FRAMES 包最多 1 帧。
+  播放中目标上调时，pop() 隔帧插入 PLC 帧（不前移播放位置）把缓冲深度拉到新目标，
+  否则深度停留在起播时的值，后续尖峰照样迟到。
+  缓冲超过目标 2 帧以上时跳帧收敛，保证延迟有界；取空即欠载，重新预缓冲到目标深度
+- next_frame(jitter, pipeline)：把 pop() 的结果交给 TXFramePipeline 解码 / 隐藏并分发
+
+纯 Python + math，无音频设备依赖。
+"""
+
+import math
+import threading
+import time
+
+AUDIO = 'audio'
+FEC = 'fec'
+PLC = 'plc'
+
+SEQ_MOD = 1 << 16
+DECAY_FRAMES = 50       # 自适应目标每 50 包（20ms 帧约 1s）最多下调 1 帧
+
+
+class TXJitterBuffer:
+    """单个 TX 连接的抖动缓冲。put() 与 pop() 可在不同线程调用。"""
+
+    def __init__(self, frame_ms=20, target_ms=60, max_ms=200, capacity=64, adaptive=True,
+                 silence_ms=500, clock=time.monotonic):
+        self.frame_s = frame_ms / 1000.0
+        self.silence_s = max(silence_ms, max_ms) / 1000.0
+        self.base_frames = max(1, int(round(target_ms / frame_ms)))
+        self.max_frames = max(self.base_frames, int(round(max_ms / frame_ms)))
+        self.capacity = max(int(capacity), self.max_frames + 4)
+        self.adaptive = adaptive
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._payload = [None] * self.capacity
+        self._seq = [-1] * self.capacity
+        self.target_frames = self.base_frames
+        self._next = None       # 下一个要播放的展开序号
+        self._high = None       # 已收最大展开序号 + 1
+        self._count = 0
+        self._primed = False
+        self._transit = None
+        self._jitter = 0.0
+        self._last_arrival = None
+        self._grow = 0          # 目标上调后尚待插入的拉伸帧数
+        self._decay = 0         # 估计值低于目标以来的包数（目标缓慢下调）
+        self._stretching = False
+        self.received = 0
+        self.late = 0
+        self.duplicates = 0
+        self.lost = 0
+        self.concealed = 0
+        self.fec = 0
+        self.plc = 0
+        self.stretched = 0
+        self.dropped = 0
+        self.underruns = 0
+        self.resyncs = 0
+        self.talkspurts = 0
+
+    def _unwrap(self, seq):
+        ref = self._next
+        d = ((seq - ref + SEQ_MOD // 2) % SEQ_MOD) - SEQ_MOD // 2
+        return ref + d
+
+    def _clear(self):
+        for i in range(self.capacity):
+            self._payload[i] = None
+            self._seq[i] = -1
+        self._count = 0
+
+    def put(self, seq, payload, now=None):
+        """收到一帧；返回 True 表示已入缓冲"""
+        now = self._clock() if now is None else now
+        with self._lock:
+            self.received += 1
+            if self._next is None:
+                self._next = self._high = seq % SEQ_MOD
+            ext = self._unwrap(seq % SEQ_MOD)
+            if ext - self._next >= self.capacity:
+                # 序号跳变（客户端重连 / 长时间断流）：丢弃旧内容从新位置开始，抖动估计重来
+                self.resyncs += 1
+                self._clear()
+                self._next = self._high = ext
+                self._primed = False
+                self._transit = None
+                self._jitter = 0.0
+            # 迟到 / 重复包也计入抖动估计：延迟尖峰正是目标延迟要吸收的
+            self._update_jitter(ext, now)
+            if ext < self._next:
+                self.late += 1
+                return False
+            slot = ext % self.capacity
+            if self._seq[slot] == ext:
+                self.duplicates += 1
+                return False
+            self._payload[slot] = payload
+            self._seq[slot] = ext
+            self._count += 1
+            self._high = max(self._high, ext + 1)
+            return True
+
+    def _update_jitter(self, ext, now):
+        """RFC 3550 到达抖动：相对传输时间差的一阶平滑（调用方持锁）"""
+        if self._last_arrival is not None and now - self._last_arrival > self.silence_s:
+            # 长时间无包：PTT 停顿后的新话段，停顿不是网络抖动
+            self.talkspurts += 1
+            self._transit = None
+            self._jitter = 0.0
+            self._grow = self._decay = 0
+            self.target_frames = self.base_frames
+        self._last_arrival = now
+        transit = now - ext * self.frame_s
+        if self._transit is not None:
+            self._jitter += (abs(transit - self._transit) - self._jitter) / 16.0
+        self._transit = transit
+        if self.adaptive:
+            want = int(math.ceil(3.0 * self._jitter / self.frame_s)) + 1
+            target = min(self.max_frames, max(self.base_frames, want))
+            if target < self.target_frames:
+                # 上调立即生效，下调每 DECAY_FRAMES 包最多 1 帧：尖峰过后估计值快速回落，
+                # 目标若跟着来回摆动，就会反复拉伸又跳帧
+                self._decay += 1
+                if self._decay < DECAY_FRAMES:
+                    return
+                target = self.target_frames - 1
+            self._decay = 0
+            if self._primed:
+                self._grow = max(0, self._grow + target - self.target_frames)
+            self.target_frames = target
+
+    def _take(self, ext):
+        slot = ext % self.capacity
+        if self._seq[slot] != ext:
+            return None
+        payload = self._payload[slot]
+        self._payload[slot] = None
+        self._seq[slot] = -1
+        self._count -= 1
+        return payload
+
+    def pop(self):
+        """播放线程每帧调用一次；返回 (kind, payload)，预缓冲中 / 欠载返回 None"""
+        with self._lock:
+            if self._next is None:
+                return None
+            if not self._primed:
+                if self._high - self._next < self.target_frames:
+                    return None
+                self._primed = True
+                self._grow = 0
+            if self._count == 0:
+                self.underruns += 1
+                self._primed = False
+                return None
+            if self._grow > 0 and not self._stretching:
+                # 目标上调：插入一帧 PLC、播放位置不动，缓冲深度 +1（隔帧插入，不连续外推）
+                self._grow -= 1
+                self._stretching = True
+                self.stretched += 1
+                return PLC, None
+            self._stretching = False
+            # 超出目标太多（突发到达 / 时钟漂移）：跳过最旧的帧，延迟收敛回目标
+            while self._high - self._next > self.target_frames + 2:
+                if self._take(self._next) is not None:
+                    self.dropped += 1
+                self._next += 1
+            ext = self._next
+            self._next += 1
+            payload = self._take(ext)
+            if payload is not None:
+                return AUDIO, payload
+            self.lost += 1
+            self.concealed += 1
+            slot = self._next % self.capacity
+            if self._seq[slot] == self._next:
+                # 下一包已到：用它携带的 FEC 恢复本帧（下一包本身留在缓冲正常解码）
+                self.fec += 1
+                return FEC, self._payload[slot]
+            self.plc += 1
+            return PLC, None
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+            self._next = self._high = None
+            self._primed = False
+            self._transit = None
+            self._jitter = 0.0
+            self._last_arrival = None
+            self._grow = 0
+            self._decay = 0
+            self._stretching = False
+            self.target_frames = self.base_frames
+
+    def stats(self):
+        with self._lock:
+            depth = (self._high - self._next) if self._next is not None else 0
+            return {
+                'received': self.received,
+                'late': self.late,
+                'duplicates': self.duplicates,
+                'lost': self.lost,
+                'concealed': self.concealed,
+                'fec': self.fec,
+                'plc': self.plc,
+                'stretched': self.stretched,
+                'dropped': self.dropped,
+                'underruns': self.underruns,
+                'resyncs': self.resyncs,
+                'talkspurts': self.talkspurts,
+                'depth_ms': round(max(depth, 0) * self.frame_s * 1000.0, 1),
+                'target_ms': round(self.target_frames * self.frame_s * 1000.0, 1),
+                'jitter_ms': round(self._jitter * 1000.0, 2),
+            }
+
+
+def next_frame(jitter, pipeline):
+    """取下一播放帧：正常包解码、缺帧用 FEC / PLC 隐藏，均经 pipeline 分发给各 sink。
+
+    返回 int16 PCM 视图；预缓冲 / 欠载时返回 None（由播放端决定静音或等待）。
+    """
+    item = jitter.pop()
+    if item is None:
+        return None
+    kind, payload = item
+    if kind == AUDIO:
+        return pipeline.feed(payload)
+    if kind == FEC:
+        return pipeline.feed(payload, fec=True)
+    return pipeline.conceal()
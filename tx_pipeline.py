@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+TX 逐包处理：每个 Opus 包只解码一次，同一 PCM 视图分发给所有消费者
+
+WS_AudioTXHandler.on_message 原先依赖 PyAudioPlayback._normalize() 的副作用
+（last_decoded_pcm），拿不到时再用第二个 decoder 实例重复解码；ALSA 分支另行解码，
+TX 录音路径还要再 np.frombuffer + 复制。本模块提供：
+
+- TXFramePipeline: 持有唯一的 Opus 解码器，解码到预分配的 int16 缓冲
+  （Decoder.decode_into，无每包分配）；未编码（Int16）帧直接 frombuffer 零拷贝。
+  按注册顺序把同一只读视图交给各 sink（播放 / TX 分析 / 录音）。
+- 计数器：packets / decodes / decode_errors 以及每个 sink 的 calls / errors，
+  编码模式下 decodes == packets 即证明每包只解码一次。
+- 丢包隐藏（由 tx_jitter 驱动）：feed(data, fec=True) 从下一包的带内 FEC 恢复丢失帧，
+  conceal() 做 Opus PLC（Int16 直传模式为静音帧），分别计入 fec_decodes / plc_frames。
+
+视图只在本次 feed() 内有效（下个包会覆盖缓冲），需要保留数据的 sink 必须自行复制
+或转换（重采样输出本身就是新数组）。纯 numpy，无音频设备依赖。
+"""
+
+import numpy as np
+
+
+class TXFramePipeline:
+    """单个 TX WebSocket 连接的解码 + 分发。
+
+    非线程安全，同一时刻只能有一个线程调用 feed() / conceal()：PyAudio 路径由
+    PyAudioPlayback 的供料线程经 _tx_pull → tx_jitter.next_frame() 调用（IOLoop 只往
+    抖动缓冲 put）；ALSA 回退路径没有播放时钟，由 IOLoop 在 on_message 中直接 feed()。
+    sink 在调用线程内执行。
+    """
+
+    def __init__(self, decoder=None, frame_size=0, max_frame_size=None):
+        """decoder 为 None 表示 Int16 直传；frame_size 为协商的 Opus 帧长（样本数），
+        max_frame_size 为单包最大样本数（默认同 frame_size）"""
+        self.decoder = decoder
+        self.frame_size = int(frame_size)
+        # Opus 单包最长 120ms；缓冲按 max_frame_size 一次分配，正常解码以整个容量为上限
+        size = max(self.frame_size, int(max_frame_size or self.frame_size))
+        self._pcm = np.zeros(size, dtype=np.int16)
+        self._sinks = []
+        self.packets = 0
+        self.decodes = 0
+        self.decode_errors = 0
+        self.fec_decodes = 0
+        self.plc_frames = 0
+        self.bytes_in = 0
+        self.samples_out = 0
+
+    @property
+    def is_encoded(self):
+        return self.decoder is not None
+
+    def add_sink(self, name, fn):
+        """注册消费者 fn(pcm_int16_view)；返回值被忽略，异常按 sink 计数不影响其它 sink"""
+        self._sinks.append([name, fn, 0, 0])
+        return fn
+
+    def _decode_into(self, data, fec):
+        # 正常包以缓冲容量为上限（客户端发来多帧长包也能解）；FEC / PLC 要求 frame_size
+        # 恰为要恢复的时长，只能用协商帧长
+        size = self.frame_size if (fec or data is None) else self._pcm.size
+        try:
+            n = self.decoder.decode_into(data, self._pcm, size, fec)
+        except Exception:
+            self.decode_errors += 1
+            return None
+        pcm = self._pcm[:n]
+        pcm.flags.writeable = False
+        return pcm
+
+    def decode(self, data, fec=False):
+        """解码一个包，返回 int16 视图（解码失败返回 None）。
+
+        fec=True 时 data 是丢失帧之后的那个包，解出的是丢失帧（不计入 packets）。
+        """
+        if fec:
+            if self.decoder is None:
+                return self._silence()
+            self.fec_decodes += 1
+            pcm = self._decode_into(data, True)
+        else:
+            self.packets += 1
+            self.bytes_in += len(data)
+            if self.decoder is None:
+                # Int16 直传：奇数字节的尾巴丢弃
+                pcm = np.frombuffer(data, dtype=np.int16, count=len(data) // 2)
+            else:
+                self.decodes += 1
+                pcm = self._decode_into(data, False)
+        if pcm is not None:
+            self.samples_out += pcm.size
+        return pcm
+
+    def _silence(self):
+        self._pcm[:self.frame_size] = 0
+        pcm = self._pcm[:self.frame_size]
+        pcm.flags.writeable = False
+        return pcm
+
+    def conceal(self):
+        """丢失一帧且无 FEC 可用：Opus PLC 外推（Int16 直传为静音），分发并返回视图"""
+        self.plc_frames += 1
+        pcm = self._silence() if self.decoder is None else self._decode_into(None, False)
+        if pcm is not None:
+            self.samples_out += pcm.size
+        return self._dispatch(pcm)
+
+    def feed(self, data, fec=False):
+        """解码一次并按顺序分发给全部 sink，返回本包 PCM 视图（失败为 None）"""
+        return self._dispatch(self.decode(data, fec))
+
+    def _dispatch(self, pcm):
+        if pcm is None or pcm.size == 0:
+            return pcm
+        for sink in self._sinks:
+            sink[2] += 1
+            try:
+                sink[1](pcm)
+            except Exception as e:
+                sink[3] += 1
+                if sink[3] == 1:
+                    print(f"TX sink '{sink[0]}' error: {e}")
+        return pcm
+
+    def detach(self, pcm):
+        """返回可跨包保留的数组：复用解码缓冲的视图复制一份，其余（Int16 直传帧）原样返回"""
+        return pcm.copy() if np.shares_memory(pcm, self._pcm) else pcm
+
+    def stats(self):
+        return {
+            'encoded': self.is_encoded,
+            'packets': self.packets,
+            'decodes': self.decodes,
+            'decode_errors': self.decode_errors,
+            'fec_decodes': self.fec_decodes,
+            'plc_frames': self.plc_frames,
+            'bytes_in': self.bytes_in,
+            'samples_out': self.samples_out,
+            'sinks': {name: {'calls': calls, 'errors': errors} for name, _, calls, errors in self._sinks},
+        }
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+TX 低延迟播放环（PyAudio 回调模式的样本来源）
+
+PyAudioPlayback 原先由写线程对阻塞 stream.write 喂数据，前面挂一个 50 帧队列
+（最多约 1s 缓冲），TX 延迟随队列深浅漂移。现在输出流改为回调模式：
+
+- PortAudio 回调每个设备周期从 TXPlayoutRing.read() 取固定样本数，不足补零并记欠载
+- 供料线程只在环内样本低于目标延迟（target_ms，如 40/80/120）时才向抖动缓冲要下一帧，
+  所以环深度被钳在 目标 ~ 目标+1 帧；推送模式（write）超出容量时丢最旧样本并计数
+- 实测：每次回调记录取数前的环深度（当前 / 平滑 / 区间最小最大）与回调 time_info
+  给出的 DAC 延迟，口到天线的延迟 = 环深度 + 设备缓冲，两者都可观测
+
+环存储复用 rx_dsp.SampleRing，外加一把锁（回调线程 / 供料线程各一端）。纯 numpy。
+"""
+
+import threading
+
+import numpy as np
+
+from rx_dsp import SampleRing
+
+MIN_TARGET_MS = 20
+MAX_TARGET_MS = 500
+
+
+class TXPlayoutRing:
+    """回调线程 read()，供料线程 write() / wait_for_space()。"""
+
+    def __init__(self, rate, target_ms=40, max_frame_ms=120):
+        self.rate = int(rate)
+        self._cond = threading.Condition(threading.Lock())
+        # 容量 = 最大目标 + 一个最长 Opus 帧，运行中调目标不必重新分配
+        self._ring = SampleRing(self.rate * (MAX_TARGET_MS + max_frame_ms) // 1000)
+        self._out = np.zeros(self.rate // 10, dtype=np.int16)
+        self.set_target(target_ms)
+        self.reads = 0
+        self._playing = False
+        self.underruns = 0
+        self.underrun_samples = 0
+        self._fill_avg = 0.0
+        self._fill_min = None
+        self._fill_max = 0
+        self._fill_now = 0
+        self._dac_ms = 0.0
+
+    def set_target(self, target_ms):
+        """设定目标缓冲延迟（ms，钳到 20~500），返回生效值"""
+        target_ms = int(min(MAX_TARGET_MS, max(MIN_TARGET_MS, int(target_ms))))
+        with self._cond:
+            self.target_ms = target_ms
+            self.target_samples = self.rate * target_ms // 1000
+            self._cond.notify_all()
+        return target_ms
+
+    def __len__(self):
+        return len(self._ring)
+
+    def need(self):
+        """距目标深度还差多少样本（<= 0 表示已够）"""
+        return self.target_samples - len(self._ring)
+
+    def write(self, pcm):
+        """追加一帧；写后深度超过 目标 + 本帧 时丢最旧样本，推送模式的延迟同样有界"""
+        with self._cond:
+            self._ring.write(pcm)
+            excess = len(self._ring) - self.target_samples - len(pcm)
+            if excess > 0:
+                self._ring.discard(excess)
+
+    def wait_for_space(self, timeout):
+        """阻塞到环深度低于目标（回调取走数据会唤醒），返回是否需要供料"""
+        with self._cond:
+            if len(self._ring) >= self.target_samples:
+                self._cond.wait(timeout)
+            return len(self._ring) < self.target_samples
+
+    def read(self, n, dac_delay=None):
+        """回调取 n 个样本，不足部分补零；返回 int16 视图（下一次 read 前有效）"""
+        if n > self._out.size:
+            self._out = np.zeros(n, dtype=np.int16)
+        out = self._out[:n]
+        with self._cond:
+            fill = len(self._ring)
+            if self._ring.read_into(out, n) is None:
+                # 欠载：有多少取多少，剩余补静音
+                self._ring.read_into(out, fill)
+                out[fill:] = 0
+                # 只统计播放中途断流（空闲时回调持续输出静音不算），每次断流计一次
+                if self._playing:
+                    self.underruns += 1
+                    self.underrun_samples += n - fill
+                self._playing = False
+            else:
+                self._playing = True
+            self._cond.notify_all()
+        self.reads += 1
+        self._fill_now = fill
+        self._fill_avg += (fill - self._fill_avg) * 0.05
+        self._fill_min = fill if self._fill_min is None else min(self._fill_min, fill)
+        self._fill_max = max(self._fill_max, fill)
+        if dac_delay is not None and dac_delay > 0:
+            self._dac_ms += (dac_delay * 1000.0 - self._dac_ms) * 0.05
+        return out
+
+    def clear(self):
+        with self._cond:
+            self._ring.clear()
+            self._cond.notify_all()
+
+    def stats(self, reset_window=True):
+        """环深度实测（ms）；reset_window=True 时清零区间最小/最大值"""
+        ms = 1000.0 / self.rate
+        st = {
+            'target_ms': self.target_ms,
+            'fill_ms': round(self._fill_now * ms, 1),
+            'fill_avg_ms': round(self._fill_avg * ms, 1),
+            'fill_min_ms': round((self._fill_min or 0) * ms, 1),
+            'fill_max_ms': round(self._fill_max * ms, 1),
+            'dac_ms': round(self._dac_ms, 1),
+            'latency_ms': round(self._fill_avg * ms + self._dac_ms, 1),
+            'reads': self.reads,
+            'underruns': self.underruns,
+            'underrun_ms': round(self.underrun_samples * ms, 1),
+            'overflow_ms': round(self._ring.overflows * ms, 1),
+        }
+        if reset_window:
+            self._fill_min = None
+            self._fill_max = 0
+        return st
@@ -64,6 +64,8 @@ import tornado.web
 import tornado.websocket
 from tornado.ioloop import PeriodicCallback
 
+from resampler import resample
+
 
 @dataclass
 class ASRResult:
@@ -463,21 +465,10 @@ class FileAudioCapture:
             logger.error(f"处理文件失败 {file_path}: {e}")
     
     def _resample(self, audio: np.ndarray, orig_rate: int, target_rate: int) -> np.ndarray:
-        """简单的线性重采样"""
+        """多相抗混叠重采样（与 RX/TX/录音共用 resampler 模块）"""
         if orig_rate == target_rate:
             return audio
-        
-        # 计算重采样比例
-        ratio = target_rate / orig_rate
-        new_length = int(len(audio) * ratio)
-        
-        # 使用线性插值
-        indices = np.linspace(0, len(audio) - 1, new_length)
-        indices_floor = np.floor(indices).astype(np.int32)
-        indices_ceil = np.minimum(indices_floor + 1, len(audio) - 1)
-        fractions = indices - indices_floor
-        
-        return audio[indices_floor] * (1 - fractions) + audio[indices_ceil] * fractions
+        return resample(audio, orig_rate, target_rate)
     
     def process_specific_file(self, file_path: str) -> bool:
         """处理指定文件（供手动调用）"""
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+WDSP 共享配置与按 DSP 档位共享的 WDSP 通道池（每档位每帧只处理一次）
+
+- WDSPConfig / WDSPSettings: 控制端共享配置。原先是 PyAudioCapture.wdsp_config 字典，
+  控制线程直接改键、捕获线程每 25 帧对 9 个键算一次哈希，变更最多延迟 0.5s；
+  现在为不可变快照 + 版本号，update() 校验后整体替换（原子），rx-dsp 线程每帧
+  只比较一次版本号，变化即在下一帧边界生效
+
+原先任何控制端把 NR2 调到 4 级，所有听众听到的音频都随之改变。
+本模块把“DSP 档位”与“编解码档位”一样做成键：
+
+- DSPProfile: 影响听感的 WDSP 参数（NR2 级别/NB/ANF/AGC/带通），可哈希；
+  听众在 RX 音频通道上用 set_dsp_profile 选择，未选择的听众跟随控制端的共享配置
+- WDSPChannelPool: 每个活动 DSP 档位一个 WDSP 通道。rx-dsp 线程每帧 sync() 一次
+  活动档位集合，不再需要的通道优先改调（setter 只下发变化项）给新档位，而不是
+  关闭再打开；超过 max_channels 的档位回落到共享档位（resolve()）
+- 同一 DSP 档位的全部听众共享一次 WDSP 处理；其下每个编解码档位只编码一次
+
+处理器由 factory(channel, profile) 创建，本模块不直接依赖 libwdsp，便于测试。
+"""
+
+import logging
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+NR2_LEVELS = (0, 1, 2, 3, 4)
+AGC_MODES = (0, 1, 2, 3, 4)
+BANDPASS_RANGE = (0.0, 6000.0)
+MIN_BANDWIDTH = 100.0
+DEFAULT_MAX_CHANNELS = 4
+
+
+class DSPProfile(namedtuple('DSPProfile', 'nr2_level nb anf agc_mode bp_low bp_high')):
+    """RX DSP 档位。nr2_level=0 表示 NR2 关闭。可哈希，用作 WDSP 通道与 RX 环的键。"""
+
+    __slots__ = ()
+
+    @property
+    def label(self):
+        flags = ''.join(name for name, on in (('/nb', self.nb), ('/anf', self.anf)) if on)
+        return f"nr2:{self.nr2_level}{flags}/agc{self.agc_mode}/{self.bp_low:g}-{self.bp_high:g}"
+
+    def as_dict(self):
+        return dict(self._asdict())
+
+
+DEFAULT_DSP_PROFILE = DSPProfile(2, True, False, 3, 300.0, 2700.0)
+
+
+class WDSPConfig(namedtuple('WDSPConfig', 'enabled sample_rate buffer_size nr2_level nb_enabled anf_enabled '
+                                           'nf_enabled auto_notch agc_mode bandpass_low bandpass_high '
+                                           'nr2_ae_psi nr2_ae_zeta_thresh')):
+    """控制端共享的 WDSP 配置快照（不可变）。nr2_level=0 表示 NR2 关闭；
+    auto_notch 开启载波/啸叫自动陷波（auto_notch.AutoNotchDetector）。
+
+    sample_rate/buffer_size/nr2_ae_* 只在打开 WDSP 通道时使用，运行中不可修改。
+    """
+
+    __slots__ = ()
+
+    @property
+    def nr2_enabled(self):
+        return self.nr2_level > 0
+
+    @property
+    def profile(self):
+        """共享配置对应的 DSP 档位（未自选档位的听众使用）"""
+        return DSPProfile(self.nr2_level, self.nb_enabled, self.anf_enabled, self.agc_mode,
+                          self.bandpass_low, self.bandpass_high)
+
+
+DEFAULT_WDSP_CONFIG = WDSPConfig(True, 48000, 256, 2, True, False, False, False, 3, 300.0, 2700.0, 12.0, 0.65)
+
+# 运行中可由控制端修改的字段
+RUNTIME_FIELDS = ('enabled', 'nr2_level', 'nb_enabled', 'anf_enabled', 'nf_enabled', 'auto_notch', 'agc_mode',
+                  'bandpass_low', 'bandpass_high')
+
+
+def wdsp_config_from_section(section):
+    """由 MRRC.conf 的 [WDSP] 段（configparser SectionProxy）得到 WDSPConfig"""
+    d = DEFAULT_WDSP_CONFIG
+    level = section.getint('nr2_level', d.nr2_level) if section.getboolean('nr2_enabled', True) else 0
+    return WDSPConfig(
+        enabled=section.getboolean('enabled', d.enabled),
+        sample_rate=section.getint('sample_rate', d.sample_rate),
+        buffer_size=section.getint('buffer_size', d.buffer_size),
+        nr2_level=level,
+        nb_enabled=section.getboolean('nb_enabled', d.nb_enabled),
+        anf_enabled=section.getboolean('anf_enabled', d.anf_enabled),
+        nf_enabled=section.getboolean('nf_enabled', d.nf_enabled),
+        auto_notch=section.getboolean('auto_notch', d.auto_notch),
+        agc_mode=section.getint('agc_mode', d.agc_mode),
+        bandpass_low=section.getfloat('bandpass_low', d.bandpass_low),
+        bandpass_high=section.getfloat('bandpass_high', d.bandpass_high),
+        nr2_ae_psi=section.getfloat('nr2_ae_psi', d.nr2_ae_psi),
+        nr2_ae_zeta_thresh=section.getfloat('nr2_ae_zeta_thresh', d.nr2_ae_zeta_thresh),
+    )
+
+
+class WDSPSettings:
+    """控制端共享 WDSP 配置的版本化容器。
+
+    update() 在 IOLoop 中调用：校验后以新快照整体替换 (version, config)，
+    rx-dsp 线程用 snapshot() 一次读取得到一致的版本与配置，按 version 感知变更。
+    """
+
+    def __init__(self, config=DEFAULT_WDSP_CONFIG):
+        self._lock = threading.Lock()
+        self._state = (0, config)
+
+    def snapshot(self):
+        """(version, WDSPConfig)，单次属性读取，跨线程一致"""
+        return self._state
+
+    @property
+    def version(self):
+        return self._state[0]
+
+    @property
+    def config(self):
+        return self._state[1]
+
+    def replace(self, config):
+        """整体替换（启动时读取配置文件）"""
+        with self._lock:
+            self._state = (self._state[0] + 1, config)
+
+    def update(self, **changes):
+        """修改运行时字段，返回实际变化的字段名（无变化时不递增版本）。非法值抛 ValueError。"""
+        unknown = set(changes) - set(RUNTIME_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown WDSP setting(s): {', '.join(sorted(unknown))}")
+        with self._lock:
+            version, cfg = self._state
+            new = cfg._replace(**{k: _validate(k, v) for k, v in changes.items()})
+            if new.bandpass_high - new.bandpass_low < MIN_BANDWIDTH:
+                raise ValueError(f"bandpass {new.bandpass_low}-{new.bandpass_high}Hz narrower than {MIN_BANDWIDTH:g}Hz")
+            changed = tuple(f for f in RUNTIME_FIELDS if getattr(new, f) != getattr(cfg, f))
+            if changed:
+                self._state = (version + 1, new)
+            return changed
+
+
+def _validate(field, value):
+    if field in ('nr2_level', 'agc_mode'):
+        value = int(value)
+        if value not in (NR2_LEVELS if field == 'nr2_level' else AGC_MODES):
+            raise ValueError(f"{field} out of range: {value}")
+        return value
+    if field in ('bandpass_low', 'bandpass_high'):
+        value = float(value)
+        if not BANDPASS_RANGE[0] <= value <= BANDPASS_RANGE[1]:
+            raise ValueError(f"{field} out of range: {value}")
+        return value
+    if isinstance(value, str):
+        return value.lower() == 'true'
+    return bool(value)
+
+
+def dsp_profile_from_request(data, base=DEFAULT_DSP_PROFILE):
+    """把 set_dsp_profile 请求解析为 DSPProfile；缺省字段取 base，越界值钳位到合法范围。"""
+    def pick(key, choices, default):
+        try:
+            value = int(data.get(key, default))
+        except (TypeError, ValueError):
+            return default
+        return min(choices, key=lambda c: abs(c - value))
+
+    def flag(key, default):
+        value = data.get(key, default)
+        if isinstance(value, str):
+            return value.lower() == 'true'
+        return bool(value)
+
+    def freq(key, default):
+        try:
+            value = float(data.get(key, default))
+        except (TypeError, ValueError):
+            return default
+        return max(BANDPASS_RANGE[0], min(BANDPASS_RANGE[1], value))
+
+    low = freq('bp_low', base.bp_low)
+    high = freq('bp_high', base.bp_high)
+    if high - low < MIN_BANDWIDTH:
+        low, high = base.bp_low, base.bp_high
+    return DSPProfile(
+        pick('nr2_level', NR2_LEVELS, base.nr2_level),
+        flag('nb', base.nb),
+        flag('anf', base.anf),
+        pick('agc_mode', AGC_MODES, base.agc_mode),
+        low,
+        high,
+    )
+
+
+def apply_dsp_profile(processor, profile, previous=None):
+    """把档位下发到 WDSP 处理器；给出 previous 时只调用变化项的 setter。返回调用次数。"""
+    calls = 0
+    if previous is None or profile.nr2_level != previous.nr2_level:
+        processor.set_nr2_level(profile.nr2_level)
+        calls += 1
+    if previous is None or profile.nb != previous.nb:
+        processor.set_nb_enabled(profile.nb)
+        calls += 1
+    if previous is None or profile.anf != previous.anf:
+        processor.set_anf_enabled(profile.anf)
+        calls += 1
+    if previous is None or profile.agc_mode != previous.agc_mode:
+        processor.set_agc_mode(profile.agc_mode)
+        calls += 1
+    if previous is None or (profile.bp_low, profile.bp_high) != (previous.bp_low, previous.bp_high):
+        processor.set_bandpass(profile.bp_low, profile.bp_high)
+        calls += 1
+    return calls
+
+
+class WDSPChannelPool:
+    """活动 DSP 档位 → WDSP 处理器（各占一个 WDSP 通道号）。
+
+    只在 rx-dsp 线程调用（stats() 除外）。factory(channel, profile) 返回已按
+    profile 配置好的处理器，需提供 process_block/close 与 apply_dsp_profile 用到的 setter。
+    """
+
+    def __init__(self, factory, max_channels=DEFAULT_MAX_CHANNELS, first_channel=0):
+        self._factory = factory
+        self.max_channels = max(1, int(max_channels))
+        self.first_channel = int(first_channel)
+        self._procs = {}         # DSPProfile -> 处理器
+        self._channels = {}      # DSPProfile -> 通道号
+        self._fallback = None    # 超额档位回落到的档位（sync 的首个档位）
+        self._overflow = ()
+        # 统计
+        self.opened = 0
+        self.retuned = 0
+        self.closed = 0
+        self.setter_calls = 0
+
+    def __len__(self):
+        return len(self._procs)
+
+    def __contains__(self, profile):
+        return profile in self._procs
+
+    def get(self, profile):
+        return self._procs.get(profile)
+
+    def items(self):
+        return self._procs.items()
+
+    def resolve(self, profile):
+        """profile 实际由哪个档位的通道提供（超额档位回落到共享档位）"""
+        return profile if profile in self._procs else self._fallback
+
+    def sync(self, profiles):
+        """按活动档位集合调整通道。profiles 的首项（共享档位）总是优先分配。
+
+        保留已有档位；新档位优先接管被释放的通道（只下发变化项），其余释放的通道关闭。
+        """
+        wanted = list(dict.fromkeys(profiles))
+        self._overflow = tuple(wanted[self.max_channels:])
+        wanted = wanted[:self.max_channels]
+        self._fallback = wanted[0] if wanted else None
+        if set(wanted) == set(self._procs):
+            return
+        spare = [(p, self._procs.pop(p), self._channels.pop(p)) for p in list(self._procs) if p not in wanted]
+        # 中途出错（factory / setter 抛异常）时剩余的空闲通道也必须关闭：它们已移出池，
+        # 通道号会被视为空闲，若仍开着，之后的 sync 会对同一通道号重复 OpenChannel
+        try:
+            for profile in wanted:
+                if profile in self._procs:
+                    continue
+                if spare:
+                    previous, proc, channel = spare[0]
+                    self.setter_calls += apply_dsp_profile(proc, profile, previous)
+                    spare.pop(0)
+                    self.retuned += 1
+                    logger.info(f"WDSP 通道 {channel} 改调: {previous.label} → {profile.label}")
+                else:
+                    used = set(self._channels.values())
+                    channel = next(c for c in range(self.first_channel, self.first_channel + self.max_channels)
+                                   if c not in used)
+                    proc = self._factory(channel, profile)
+                    self.opened += 1
+                    logger.info(f"WDSP 通道 {channel} 打开: {profile.label}")
+                self._procs[profile] = proc
+                self._channels[profile] = channel
+        finally:
+            for previous, proc, channel in spare:
+                self._close(proc)
+                logger.info(f"WDSP 通道 {channel} 关闭: {previous.label}")
+
+    def _close(self, proc):
+        try:
+            proc.close()
+        except Exception as e:
+            logger.warning(f"WDSP 通道关闭失败: {e}")
+        self.closed += 1
+
+    def close(self):
+        for proc in self._procs.values():
+            self._close(proc)
+        self._procs = {}
+        self._channels = {}
+        self._fallback = None
+        self._overflow = ()
+
+    def stats(self):
+        channels = dict(self._channels)
+        return {
+            'channels': {p.label: c for p, c in channels.items()},
+            'max_channels': self.max_channels,
+            'overflow': [p.label for p in self._overflow],
+            'opened': self.opened,
+            'retuned': self.retuned,
+            'closed': self.closed,
+            'setter_calls': self.setter_calls,
+        }
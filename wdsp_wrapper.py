@@ -220,7 +220,8 @@ class WDSPProcessor:
                  enable_anf: bool = False,
                  agc_mode: int = WDSPAGCMode.MED,
                  nr2_ae_psi: float = 12.0,
-                 nr2_ae_zeta_thresh: float = 0.65):
+                 nr2_ae_zeta_thresh: float = 0.65,
+                 channel: int = 0):
         """
         Initialize WDSP processor.
 
@@ -234,6 +235,7 @@ class WDSPProcessor:
             agc_mode: AGC mode (OFF, LONG, SLOW, MED, FAST)
             nr2_ae_psi: EMNR 自动均衡掩码平滑宽度（越大音乐噪声越少，默认20）
             nr2_ae_zeta_thresh: EMNR 自动均衡触发阈值（越小越常触发，默认0.5）
+            channel: WDSP 通道号（多个 DSP 档位并存时各占一个，见 wdsp_pool）
         """
         if not WDSP_AVAILABLE:
             raise RuntimeError("WDSP library not available")
@@ -241,7 +243,7 @@ class WDSPProcessor:
         self.sample_rate = sample_rate
         self.buffer_size = buffer_size
         self.mode = mode
-        self.channel = 0  # Default channel
+        self.channel = channel
 
         # State tracking - 正确初始化启用状态
         self._initialized = False
@@ -249,12 +251,16 @@ class WDSPProcessor:
         self._nb_enabled = enable_nb     # 修复：使用参数值
         self._anf_enabled = enable_anf   # 修复：使用参数值
         self._notches_enabled = False    # 手动陷波滤波器（NF）
+        self._auto_notches = []          # 自动陷波 [(fcenter, fwidth)]，位于陷波库末尾
+        self._manual_active = []         # 手动陷波各自请求的 active（实际生效还需 NF 开启）
         self._agc_mode = agc_mode
         self._nr2_ae_psi = nr2_ae_psi
         self._nr2_ae_zeta_thresh = nr2_ae_zeta_thresh
         # Buffers for WDSP processing (float64 - WDSP 库要求)
         self._in_buffer = np.zeros(buffer_size * 2, dtype=np.float64)
         self._out_buffer = np.zeros(buffer_size * 2, dtype=np.float64)
+        # process_block() 的预分配缓冲（按需扩容，见 _ensure_block）
+        self._block_rows = 0
         # H9: C 库访问锁。process() 在捕获线程，notch/setter 可能在 Tornado 线程并发调用；
         # fexchange0 与 SetRXA* 并发会损坏 WDSP 内部状态。RLock 允许构造期嵌套调用。
         self._lock = threading.RLock()
@@ -574,6 +580,8 @@ class WDSPProcessor:
         
         手动陷波滤波器允许设置特定中心频率来消除单频干扰（如CW噪音）。
         注意：需要启用NBP (Notched BandPass) filter才能工作。
+        NotchesRun 是全部陷波的总开关，自动陷波存在时必须保持运行，所以 NF 开关
+        改为逐个改写手动陷波的 active 标志。
         
         Args:
             enabled: True to enable, False to disable
@@ -584,13 +592,15 @@ class WDSPProcessor:
         try:
             # H9: 持锁，与 process() 的 fexchange0 互斥
             with self._lock:
+                self._notches_enabled = enabled
+                self._apply_manual_active(ctypes.c_int(self.channel))
+                # 自动陷波存在时 NBP 保持运行（见 set_auto_notches）
+                run = 1 if (enabled or self._auto_notches) else 0
                 # 启用NBP (Notched BandPass) filter本身
-                _wdsp.RXANBPSetRun(ctypes.c_int(self.channel), ctypes.c_int(1 if enabled else 0))
-
-                # 启用notches
-                _wdsp.RXANBPSetNotchesRun(ctypes.c_int(self.channel), ctypes.c_int(1 if enabled else 0))
+                _wdsp.RXANBPSetRun(ctypes.c_int(self.channel), ctypes.c_int(run))
 
-                self._notches_enabled = enabled
+                # 启用notches（任一陷波生效时运行）
+                _wdsp.RXANBPSetNotchesRun(ctypes.c_int(self.channel), ctypes.c_int(run))
             print(f"🔧 WDSP NF (Notched BandPass) {'enabled' if enabled else 'disabled'} (dynamic)")
         except Exception as e:
             print(f"⚠️ NF dynamic control error: {e}")
@@ -604,7 +614,7 @@ class WDSPProcessor:
         Args:
             fcenter: Center frequency in Hz (e.g., 800 for 800Hz CW tone)
             fwidth: Notch width in Hz (default 100Hz, range 10-1000)
-            active: 1 = active, 0 = inactive
+            active: 1 = active, 0 = inactive (NF 关闭时暂不生效，开启后恢复)
             
         Returns:
             Notch index (>=0 success, <0 error)
@@ -620,8 +630,10 @@ class WDSPProcessor:
                     ctypes.c_int(0),  # Add at next available position
                     ctypes.c_double(fcenter),
                     ctypes.c_double(fwidth),
-                    ctypes.c_int(active)
+                    ctypes.c_int(active if self._notches_enabled else 0)
                 )
+                if result >= 0:
+                    self._manual_active.insert(result, active)
             if result >= 0:
                 print(f"🔧 WDSP NF: Added notch at {fcenter}Hz (width={fwidth}Hz, index={result})")
             return result
@@ -653,8 +665,10 @@ class WDSPProcessor:
                     ctypes.c_int(notch),
                     ctypes.c_double(fcenter),
                     ctypes.c_double(fwidth),
-                    ctypes.c_int(active)
+                    ctypes.c_int(active if self._notches_enabled else 0)
                 )
+                if result == 0 and 0 <= notch < len(self._manual_active):
+                    self._manual_active[notch] = active
             if result == 0:
                 print(f"🔧 WDSP NF: Edited notch {notch} at {fcenter}Hz (width={fwidth}Hz)")
             return result == 0
@@ -682,6 +696,8 @@ class WDSPProcessor:
                     ctypes.c_int(self.channel),
                     ctypes.c_int(notch)
                 )
+                if result == 0 and 0 <= notch < len(self._manual_active):
+                    del self._manual_active[notch]
             if result == 0:
                 print(f"🔧 WDSP NF: Deleted notch {notch}")
             return result == 0
@@ -689,6 +705,76 @@ class WDSPProcessor:
             print(f"⚠️ NF delete notch error: {e}")
             return False
     
+    def set_auto_notches(self, notches) -> int:
+        """
+        Batch-replace the automatic notches (see auto_notch.AutoNotchDetector).
+
+        自动陷波始终位于陷波库末尾（手动 add_notch 插在位置 0），本方法在一次加锁内
+        原地改写已有的自动陷波槽位、在末尾追加新增项、从末尾删除多余项，不影响手动陷波。
+        有自动陷波时确保 NBP 陷波运行；全部撤销且 NF 未开启时恢复关闭。NF 未开启时
+        手动陷波保持 active=0，不会随自动陷波一起生效。
+
+        Args:
+            notches: iterable of (fcenter, fwidth) in Hz
+
+        Returns:
+            Number of WDSP notch calls made (0 if unchanged / not initialized)
+        """
+        notches = [(float(f), float(w)) for f, w in notches]
+        if not self._initialized or notches == self._auto_notches:
+            return 0
+        calls = 0
+        try:
+            ch = ctypes.c_int(self.channel)
+            with self._lock:
+                total = ctypes.c_int(0)
+                _wdsp.RXANBPGetNumNotches(ch, ctypes.byref(total))
+                base = max(0, total.value - len(self._auto_notches))
+                old = self._auto_notches
+                for i, (fc, fw) in enumerate(notches):
+                    if i < len(old):
+                        if old[i] != (fc, fw):
+                            _wdsp.RXANBPEditNotch(ch, ctypes.c_int(base + i), ctypes.c_double(fc),
+                                                  ctypes.c_double(fw), ctypes.c_int(1))
+                            calls += 1
+                    else:
+                        _wdsp.RXANBPAddNotch(ch, ctypes.c_int(base + i), ctypes.c_double(fc),
+                                             ctypes.c_double(fw), ctypes.c_int(1))
+                        calls += 1
+                for i in range(len(old) - 1, len(notches) - 1, -1):
+                    _wdsp.RXANBPDeleteNotch(ch, ctypes.c_int(base + i))
+                    calls += 1
+                run = 1 if (notches or self._notches_enabled) else 0
+                if bool(notches) != bool(old):
+                    self._auto_notches = notches
+                    calls += self._apply_manual_active(ch)
+                    _wdsp.RXANBPSetRun(ch, ctypes.c_int(run))
+                    _wdsp.RXANBPSetNotchesRun(ch, ctypes.c_int(run))
+                    calls += 2
+                self._auto_notches = notches
+            if WDSP_DEBUG:
+                print(f"🔧 WDSP auto notch: {[fc for fc, _ in notches]} ({calls} calls)")
+        except Exception as e:
+            print(f"⚠️ NF auto notch error: {e}")
+        return calls
+
+    def _apply_manual_active(self, ch) -> int:
+        """按 NF 开关改写各手动陷波的 active（调用方持锁），返回 EditNotch 调用次数"""
+        total = ctypes.c_int(0)
+        _wdsp.RXANBPGetNumNotches(ch, ctypes.byref(total))
+        fcenter, fwidth, active = ctypes.c_double(0), ctypes.c_double(0), ctypes.c_int(0)
+        calls = 0
+        for i in range(max(0, total.value - len(self._auto_notches))):
+            if _wdsp.RXANBPGetNotch(ch, ctypes.c_int(i), ctypes.byref(fcenter),
+                                    ctypes.byref(fwidth), ctypes.byref(active)) != 0:
+                continue
+            wanted = self._manual_active[i] if i < len(self._manual_active) else 1
+            want = 1 if (self._notches_enabled and wanted) else 0
+            if active.value != want:
+                _wdsp.RXANBPEditNotch(ch, ctypes.c_int(i), fcenter, fwidth, ctypes.c_int(want))
+                calls += 1
+        return calls
+
     def get_num_notches(self) -> int:
         """
         Get number of configured notches.
@@ -836,6 +922,109 @@ class WDSPProcessor:
             print(f"⚠️ WDSP processing error: {e}")
             return audio_data
     
+    def _ensure_block(self, n_blocks: int):
+        """为 n_blocks 个 WDSP 缓冲预分配交织 I/Q 输入/输出矩阵及各行的 ctypes 指针。
+
+        每行是一个 fexchange0 缓冲（buffer_size 个复数样本）；I 列视图 [:, 0::2] 复用，
+        Q 列只在分配时清零一次。
+        """
+        if n_blocks <= self._block_rows:
+            return
+        rows = max(n_blocks, 2 * self._block_rows, 8)
+        bs = self.buffer_size
+        self._blk_in = np.zeros((rows, bs * 2), dtype=np.float64)
+        self._blk_out = np.zeros((rows, bs * 2), dtype=np.float64)
+        self._blk_in_i = self._blk_in[:, 0::2]
+        self._blk_out_i = self._blk_out[:, 0::2]
+        self._blk_tmp = np.zeros((rows, bs), dtype=np.float64)
+        self._blk_pcm = np.zeros(rows * bs, dtype=np.int16)
+        c_double_p = ctypes.POINTER(ctypes.c_double)
+        row_bytes = bs * 2 * 8
+        in_base = self._blk_in.ctypes.data
+        out_base = self._blk_out.ctypes.data
+        self._blk_in_ptrs = [ctypes.cast(in_base + k * row_bytes, c_double_p) for k in range(rows)]
+        self._blk_out_ptrs = [ctypes.cast(out_base + k * row_bytes, c_double_p) for k in range(rows)]
+        self._blk_channel = ctypes.c_int(self.channel)
+        self._blk_error = ctypes.c_int(0)
+        self._blk_error_ref = ctypes.byref(self._blk_error)
+        self._block_rows = rows
+
+    def process_block(self, audio_data: np.ndarray) -> np.ndarray:
+        """
+        Process N whole WDSP buffers in one call.
+
+        与逐块调用 process() 结果逐样本一致，但 int16→float64 转换、I/Q 交织、
+        I 通道取出、软削波和回转 int16 都对整块一次完成；ctypes 参数（各行指针、
+        channel、error）预先构造，循环内只剩 fexchange0 本身。WDSP 的 in_size 在
+        OpenChannel 时固定，故仍是每个缓冲一次 fexchange0。
+
+        Args:
+            audio_data: int16（或 float）数组，长度为 buffer_size 的整数倍
+
+        Returns:
+            处理后的数组，dtype 同输入。int16 时为内部缓冲的视图，下一次调用前有效。
+        """
+        if not self._initialized or not WDSP_AVAILABLE:
+            return audio_data
+        bs = self.buffer_size
+        n = len(audio_data) // bs
+        if n * bs != len(audio_data):
+            raise ValueError(f"block length {len(audio_data)} is not a multiple of {bs}")
+        if n == 0:
+            return audio_data
+
+        try:
+            self._ensure_block(n)
+            src = audio_data.reshape(n, bs)
+            in_i = self._blk_in_i[:n]
+            if audio_data.dtype == np.int16:
+                np.multiply(src, 1.0 / 32768.0, out=in_i)
+            else:
+                in_i[...] = src
+
+            fexchange0 = _wdsp.fexchange0
+            channel = self._blk_channel
+            error = self._blk_error
+            error_ref = self._blk_error_ref
+            in_ptrs = self._blk_in_ptrs
+            out_ptrs = self._blk_out_ptrs
+            passthrough = []
+            # H9: 整块持锁一次，与并发 SetRXA* 调用互斥
+            with self._lock:
+                for k in range(n):
+                    error.value = 0
+                    fexchange0(channel, in_ptrs[k], out_ptrs[k], error_ref)
+                    if error.value == -2:
+                        # 启动期输出尚不可用：该缓冲直通（同 process()）
+                        passthrough.append(k)
+                    elif error.value != 0:
+                        print(f"⚠️ WDSP processing error: {error.value}")
+
+            out = self._blk_tmp[:n]
+            out[...] = self._blk_out_i[:n]
+            # 软削波保护：超过 1.0 的部分按 0.5 比例缩小（逐元素，与 process() 相同）
+            mag = np.abs(out)
+            if mag.max() > 1.0:
+                over = mag > 1.0
+                out[over] = np.sign(out[over]) * (1.0 + (mag[over] - 1.0) * 0.5)
+
+            if audio_data.dtype == np.int16:
+                out *= 32767
+                np.clip(out, -32768, 32767, out=out)
+                pcm = self._blk_pcm[:n * bs]
+                np.copyto(pcm.reshape(n, bs), out, casting='unsafe')
+                for k in passthrough:
+                    pcm[k * bs:(k + 1) * bs] = audio_data[k * bs:(k + 1) * bs]
+                return pcm
+            result = out.reshape(-1).astype(audio_data.dtype)
+            for k in passthrough:
+                result[k * bs:(k + 1) * bs] = audio_data[k * bs:(k + 1) * bs]
+            return result
+
+        except Exception as e:
+            print(f"⚠️ WDSP processing error: {e}")
+            return audio_data
+
     def get_meter(self, meter_type: int = WDSPMeterType.S_PK) -> float:
         """
         Get meter reading.
@@ -235,6 +235,21 @@ var AudioRX_sampleRate=16000;
 var AUDIO_TAG_PCM = 0x00;   // Int16 PCM
 var AUDIO_TAG_OPUS = 0x01;  // Opus 帧
 
+// TX 帧序号（每次 sendSettings 归零），后端抖动缓冲据此重排 / 判丢包
+var AudioTX_seq = 0;
+
+// TX 线格式（m: 第 5 字段 = 2）：1 字节标签 + 2 字节大端帧序号 + 负载
+function AudioTX_frame(tag, payload) {
+	var bytes = (payload instanceof Uint8Array) ? payload : new Uint8Array(payload);
+	var out = new Uint8Array(bytes.byteLength + 3);
+	out[0] = tag;
+	out[1] = (AudioTX_seq >> 8) & 0xFF;
+	out[2] = AudioTX_seq & 0xFF;
+	AudioTX_seq = (AudioTX_seq + 1) & 0xFFFF;
+	out.set(bytes, 3);
+	return out.buffer;
+}
+
 var audioSyncMonitor = {
 	lastProcessTime: 0,
 	bufferCount: 0,
@@ -418,6 +433,29 @@ function AudioRX_start(){
 		return decodeInt16Audio(data);
 	}
 
+	// RX 通道文本帧：自适应 Opus 档位通知 "rxTier:{...}"、本听众 DSP 档位确认 "rxDSP:{...}"
+	function handleRxTextMessage(text) {
+		if (text.indexOf('rxDSP:') === 0) {
+			try {
+				window.__rxDSP = JSON.parse(text.substring(6));
+				console.log('🎛️ RX DSP 档位: ' + (window.__rxDSP.shared ? '共享' : '独立') +
+					' NR2=' + window.__rxDSP.nr2_level + ' AGC=' + window.__rxDSP.agc_mode +
+					' ' + window.__rxDSP.bp_low + '-' + window.__rxDSP.bp_high + 'Hz');
+			} catch (e) {
+				console.warn('rxDSP 解析失败:', e);
+			}
+		}
+		else if (text.indexOf('rxTier:') === 0) {
+			try {
+				window.__rxTier = JSON.parse(text.substring(7));
+				console.log('📶 RX Opus 档位: ' + (window.__rxTier.bitrate / 1000) + 'kbps / ' +
+					window.__rxTier.frame_dur + 'ms (' + window.__rxTier.tier + '/' + (window.__rxTier.tiers - 1) + ')');
+			} catch (e) {
+				console.warn('rxTier 解析失败:', e);
+			}
+		}
+	}
+
     // L3: RX 上下文使用 16kHz（与后端 Opus 解码率一致）；TX 上下文才是 48kHz。
     // 原"显式使用 48kHz"注释与实际 AudioRX_sampleRate=16000 不符，易误导维护者。
     // iOS Safari 注意：AudioContext 创建后可能处于 suspended 状态
@@ -476,6 +514,7 @@ function AudioRX_start(){
                 };
                 // 桌面端：设置 WebSocket 消息处理器
                 wsAudioRX.onmessage = function(msg){
+                    if (typeof msg.data === 'string') { handleRxTextMessage(msg.data); return; }
                     if (!window.__rxBytes) window.__rxBytes = 0;
                     if (msg && msg.data && msg.data.byteLength) window.__rxBytes += msg.data.byteLength;
                     
@@ -574,6 +613,7 @@ function AudioRX_start(){
             
             // iOS Safari: 设置 WebSocket 消息处理器
             wsAudioRX.onmessage = function(msg){
+                if (typeof msg.data === 'string') { handleRxTextMessage(msg.data); return; }
                 if (!window.__rxBytes) window.__rxBytes = 0;
                 if (msg && msg.data && msg.data.byteLength) window.__rxBytes += msg.data.byteLength;
                 
@@ -679,11 +719,26 @@ function wsAudioRXopen(){
 			action: "set_opus_encode",
 			enabled: true,
 			rate: 16000,  // 16kHz：对 2.7kHz SSB 语音近无损且带宽最低
-			frame_dur: 20   // 20ms：Opus 甜点位，延迟减半、音质无损失
+			frame_dur: 20,  // 20ms：Opus 甜点位，延迟减半、音质无损失
+			adaptive: true  // 后端按发送积压自动降/升码率档位，经 "rxTier:" 文本帧告知
 		});
 		wsAudioRX.send(opusRequest);
 		console.log('📡 已请求后端启用 RX Opus 编码 (16kHz / 20ms - 移动端优化)');
 	}
+	// 重连后恢复本听众的独立 DSP 档位
+	if (window.__rxDSPRequest) {
+		AudioRX_setDSPProfile(window.__rxDSPRequest);
+	}
+}
+
+// 本听众独立的 RX DSP 档位（只影响自己听到的音频，不改变其他听众/控制端共享设置）
+// opts: {nr2_level, nb, anf, agc_mode, bp_low, bp_high}，缺省项沿用共享配置；null 回到共享配置
+function AudioRX_setDSPProfile(opts) {
+	window.__rxDSPRequest = opts || null;
+	if (wsAudioRX && wsAudioRX.readyState === WebSocket.OPEN) {
+		var request = Object.assign({action: "set_dsp_profile"}, opts || {shared: true});
+		wsAudioRX.send(JSON.stringify(request));
+	}
 }
 
 function wsAudioRXclose(){
@@ -1790,11 +1845,8 @@ OpusEncoderProcessor.prototype.pushSamples = function( data )
 				// 码率统计：TX（编码后）
 				if (!window.__txBytes) { window.__txBytes = 0; }
 				if (res[idx] && res[idx].byteLength) { window.__txBytes += res[idx].byteLength; }
-				// 线格式：1 字节标签 (0x01=Opus) + Opus 帧
-				var tagArr = new Uint8Array(res[idx].byteLength + 1);
-				tagArr[0] = 0x01;
-				tagArr.set(new Uint8Array(res[idx]), 1);
-				this.wsh.send(tagArr.buffer);
+				// 线格式：1 字节标签 (0x01=Opus) + 2 字节帧序号 + Opus 帧
+				this.wsh.send(AudioTX_frame(AUDIO_TAG_OPUS, res[idx]));
 			}
 		}
 	}
@@ -1820,11 +1872,8 @@ OpusEncoderProcessor.prototype.pushSamples = function( data )
 		    // 码率统计：TX（PCM直发）
 		    if (!window.__txBytes) { window.__txBytes = 0; }
 		    window.__txBytes += int16Frame.byteLength;
-		    // 线格式：1 字节标签 (0x00=PCM) + Int16 数据
-		    var tagPcm = new Uint8Array(int16Frame.byteLength + 1);
-		    tagPcm[0] = 0x00;
-		    tagPcm.set(new Uint8Array(int16Frame.buffer, int16Frame.byteOffset, int16Frame.byteLength), 1);
-		    this.wsh.send(tagPcm.buffer);
+		    // 线格式：1 字节标签 (0x00=PCM) + 2 字节帧序号 + Int16 数据
+		    this.wsh.send(AudioTX_frame(AUDIO_TAG_PCM, new Uint8Array(int16Frame.buffer, int16Frame.byteOffset, int16Frame.byteLength)));
 		}
 	}
 	
@@ -2190,8 +2239,9 @@ function sendSettings()
     var rate = String( mh.context.sampleRate );
     var opusRate = String( ap.opusRate );
     var opusFrameDur = String( ap.opusFrameDur );
-    // 第 5 字段 = 线格式标签模式（1= 每帧前加 1 字节 0x00 PCM / 0x01 Opus）
-    var tagged = 1;
+    // 第 5 字段 = 线格式标签模式（2= 每帧前加 1 字节 0x00 PCM / 0x01 Opus + 2 字节帧序号）
+    var tagged = 2;
+    AudioTX_seq = 0;
 
     var msg = "m:" + [ rate, encode, opusRate, opusFrameDur, tagged ].join( "," );
     console.log( msg );
@@ -2246,10 +2296,7 @@ function stopRecord()
             }
             if (wsAudioTX && wsAudioTX.readyState === WebSocket.OPEN) {
                 for (var ti = 0; ti < tailPackets.length; ti++) {
-                    var tagTail = new Uint8Array(tailPackets[ti].byteLength + 1);
-                    tagTail[0] = 0x01; // AUDIO_TAG_OPUS
-                    tagTail.set(new Uint8Array(tailPackets[ti]), 1);
-                    wsAudioTX.send(tagTail.buffer);
+                    wsAudioTX.send(AudioTX_frame(AUDIO_TAG_OPUS, tailPackets[ti]));
                 }
             }
         } catch(e) {
@@ -2690,6 +2690,13 @@ function showWDSPAdvancedSettings() {
     html += '<span class="switch-slider"></span></label>';
     html += '</div>';
 
+    // Auto notch (carrier / heterodyne) switch
+    html += '<div class="setting-item wdsp-item">';
+    html += '<label class="switch-label"><span>Auto Carrier Notch</span>';
+    html += '<input type="checkbox" id="wdsp-adv-autonotch" onchange="setWDSPAutoNotch(this.checked)" ' + (wdspState.autoNotch ? 'checked' : '') + ' ' + (wdspState.enabled ? '' : 'disabled') + '>';
+    html += '<span class="switch-slider"></span></label>';
+    html += '</div>';
+
     // NF (manual notch) switch
     html += '<div class="setting-item wdsp-item">';
     html += '<label class="switch-label"><span>Manual Notch Filter (NF)</span>';
@@ -4193,6 +4200,7 @@ var wdspState = {
     nb: true,
     anf: false,
     nf: false,      // NF 手动陷波滤波器（用于消除特定频率 CW 噪音）
+    autoNotch: false, // 载波/啸叫自动陷波（后端检测稳定单音，自动写入陷波库）
     nfNotches: [],  // 陷波点列表 [{fcenter, fwidth, active}]
     agcMode: 3
 };
@@ -4308,6 +4316,16 @@ function setWDSPANF(enabled) {
     console.log('🔧 WDSP ANF:', enabled ? '启用' : '禁用');
 }
 
+// 设置载波/啸叫自动陷波
+function setWDSPAutoNotch(enabled) {
+    wdspState.autoNotch = enabled;
+    if (typeof sendCommand === 'function') {
+        sendCommand('setWDSPAutoNotch', enabled ? 'true' : 'false');
+    }
+    saveWDSPStateToCookies();
+    console.log('🔧 WDSP Auto Notch:', enabled ? '启用' : '禁用');
+}
+
 // 设置 NF (手动陷波滤波器) 启用/禁用
 function setWDSPNF(enabled) {
     wdspState.nf = enabled;
@@ -4426,6 +4444,10 @@ function handleWDSPStatus(status) {
             wdspState.anf = config.anf_enabled;
         }
         
+        if (config.autoNotch !== undefined) {
+            wdspState.autoNotch = config.autoNotch;
+        }
+        
         // NF 手动陷波滤波器状态
         if (config.nfEnabled !== undefined) {
             wdspState.nf = config.nfEnabled;
@@ -4725,6 +4747,7 @@ window.setWDSPNR2 = setWDSPNR2;
 window.setWDSPNB = setWDSPNB;
 window.setWDSPANF = setWDSPANF;
 window.setWDSPNF = setWDSPNF;
+window.setWDSPAutoNotch = setWDSPAutoNotch;
 window.addWDSPNotch = addWDSPNotch;
 window.editWDSPNotch = editWDSPNotch;
 window.deleteWDSPNotch = deleteWDSPNotch;
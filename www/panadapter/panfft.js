@@ -6,6 +6,14 @@ var wshFFT = "";
 var zoom_FFT=100;
 var samplerate = "960000";
 var FFTSIZE = 4096;
+// 服务端缩放视图：相对 SDR 中心的偏移 / 显示带宽（Hz），宽度即画布像素数
+var viewOffset = 0;
+var viewSpan = 0;
+// 瀑布帧压缩：init 时声明支持的编码，服务端以 fftcodec: 回复选定结果。
+// 默认无损 zlib；有损的 quiet（压平噪声底，会抹掉贴着噪声底的弱 CW/数字信号）
+// 仅在用户显式开启时声明：localStorage.setItem('panfft_codec', 'quiet')
+var fftCodec = "raw";
+var fftDecodeChain = Promise.resolve();
 var localcenterfrequency=0;
 var freqmouse=0;
 
@@ -29,6 +37,19 @@ function bodyload(){
 
 function set_FFT_Viso_Dynamic(v){FFT_Viso_Dynamic=v;}
 function set_FFT_Viso_min(v){FFT_Viso_min=v;}
+// 服务端跨帧平滑（off/avg/peak），对所有客户端生效；结果由 fftsmooth: 回发
+function set_FFT_Smoothing(mode){
+	if(wshFFT && wshFFT.readyState == WebSocket.OPEN){wshFFT.send("smooth:" + JSON.stringify({mode: mode}));}
+}
+function applySmoothing(settings){
+	document.getElementById("sel-FFTSmoothing").value = settings.mode;
+}
+// 后台标签页只需极低帧率：服务端按客户端帧率上限取最新帧，不再为其积压
+var FFT_FPS_HIDDEN = 1;
+function sendFFTRate(){
+	if(wshFFT && wshFFT.readyState == WebSocket.OPEN){wshFFT.send("fps:" + (document.hidden ? FFT_FPS_HIDDEN : 0));}
+}
+document.addEventListener("visibilitychange", sendFFTRate);
 
 
 
@@ -48,7 +69,17 @@ function appendwshFFTclose(){
 
 function appendwshFFTOpen(){
 	document.getElementById("div-scoketscontrols").innerHTML='<img src="img/critsgreen.png">wsFFT';
-	wshFFT.send("init");
+	fftCodec = "raw";
+	if(typeof DecompressionStream === "function"){
+		// zlib: 无损（默认）；quiet: 噪声底压平后压缩（约 3.5 倍，有损，需用户开启）
+		var codecs = ["zlib"];
+		try{
+			if(localStorage.getItem("panfft_codec") === "quiet"){codecs = ["quiet", "zlib"];}
+		}catch(e){}
+		wshFFT.send("init:" + JSON.stringify({codecs: codecs}));
+	}else{
+		wshFFT.send("init");
+	}
 }
 
 function appendwshFFTError(err){
@@ -73,7 +104,13 @@ var globmsg = "";
 
 function init_showFFT( msg ){ 
 	datas = msg.data.split(':');
-	if(datas[0] == "fftsr"){
+	if(datas[0] == "fftcodec"){
+		fftCodec = datas[1];
+	}
+	else if(datas[0] == "fftsmooth"){
+		applySmoothing(JSON.parse(msg.data.substring(10)));
+	}
+	else if(datas[0] == "fftsr"){
 		samplerate=datas[1];
 	}
 	else if(datas[0] == "fftsz"){
@@ -88,15 +125,68 @@ function init_showFFT( msg ){
 	else if(datas[0] == "fftst"){
 		visual_SampleRate.innerHTML = samplerate+"sps";
 		visual_FFtResolution.innerHTML=samplerate/FFTSIZE+"hz/px";
+		viewSpan = parseInt(samplerate);
+		sendFFTRate();
 		wshFFT.send("ready");
 		window.opener.ControlTRX_getFreq();
 		wshFFT.binaryType = 'arraybuffer';
 		wshFFT.onmessage = showFFT;
+		requestView();
 	}
 }
 
+// 按画布实际显示宽度请求视图：服务端下变频/抽取后只发本视图需要的 bin
+function requestView(){
+	var width = Math.round(canvasSP.parentNode.clientWidth || window.innerWidth);
+	wshFFT.send("view:" + JSON.stringify({offset: viewOffset, span: viewSpan, width: width}));
+}
+
+function applyView(view){
+	viewOffset = view.offset;
+	viewSpan = view.span;
+	FFTSIZE = view.width;
+	canvasSP.width = canvasWF.width = FFTSIZE;
+	canvasWF.style.width = canvasSP.style.width = "100%";
+	canvas_width_SP = canvas_width_WF = FFTSIZE;
+	midle_SP = canvas_width_SP*2;
+	midle_WF = canvas_width_WF*2;
+	imgObjWF = ctxWF.createImageData(canvasWF.width, 1);
+	initFFT();
+	visual_WindowsZoom.innerHTML = Math.round(samplerate / viewSpan * 100) + "%";
+	visual_FFtResolution.innerHTML = Math.round(view.bin_hz) + "hz/px";
+}
+
 function showFFT( msg ){ 
+	if(typeof msg.data === "string"){
+		datas = msg.data.split(/:(.*)/);
+		if(datas[0] == "fftview"){applyView(JSON.parse(datas[1]));}
+		else if(datas[0] == "fftsmooth"){applySmoothing(JSON.parse(datas[1]));}
+		return;
+	}
 	var buffer = new Uint8Array(msg.data);
+	if(fftCodec != "raw"){
+		// 解压为异步：串成链保证按到达顺序绘制瀑布行
+		fftDecodeChain = fftDecodeChain.then(function(){ return decodeFFTFrame(buffer); })
+			.then(function(frame){ if(frame){ drawFFT(frame); } })
+			.catch(function(err){ console.log("FFT frame decode failed", err); });
+		return;
+	}
+	drawFFT(buffer);
+}
+
+async function inflateFFT(data){
+	const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream("deflate"));
+	return new Uint8Array(await new Response(stream).arrayBuffer());
+}
+
+// 帧格式：[类型 1 字节][负载]；0x01 = zlib(完整帧)
+async function decodeFFTFrame(buffer){
+	if(buffer[0] != 1){return null;}
+	return inflateFFT(buffer.subarray(1));
+}
+
+function drawFFT(buffer){
+	if(buffer.length != FFTSIZE + 4){return;}  // 切换视图前的旧宽度帧
 	let FFTdata = buffer.subarray(0, FFTSIZE);
 	FFTdata_scale_min = ((buffer[FFTSIZE] << 8) + (buffer[FFTSIZE+1]))-65280;
 	FFTdata_scale_max= ((buffer[FFTSIZE+2] << 8) + (buffer[FFTSIZE+3]))-65280;
@@ -110,7 +200,7 @@ function showFFT( msg ){
 
 
 const ctxSP = canvasSP.getContext("2d");// imgObjSP = ctxSP.createImageData(canvasSP.width, canvas_height);	
-const midle_SP = canvas_width_SP*2;
+var midle_SP = canvas_width_SP*2;
 
 function SetImageDataSP(datas,scale_min,scale_max) {
 	imgObjSP = new ImageData(canvasSP.width, canvas_height_SP);
@@ -138,10 +228,11 @@ function SetImageDataSP(datas,scale_min,scale_max) {
 	ctxSP.putImageData(imgObjSP, 0, 0);
 }
 
-const ctxWF = canvasWF.getContext("2d"),imgObjWF = ctxWF.createImageData(canvasWF.width, 1);
+const ctxWF = canvasWF.getContext("2d");
+var imgObjWF = ctxWF.createImageData(canvasWF.width, 1);
 //const	colMap = [[0,0,0,255],[40,0,0,255],[56,0,4,255],[61,0,9,255],[64,0,12,255],[66,0,14,255],[69,0,17,255],[73,0,20,255],[74,0,22,255],[78,0,25,255],[79,0,27,255],[83,0,30,255],[85,0,31,255],[86,0,33,255],[90,0,36,255],[91,0,38,255],[93,0,39,255],[95,0,41,255],[96,0,43,255],[100,0,46,255],[102,0,47,255],[103,0,49,255],[105,0,51,255],[107,0,52,255],[108,0,54,255],[110,0,55,255],[112,0,57,255],[112,0,57,255],[113,0,58,255],[115,0,60,255],[117,0,62,255],[119,0,63,255],[120,0,65,255],[122,0,66,255],[124,0,68,255],[125,0,70,255],[127,0,71,255],[129,0,73,255],[129,0,73,255],[130,0,74,255],[132,0,76,255],[134,0,78,255],[136,0,79,255],[137,0,81,255],[139,0,82,255],[141,0,84,255],[142,0,86,255],[144,0,87,255],[146,0,89,255],[147,0,90,255],[149,0,92,255],[151,0,94,255],[151,0,94,255],[153,0,95,255],[154,0,97,255],[156,0,98,255],[158,0,100,255],[159,0,102,255],[161,0,103,255],[163,0,105,255],[164,0,106,255],[166,0,108,255],[168,0,109,255],[170,0,111,255],[171,0,113,255],[173,0,114,255],[175,0,116,255],[176,0,117,255],[178,0,119,255],[180,0,121,255],[180,0,121,255],[181,0,122,255],[183,0,124,255],[185,0,125,255],[187,0,127,255],[188,0,129,255],[190,0,130,255],[192,0,132,255],[193,0,133,255],[195,0,135,255],[197,0,137,255],[198,0,138,255],[200,0,140,255],[202,0,141,255],[204,0,143,255],[204,0,143,255],[205,0,145,255],[207,0,146,255],[209,0,148,255],[210,0,149,255],[212,0,151,255],[214,0,153,255],[215,0,154,255],[217,0,156,255],[219,0,157,255],[221,0,159,255],[222,0,160,255],[222,0,160,255],[224,0,162,255],[226,0,164,255],[227,0,165,255],[229,0,167,255],[231,0,168,255],[232,0,170,255],[234,0,172,255],[236,0,173,255],[238,0,175,255],[238,0,175,255],[239,0,176,255],[241,0,178,255],[243,0,180,255],[244,0,181,255],[246,0,183,255],[248,2,184,255],[249,4,186,255],[249,4,186,255],[249,4,186,255],[251,6,188,255],[251,6,188,255],[253,9,189,255],[253,9,189,255],[255,11,191,255],[255,11,191,255],[255,13,192,255],[255,13,192,255],[255,13,192,255],[255,16,194,255],[255,18,196,255],[255,20,197,255],[255,20,197,255],[255,23,199,255],[255,25,200,255],[255,27,202,255],[255,30,204,255],[255,32,205,255],[255,34,207,255],[255,37,208,255],[255,37,208,255],[255,39,210,255],[255,41,211,255],[255,44,213,255],[255,46,215,255],[255,48,216,255],[255,51,218,255],[255,53,219,255],[255,53,219,255],[255,55,221,255],[255,57,223,255],[255,60,224,255],[255,62,226,255],[255,64,227,255],[255,67,229,255],[255,67,229,255],[255,69,231,255],[255,71,232,255],[255,74,234,255],[255,76,235,255],[255,78,237,255],[255,81,239,255],[255,81,239,255],[255,83,240,255],[255,85,242,255],[255,88,243,255],[255,90,245,255],[255,92,247,255],[255,95,248,255],[255,95,248,255],[255,97,250,255],[255,99,251,255],[255,102,253,255],[255,104,255,255],[255,106,255,255],[255,106,255,255],[255,108,255,255],[255,111,255,255],[255,113,255,255],[255,115,255,255],[255,115,255,255],[255,118,255,255],[255,120,255,255],[255,122,255,255],[255,122,255,255],[255,125,255,255],[255,127,255,255],[255,129,255,255],[255,129,255,255],[255,132,255,255],[255,134,255,255],[255,136,255,255],[255,136,255,255],[255,139,255,255],[255,141,255,255],[255,143,255,255],[255,143,255,255],[255,146,255,255],[255,148,255,255],[255,150,255,255],[255,150,255,255],[255,153,255,255],[255,155,255,255],[255,155,255,255],[255,157,255,255],[255,159,255,255],[255,159,255,255],[255,162,255,255],[255,164,255,255],[255,164,255,255],[255,166,255,255],[255,169,255,255],[255,171,255,255],[255,171,255,255],[255,173,255,255],[255,176,255,255],[255,176,255,255],[255,178,255,255],[255,180,255,255],[255,180,255,255],[255,183,255,255],[255,185,255,255],[255,185,255,255],[255,187,255,255],[255,190,255,255],[255,190,255,255],[255,192,255,255],[255,194,255,255],[255,197,255,255],[255,197,255,255],[255,199,255,255],[255,201,255,255],[255,204,255,255],[255,204,255,255],[255,206,255,255],[255,208,255,255],[255,210,255,255],[255,210,255,255],[255,213,255,255],[255,215,255,255],[255,217,255,255],[255,217,255,255],[255,220,255,255],[255,222,255,255],[255,224,255,255],[255,227,255,255],[255,229,255,255],[255,229,255,255],[255,231,255,255],[255,234,255,255],[255,236,255,255],[255,238,255,255],[255,241,255,255],[255,243,255,255],[255,243,255,255],[255,245,255,255],[255,248,255,255],[255,250,255,255],[255,255,255,255]];
 const colMap = [[0,0,127,255],[0,0,131,255],[0,0,135,255],[0,0,139,255],[0,0,143,255],[0,0,147,255],[0,0,151,255],[0,0,155,255],[0,0,159,255],[0,0,163,255],[0,0,167,255],[0,0,171,255],[0,0,175,255],[0,0,179,255],[0,0,183,255],[0,0,187,255],[0,0,191,255],[0,0,195,255],[0,0,199,255],[0,0,203,255],[0,0,207,255],[0,0,211,255],[0,0,215,255],[0,0,219,255],[0,0,223,255],[0,0,227,255],[0,0,231,255],[0,0,235,255],[0,0,239,255],[0,0,243,255],[0,0,247,255],[0,0,251,255],[0,0,255,255],[0,4,255,255],[0,8,255,255],[0,12,255,255],[0,16,255,255],[0,20,255,255],[0,24,255,255],[0,28,255,255],[0,32,255,255],[0,36,255,255],[0,40,255,255],[0,44,255,255],[0,48,255,255],[0,52,255,255],[0,56,255,255],[0,60,255,255],[0,64,255,255],[0,68,255,255],[0,72,255,255],[0,76,255,255],[0,80,255,255],[0,84,255,255],[0,88,255,255],[0,92,255,255],[0,96,255,255],[0,100,255,255],[0,104,255,255],[0,108,255,255],[0,112,255,255],[0,116,255,255],[0,120,255,255],[0,124,255,255],[0,128,255,255],[0,132,255,255],[0,136,255,255],[0,140,255,255],[0,144,255,255],[0,148,255,255],[0,152,255,255],[0,156,255,255],[0,160,255,255],[0,164,255,255],[0,168,255,255],[0,172,255,255],[0,176,255,255],[0,180,255,255],[0,184,255,255],[0,188,255,255],[0,192,255,255],[0,196,255,255],[0,200,255,255],[0,204,255,255],[0,208,255,255],[0,212,255,255],[0,216,255,255],[0,220,255,255],[0,224,255,255],[0,228,255,255],[0,232,255,255],[0,236,255,255],[0,240,255,255],[0,244,255,255],[0,248,255,255],[0,252,255,255],[1,255,253,255],[5,255,249,255],[9,255,245,255],[13,255,241,255],[17,255,237,255],[21,255,233,255],[25,255,229,255],[29,255,225,255],[33,255,221,255],[37,255,217,255],[41,255,213,255],[45,255,209,255],[49,255,205,255],[53,255,201,255],[57,255,197,255],[61,255,193,255],[65,255,189,255],[69,255,185,255],[73,255,181,255],[77,255,177,255],[81,255,173,255],[85,255,169,255],[89,255,165,255],[93,255,161,255],[97,255,157,255],[101,255,153,255],[105,255,149,255],[109,255,145,255],[113,255,141,255],[117,255,137,255],[121,255,133,255],[125,255,129,255],[129,255,125,255],[133,255,121,255],[137,255,117,255],[141,255,113,255],[145,255,109,255],[149,255,105,255],[153,255,101,255],[157,255,97,255],[161,255,93,255],[165,255,89,255],[169,255,85,255],[173,255,81,255],[177,255,77,255],[181,255,73,255],[185,255,69,255],[189,255,65,255],[193,255,61,255],[197,255,57,255],[201,255,53,255],[205,255,49,255],[209,255,45,255],[213,255,41,255],[217,255,37,255],[221,255,33,255],[225,255,29,255],[229,255,25,255],[233,255,21,255],[237,255,17,255],[241,255,13,255],[245,255,9,255],[249,255,5,255],[253,255,1,255],[255,252,0,255],[255,248,0,255],[255,244,0,255],[255,240,0,255],[255,236,0,255],[255,232,0,255],[255,228,0,255],[255,224,0,255],[255,220,0,255],[255,216,0,255],[255,212,0,255],[255,208,0,255],[255,204,0,255],[255,200,0,255],[255,196,0,255],[255,192,0,255],[255,188,0,255],[255,184,0,255],[255,180,0,255],[255,176,0,255],[255,172,0,255],[255,168,0,255],[255,164,0,255],[255,160,0,255],[255,156,0,255],[255,152,0,255],[255,148,0,255],[255,144,0,255],[255,140,0,255],[255,136,0,255],[255,132,0,255],[255,128,0,255],[255,124,0,255],[255,120,0,255],[255,116,0,255],[255,112,0,255],[255,108,0,255],[255,104,0,255],[255,100,0,255],[255,96,0,255],[255,92,0,255],[255,88,0,255],[255,84,0,255],[255,80,0,255],[255,76,0,255],[255,72,0,255],[255,68,0,255],[255,64,0,255],[255,60,0,255],[255,56,0,255],[255,52,0,255],[255,48,0,255],[255,44,0,255],[255,40,0,255],[255,36,0,255],[255,32,0,255],[255,28,0,255],[255,24,0,255],[255,20,0,255],[255,16,0,255],[255,12,0,255],[255,8,0,255],[255,4,0,255],[255,0,0,255],[251,0,0,255],[247,0,0,255],[243,0,0,255],[239,0,0,255],[235,0,0,255],[231,0,0,255],[227,0,0,255],[223,0,0,255],[219,0,0,255],[215,0,0,255],[211,0,0,255],[207,0,0,255],[203,0,0,255],[199,0,0,255],[195,0,0,255],[191,0,0,255],[187,0,0,255],[183,0,0,255],[179,0,0,255],[175,0,0,255],[171,0,0,255],[167,0,0,255],[163,0,0,255],[159,0,0,255],[155,0,0,255],[151,0,0,255],[147,0,0,255],[143,0,0,255],[139,0,0,255],[135,0,0,255],[131,0,0,255],[127,0,0,255]];
-const midle_WF = canvas_width_WF*2;
+var midle_WF = canvas_width_WF*2;
 
 function SetImageDataWF(datas,scale_min,scale_max) {
 	var canvasBuffer = document.createElement("canvas");
@@ -188,9 +279,11 @@ function initCanvas(cvsIDwf) {
 	var ctx = canvas.getContext("2d");
 	ctx.fillStyle = "black"; 
 	ctx.fillRect(0, 0, canvas.width, canvas.height);
+	if(canvas.dataset.listeners){return;}  // 视图切换时重绘，事件只注册一次
+	canvas.dataset.listeners = "1";
 	
    canvas.addEventListener('wheel', (event) => {
-		set_FFT_zoom();
+		set_FFT_zoom(event);
         event.stopImmediatePropagation(); // WORKED!!
     }, false)
 	
@@ -207,14 +300,15 @@ function initCanvas(cvsIDwf) {
 }
 
 
+// 鼠标位置 → 相对 SDR 中心的频率偏移（Hz）
+function mouseOffsetHz(canvas, event) {
+		var rect = canvas.getBoundingClientRect();
+		var span = viewSpan || samplerate;
+		return viewOffset + ((event.clientX - rect.left) / rect.width - 0.5) * span;
+}
+
 function showOnmouseInfo(event) {
-		var rect = this.getBoundingClientRect()
-		var scaleX = this.width / rect.width;    // relationship bitmap vs. element for X 
-		var hzperpixel=samplerate/this.width;
-		// console.log(this.width);
-		// console.log(rect.width);
-		
-		hz=((window.scrollX+event.clientX)*scaleX*hzperpixel)-(samplerate/2);
+		hz=mouseOffsetHz(this, event);
 		freqmouse=window.opener.TRXfrequency+hz;
 		//var scale_hz = Math.exp(parseInt(document.getElementById("canBFFFT_scale_multhz").value)/100);
 		// var start = (parseInt(document.getElementById("canBFFFT_scale_start").value)*Audio_analyser.frequencyBinCount/100)*scale_hz;
@@ -231,15 +325,16 @@ function showOnmouseInfo(event) {
 }
 
 
-function set_FFT_zoom() {
+// 滚轮缩放：以鼠标处频率为新中心，向服务端请求更窄/更宽的视图（服务端下变频+抽取）
+function set_FFT_zoom(event) {
 	if(event.deltaY>0){
 			if(zoom_FFT >= 150){zoom_FFT/=1.5;}
 	}else{
 		zoom_FFT*=1.5;
 	}
-	visual_WindowsZoom.innerHTML=canvasWF.style.width = canvasSP.style.width = zoom_FFT + "%";
-	window.scroll((window.screen.width*(zoom_FFT/100)/2)-window.screen.width/2, 0);
-	visual_FFtResolution.innerHTML=Math.floor(samplerate/FFTSIZE/(zoom_FFT/100))+"hz/px";
+	viewOffset = (zoom_FFT > 100) ? mouseOffsetHz(event.currentTarget, event) : 0;
+	viewSpan = samplerate * 100 / zoom_FFT;
+	requestView();
 }
 
 